@@ -2,7 +2,6 @@ import argparse
 import os
 import json
 import re
-import requests
 import datetime
 import csv
 import glob
@@ -10,16 +9,32 @@ import time
 import logging
 import sys
 import io
-from media_lookup import (find_existing_media, upload_media_to_wp, find_local_thumbnail, resize_image, retry_with_backoff)
+import sqlite3
+import html
+from media_lookup import (find_existing_media, upload_media_bytes, find_local_thumbnail, resize_image,
+                          tmdb_image_url, download_image)
 from urllib.parse import quote
-from wp_terms import resolve_terms
+from wp_terms import resolve_terms, term_cache
+from local_index import get_post_index, get_media_index, get_create_ledger, fetch_all
+from metadata_cache import get_metadata_cache
+from image_engine import image_engine
+from singleflight import singleflight
+import http_client
+import retry_policy
+import rate_governor
 from functools import wraps
-from requests.exceptions import RequestException
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from requests.exceptions import RequestException, Timeout, ConnectionError as RequestConnectionError
 from requests.auth import HTTPBasicAuth
 from settings_editor import SettingsEditor, DEFAULT_TEMPLATES
 from media_lookup import find_existing_media
-from safe_json import load_json, save_json
-from utils import clean_title, detect_season_episode
+from safe_json import load_json, update_json
+from utils import clean_title, detect_season_episode, detect_quality, post_key, canonical_slug
+from queue_store import get_store, LINKS_DIR
+from queue_watcher import QueueWatcher
+from worker_pool import KeyedWorkerPool
+from async_pipeline import run_blocking, run_pipeline, run_stages, drain, stage_width, EventLoopThread
+from staged_pipeline import Stage, StagedPipeline
 from host_config import load_host_config
 # This will create the default config if it doesn't exist
 load_host_config()
@@ -43,11 +58,18 @@ POSTED_CACHE = os.path.join(CONFIG_DIR, "posted_files.json")
 PENDING_LINKS = os.path.join(CONFIG_DIR, "pending_links.json")
 HOST_CONFIG_FILE = os.path.join(CONFIG_DIR, "host_config.json")
 SETTINGS_FILE = os.path.join(CONFIG_DIR, "settings.json")
+DAEMON_PID_FILE = os.path.join(LINKS_DIR, ".daemon.pid")
 
 TMDB_BASE = "https://api.themoviedb.org/3/search/multi"
 OMDB_API = "http://www.omdbapi.com/"
 ANILIST_API = "https://graphql.anilist.co"
 
+# Threads one get_media_metadata fan-out can use: three sources, each hedged at most once
+METADATA_LOOKUP_THREADS = 6
+# Runs the concurrent TMDb/AniList/OMDb lookups of get_media_metadata, see set_metadata_concurrency()
+_metadata_executor = None
+_metadata_executor_size = 0
+
 for folder in [CONFIG_DIR, LOG_DIR, TRACK_LOG_DIR]:
     os.makedirs(folder, exist_ok=True)
 
@@ -65,36 +87,20 @@ logging.basicConfig(
     ]
 )
 def get_next_link():
-    """Get the next pending link from the queue"""
-    pending_dir = os.path.join(SCRIPT_DIR, "pending_links")
-    os.makedirs(pending_dir, exist_ok=True)
-    
+    """Claim the next pending link from the queue"""
     try:
-        # Find all pending link files
-        link_files = sorted(
-            [f for f in os.listdir(pending_dir) if f.endswith('.json')],
-            key=lambda x: os.path.getmtime(os.path.join(pending_dir, x))
-        )
-        
-        if not link_files:
-            return None
-            
-        # Get the oldest file
-        oldest_file = os.path.join(pending_dir, link_files[0])
-        try:
-            with open(oldest_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            return data
-        except json.JSONDecodeError as e:
-            logger.error(f"Invalid JSON in {oldest_file}: {str(e)}")
-            try:
-                os.remove(oldest_file)
-            except Exception as e:
-                logger.error(f"Failed to remove corrupt file {oldest_file}: {str(e)}")
-            return None
+        return get_store().claim()
     except Exception as e:
-        logger.error(f"Error reading pending links directory: {str(e)}")
+        logger.error(f"Error reading pending link queue: {str(e)}")
         return None
+
+def get_next_group(window=0, min_age=0):
+    """Claim the next pending link together with the other host links of the same release"""
+    try:
+        return get_store().claim_group(window=window, min_age=min_age)
+    except Exception as e:
+        logger.error(f"Error reading pending link queue: {str(e)}")
+        return []
         
 
 def setup_logging():
@@ -302,64 +308,62 @@ def apply_template(media_type, template_vars, settings):
         logger.error(f"Template application failed: {str(e)}")
         return templates["default"].format(**template_vars)
 
-@retry_with_backoff()
-def fetch_tmdb_info(query, api_key):
-    """Fetch media info from TMDb API"""
+def fetch_tmdb_info(query, api_key, hedge=False):
+    """Fetch media info from TMDb API (cached, see metadata_cache; hedge: see _fan_out)"""
     try:
         if not api_key or api_key == "your_tmdb_api_key":
             raise ValueError("Invalid TMDb API key")
+
+        def lookup():
+            params = {
+                "api_key": api_key, 
+                "query": query, 
+                "language": "en-US",
+                "include_adult": "false"
+            }
+            res = http_client.get("tmdb", TMDB_BASE, params=params)
             
-        params = {
-            "api_key": api_key, 
-            "query": query, 
-            "language": "en-US",
-            "include_adult": "false"
-        }
-        res = requests.get(TMDB_BASE, params=params, timeout=10)
-        
-        if res.status_code == 401:
-            raise RequestException("Invalid TMDb API key")
-            
-        res.raise_for_status()
-        data = res.json()
-        return data["results"][0] if data.get("results") else None
+            if res.status_code == 401:
+                raise RequestException("Invalid TMDb API key")
+                
+            res.raise_for_status()
+            data = res.json()
+            return data["results"][0] if data.get("results") else None
+
+        return get_metadata_cache().get_or_fetch("tmdb", query, lookup, hedge=hedge)
     except Exception as e:
         logger.error(f"TMDb API request failed: {str(e)}")
         return None
-@retry_with_backoff()
-def fetch_omdb_info(title, api_key):
-    """Fetch media info from OMDb API"""
+def fetch_omdb_info(title, api_key, hedge=False):
+    """Fetch media info from OMDb API (cached, see metadata_cache; hedge: see _fan_out)"""
     try:
         if not api_key or api_key == "your_omdb_api_key":
             return None
-            
-        params = {
-            "apikey": api_key,
-            "t": title,
-            "type": "series" if "S" in title.upper() else "movie",
-            "plot": "full"
-        }
-        res = requests.get(OMDB_API, params=params, timeout=10)
-        res.raise_for_status()
-        data = res.json()
-        return {
-            "title": data.get("Title"),
-            "overview": data.get("Plot"),
-            "year": data.get("Year"),
-            "rating": data.get("imdbRating"),
-            "poster_path": data.get("Poster"),
-            "release_date": data.get("Released")
-        } if data.get("Response") == "True" else None
+
+        def lookup():
+            params = {
+                "apikey": api_key,
+                "t": title,
+                "type": "series" if "S" in title.upper() else "movie",
+                "plot": "full"
+            }
+            res = http_client.get("omdb", OMDB_API, params=params)
+            res.raise_for_status()
+            data = res.json()
+            return {
+                "title": data.get("Title"),
+                "overview": data.get("Plot"),
+                "year": data.get("Year"),
+                "rating": data.get("imdbRating"),
+                "poster_path": data.get("Poster"),
+                "release_date": data.get("Released")
+            } if data.get("Response") == "True" else None
+
+        return get_metadata_cache().get_or_fetch("omdb", title, lookup, hedge=hedge)
     except Exception as e:
         logger.error(f"OMDb API request failed: {str(e)}")
         return None
-@retry_with_backoff()
-def fetch_anilist_info(title, season=None, episode=None):
-    """Fetch anime info from AniList API using Romaji title priority"""
-    try:
-        query = '''
-        query ($search: String, $season: Int, $episode: Int) {
-            Media(search: $search, type: ANIME) {
+ANILIST_MEDIA_FIELDS = '''
                 title {
                     romaji  # Prioritize Romaji title
                     english
@@ -379,71 +383,127 @@ def fetch_anilist_info(title, season=None, episode=None):
                         name
                     }
                 }
-            }
-        }
+'''
+
+# Aliased Media() lookups sent in one AniList request by fetch_anilist_batch
+ANILIST_BATCH_SIZE = 10
+# Pending queue items whose anime titles are resolved up front when a drain starts
+ANILIST_PREFETCH_ITEMS = 100
+
+def _parse_anilist_media(media):
+    """Metadata dict for an AniList Media object"""
+    # Prefer Romaji title, fallback to English/Native
+    title_romaji = media["title"]["romaji"]
+    title_english = media["title"]["english"]
+    display_title = title_romaji or title_english or media["title"]["native"]
+    
+    return {
+        "title": display_title,
+        "romaji_title": title_romaji,  # Store Romaji separately
+        "english_title": title_english,
+        "overview": media.get("description", ""),
+        "year": media.get("seasonYear"),
+        "rating": media.get("averageScore"),
+        "poster_path": media["coverImage"]["extraLarge"] if media["coverImage"] else None,
+        "episodes": media.get("episodes"),
+        "season": media.get("season"),
+        "studio": media["studios"]["nodes"][0]["name"] if media["studios"]["nodes"] else None,
+        "media_type": "anime"
+    }
+
+def fetch_anilist_info(title, season=None, episode=None, hedge=False):
+    """Fetch anime info from AniList API using Romaji title priority (cached, see metadata_cache; hedge: see _fan_out)"""
+    try:
+        query = f'''
+        query ($search: String, $season: Int, $episode: Int) {{
+            Media(search: $search, type: ANIME) {{{ANILIST_MEDIA_FIELDS}            }}
+        }}
         '''
         variables = {'search': title, 'season': season, 'episode': episode}
-        
-        res = requests.post(
-            ANILIST_API, 
-            json={'query': query, 'variables': variables}, 
-            timeout=10
-        )
-        res.raise_for_status()
-        data = res.json()
-        
-        if not data.get("data", {}).get("Media"):
-            return None
+
+        def lookup():
+            res = http_client.post(
+                "anilist",
+                ANILIST_API, 
+                json={'query': query, 'variables': variables},
+                idempotent=True  # read-only GraphQL query
+            )
+            if res.status_code == 404:
+                # AniList answers a search without match with 404 and Media: null
+                return None
+            res.raise_for_status()
+            data = res.json()
             
-        media = data["data"]["Media"]
-        
-        # Prefer Romaji title, fallback to English/Native
-        title_romaji = media["title"]["romaji"]
-        title_english = media["title"]["english"]
-        display_title = title_romaji or title_english or media["title"]["native"]
-        
-        return {
-            "title": display_title,
-            "romaji_title": title_romaji,  # Store Romaji separately
-            "english_title": title_english,
-            "overview": media.get("description", ""),
-            "year": media.get("seasonYear"),
-            "rating": media.get("averageScore"),
-            "poster_path": media["coverImage"]["extraLarge"] if media["coverImage"] else None,
-            "episodes": media.get("episodes"),
-            "season": media.get("season"),
-            "studio": media["studios"]["nodes"][0]["name"] if media["studios"]["nodes"] else None,
-            "media_type": "anime"
-        }
+            if not data.get("data", {}).get("Media"):
+                return None
+            return _parse_anilist_media(data["data"]["Media"])
+
+        # season/episode do not change the result, so every episode shares one entry
+        return get_metadata_cache().get_or_fetch("anilist", title, lookup, hedge=hedge)
         
     except Exception as e:
         logger.error(f"AniList API request failed: {str(e)}")
         return None        
-        
-            
-def detect_quality(title):
-    """Strict quality detection that matches exact resolution patterns"""
-    if not title or not isinstance(title, str):
-        return None
-        
-    title_lower = title.lower()
-    quality_map = {
-        '2160p': '4K',
-        '1080p': '1080p',  # Keep exact values for strict matching
-        '720p': '720p',
-        '480p': '480p',
-        '4k': '4K',
-        'hd': 'HD',
-        'sd': 'SD'
-    }
-    
-    # Check for exact quality patterns first
-    for pattern in quality_map:
-        if re.search(r'(^|\W)' + pattern + r'($|\W)', title_lower):
-            return quality_map[pattern]
-            
-    return None
 
+def fetch_anilist_batch(titles):
+    """
+    Look up many anime titles with aliased Media() queries, ANILIST_BATCH_SIZE
+    per request, and store each result in the metadata cache so later
+    fetch_anilist_info calls are cache hits. Titles already cached are skipped.
+    Returns {title: info or None} for the titles that were fetched.
+    """
+    metadata_cache = get_metadata_cache()
+    wanted = []
+    for title in titles:
+        if title and title not in wanted and not metadata_cache.lookup("anilist", title)[0]:
+            wanted.append(title)
+
+    results = {}
+    for start in range(0, len(wanted), ANILIST_BATCH_SIZE):
+        chunk = wanted[start:start + ANILIST_BATCH_SIZE]
+        params = ", ".join(f"$s{i}: String" for i in range(len(chunk)))
+        fields = "".join(
+            f"\n            m{i}: Media(search: $s{i}, type: ANIME) {{{ANILIST_MEDIA_FIELDS}            }}"
+            for i in range(len(chunk))
+        )
+        query = f"query ({params}) {{{fields}\n        }}"
+        try:
+            res = http_client.post(
+                "anilist",
+                ANILIST_API,
+                json={'query': query, 'variables': {f"s{i}": title for i, title in enumerate(chunk)}},
+                idempotent=True
+            )
+            body = res.json() if res.content else {}
+            data = body.get("data")
+            if data is None:
+                # Titles without a match come back as null aliases (with a 404
+                # status); anything else without data is a real failure
+                res.raise_for_status()
+                raise RequestException(f"AniList batch returned no data (HTTP {res.status_code})")
+        except (RequestException, ValueError) as e:
+            logger.error(f"AniList batch request failed: {str(e)}")
+            continue
+
+        # AniList reports a title without a match as a 404 error on its alias;
+        # any other error on an alias says nothing about the title
+        alias_errors = {
+            error["path"][0]: error.get("status")
+            for error in body.get("errors") or [] if error.get("path")
+        }
+        for i, title in enumerate(chunk):
+            media = data.get(f"m{i}")
+            if media is None and alias_errors.get(f"m{i}", 404) != 404:
+                logger.warning(f"AniList batch lookup of '{title}' failed, leaving it uncached")
+                continue
+            info = _parse_anilist_media(media) if media else None
+            metadata_cache.store("anilist", title, info)
+            results[title] = info
+        logger.info(f"AniList batch resolved {sum(1 for t in chunk if results.get(t))} of {len(chunk)} title(s)")
+    return results
+
+@singleflight(lambda title, wp, auth, settings:
+              (wp['url'].rstrip('/'), title, settings.get("strict_resolution_matching", True)))
 def find_existing_post(title, wp, auth, settings):
     """Strict matching that only updates when ALL criteria match exactly"""
     try:
@@ -464,6 +524,30 @@ def find_existing_post(title, wp, auth, settings):
         # 3. Exact episode match
         # 4. Resolution matches (if strict_resolution_matching is True)
         
+        # The local index answers most lookups; WordPress is only searched on a miss.
+        # Until the first full listing is indexed (in the background), search as before.
+        site = wp['url'].rstrip('/')
+        match_quality = settings.get("strict_resolution_matching", True)
+        post_index = get_post_index()
+        try:
+            if post_index.is_built(site):
+                post_index.sync(wp, auth)
+                post_id = post_index.find(site, title, match_quality=match_quality)
+                if post_id:
+                    logger.debug(f"Post index hit for '{title}': {post_id}")
+                    return post_id
+            else:
+                post_index.sync_in_background(wp, auth)
+        except (RequestException, sqlite3.Error, ValueError) as e:
+            logger.warning(f"Local post index unavailable: {str(e)}")
+
+        # Posts carry a canonical slug, an indexed column in WordPress
+        post = find_post_by_slug(canonical_slug(title), wp, auth, title=title, match_quality=match_quality)
+        if post:
+            post_index.add(site, [post])
+            return post['id']
+
+        # Fall back to a title search for posts that predate canonical slugs
         search_term = f"{base_title} S{season:02d}E{episode:02d}" if season and episode else base_title
         
         search_url = f"{wp['url'].rstrip('/')}/wp-json/wp/v2/posts"
@@ -471,7 +555,7 @@ def find_existing_post(title, wp, auth, settings):
             "search": search_term,
             "per_page": 5,
         }
-        res = requests.get(search_url, params=params, auth=auth, timeout=10)
+        res = http_client.get("wordpress", search_url, params=params, auth=auth)
         res.raise_for_status()
         posts = res.json()
 
@@ -495,6 +579,7 @@ def find_existing_post(title, wp, auth, settings):
                     continue
             
             # If we get here, we have an exact match
+            post_index.add(site, [post])
             return post['id']
         
         # No exact match found
@@ -508,25 +593,87 @@ def find_existing_post(title, wp, auth, settings):
         logger.debug(f"Final Nitroflare link: {template_vars['nitroflare_link']}")
         logger.debug(f"Final host links: {template_vars['host_links']}")
         
-def create_post_wp(title, content, wp, auth, media_id=None, status="publish", categories=None, tags=None):
+def find_post_by_slug(slug, wp, auth, title=None, match_quality=True):
+    """
+    Post (id, title, modified, slug, link) with exactly this slug, or None.
+    Drafts and pending posts count too (post_status may create those).
+    With a title, a post whose own title is a different release is ignored.
+    """
+    res = http_client.get(
+        "wordpress",
+        f"{wp['url'].rstrip('/')}/wp-json/wp/v2/posts",
+        params={"slug": slug, "status": "any", "_fields": "id,title,modified,slug,link"},
+        auth=auth
+    )
+    res.raise_for_status()
+    posts = [post for post in res.json() if post.get("slug") == slug]
+    if title is not None and posts:
+        # Compare (title, season, episode) and, when matching quality, the quality too
+        size = 4 if match_quality else 3
+        wanted = post_key(title)[:size]
+        posts = [post for post in posts
+                 if post_key(html.unescape(post["title"]["rendered"]))[:size] == wanted]
+        if not posts:
+            logger.warning(f"Post with slug '{slug}' belongs to another release, ignoring it")
+    return posts[0] if posts else None
+
+def create_post_wp(title, content, wp, auth, media_id=None, status="publish", categories=None, tags=None, slug=None):
+    """
+    Create a post, idempotently: the canonical slug identifies the create, so a
+    retry after a timeout resolves to the post an earlier attempt already made.
+    """
+    site = wp['url'].rstrip('/')
+    post_index, create_ledger = get_post_index(), get_create_ledger()
     try:
-        post_url = f"{wp['url'].rstrip('/')}/wp-json/wp/v2/posts"
+        slug = slug or canonical_slug(title or "")
+        if not slug:
+            raise ValueError(f"Cannot create a post without a title: {title!r}")
+        if create_ledger.is_pending(site, slug):
+            # An earlier attempt may have succeeded on the server after we gave up.
+            # If this lookup fails we must not create blindly, so let it raise.
+            existing = find_post_by_slug(slug, wp, auth, title=title)
+            if existing:
+                logger.info(f"Post '{slug}' was already created by an earlier attempt (ID: {existing['id']})")
+                create_ledger.complete(site, slug)
+                post_index.add(site, [existing])
+                return existing.get("link")
+
+        attempts = create_ledger.begin(site, slug)
+        if attempts > 1:
+            logger.info(f"Retrying create of post '{slug}' (attempt {attempts})")
+
+        post_url = f"{site}/wp-json/wp/v2/posts"
         post_data = {
             "title": title,
+            "slug": slug,
             "content": content,
             "status": status,
             "featured_media": media_id,
             "categories": categories or [],
             "tags": tags or []
         }
-        res = requests.post(
-            post_url, 
-            json=post_data, 
-            auth=auth, 
-            timeout=30
-        )
-        res.raise_for_status()
-        return res.json().get("link")
+        try:
+            res = http_client.post(
+                "wordpress",
+                post_url, 
+                json=post_data, 
+                auth=auth
+            )
+        except (Timeout, RequestConnectionError):
+            existing = find_post_by_slug(slug, wp, auth, title=title)
+            if not existing:
+                raise
+            logger.warning(f"Create of '{slug}' timed out but the post exists (ID: {existing['id']})")
+            post = existing
+        else:
+            if 400 <= res.status_code < 500:
+                # Rejected, so nothing was created and there is nothing to look up next time
+                create_ledger.complete(site, slug)
+            res.raise_for_status()
+            post = res.json()
+        create_ledger.complete(site, slug)
+        post_index.add(site, [post])
+        return post.get("link")
     except Exception as e:
         logger.error(f"Failed to create WordPress post: {str(e)}")
         raise
@@ -539,32 +686,111 @@ def update_post_wp(post_id, content, wp, auth):
         post_data = {
             "content": content
         }
-        res = requests.post(post_url, json=post_data, auth=auth, timeout=30)
+        res = http_client.post("wordpress", post_url, json=post_data, auth=auth, idempotent=True)
+        if res.status_code == 404:
+            # Deleted on the site; forget it so the next attempt creates a new post
+            get_post_index().remove(wp['url'].rstrip('/'), post_id)
         res.raise_for_status()
         return res.json().get("link")
     except Exception as e:
         logger.error(f"Failed to update WordPress post: {str(e)}")
         raise
 
-def get_media_metadata(title, settings):
-    """Fetch media metadata from TMDb/OMDb/AniList"""
-    if not settings.get("tmdb_api_key"):
-        return None
-        
-    # First check if this is anime
+def _metadata_sources(title, settings):
+    """(name, lookup) pairs in priority order for a title; lookup(hedge=True) sends a hedged request"""
     season, episode = detect_season_episode(title)
     is_anime = any(x in title.lower() for x in ["anime", "episode", "season"])
-    
+
+    sources = [("tmdb", lambda hedge=False: fetch_tmdb_info(title, settings["tmdb_api_key"], hedge))]
     if is_anime and settings.get("enable_anilist"):
-        info = fetch_anilist_info(title, season, episode)
+        anilist = ("anilist", lambda hedge=False: fetch_anilist_info(title, season, episode, hedge))
+        if settings.get("preferred_anime_source", "anilist") == "tmdb":
+            sources.append(anilist)
+        else:
+            sources.insert(0, anilist)
+    if settings.get("enable_omdb_fallback") and settings.get("omdb_api_key"):
+        sources.append(("omdb", lambda hedge=False: fetch_omdb_info(title, settings["omdb_api_key"], hedge)))
+    return sources
+
+def set_metadata_concurrency(lookups):
+    """
+    Size the fan-out executor for `lookups` get_media_metadata calls running at
+    once, so one upload's lookups never wait behind another's. Called between drains.
+    """
+    global _metadata_executor, _metadata_executor_size
+    size = max(1, lookups) * METADATA_LOOKUP_THREADS
+    if _metadata_executor is not None and size == _metadata_executor_size:
+        return _metadata_executor
+    if _metadata_executor is not None:
+        _metadata_executor.shutdown(wait=False)
+    _metadata_executor = ThreadPoolExecutor(max_workers=size, thread_name_prefix="metadata")
+    _metadata_executor_size = size
+    return _metadata_executor
+
+def _get_metadata_executor():
+    return _metadata_executor or set_metadata_concurrency(1)
+
+def _fan_out(sources, hedge_after=0):
+    """
+    Run every lookup concurrently and return the result of the highest-priority
+    source that found something, as soon as no higher-priority source is still
+    running. Lookups still pending then are cancelled (or left to finish and
+    fill the metadata cache). With hedge_after > 0, a source that has not
+    answered within that many seconds gets a second, parallel request
+    (hedged lookups bypass the metadata cache's in-flight deduplication).
+    """
+    waiting = object()
+    results = [waiting] * len(sources)
+    executor = _get_metadata_executor()
+    pending = {executor.submit(lookup): i for i, (_, lookup) in enumerate(sources)}
+    hedge_at = time.monotonic() + hedge_after if hedge_after else None
+    try:
+        while True:
+            for result in results:
+                if result is waiting:
+                    break
+                if result:
+                    return result
+            else:
+                return None
+
+            timeout = max(0, hedge_at - time.monotonic()) if hedge_at else None
+            done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            for future in done:
+                i = pending.pop(future)
+                if results[i] is waiting:
+                    results[i] = future.result()
+
+            if hedge_at and time.monotonic() >= hedge_at:
+                hedge_at = None
+                for i, (name, lookup) in enumerate(sources):
+                    if results[i] is waiting:
+                        logger.debug(f"Hedging slow metadata request to {name}")
+                        pending[executor.submit(lookup, hedge=True)] = i
+    finally:
+        for future in pending:
+            future.cancel()
+
+def get_media_metadata(title, settings):
+    """
+    Fetch media info from TMDb/OMDb/AniList.
+    Priority: AniList for anime (after TMDb when preferred_anime_source is
+    "tmdb"), then TMDb, then OMDb when enable_omdb_fallback is set. With
+    metadata_fanout (off by default, since it spends OMDb/AniList quota on
+    titles TMDb alone would answer) the sources are queried at once.
+    """
+    if not settings.get("tmdb_api_key"):
+        return None
+
+    sources = _metadata_sources(title, settings)
+    if settings.get("metadata_fanout", False) and len(sources) > 1:
+        return _fan_out(sources, hedge_after=settings.get("metadata_hedge_after", 0))
+
+    for name, lookup in sources:
+        info = lookup()
         if info:
             return info
-    
-    # Fall back to TMDb/OMDb
-    info = fetch_tmdb_info(title, settings["tmdb_api_key"])
-    if not info and settings.get("enable_omdb_fallback") and settings.get("omdb_api_key"):
-        info = fetch_omdb_info(title, settings["omdb_api_key"])
-    return info
+    return None
 
 def extract_existing_links(content):
     """Enhanced link extraction with configured host patterns"""
@@ -706,347 +932,781 @@ def extract_tags_from_title(title):
         logger.warning(f"Using fallback tag: {fallback_tag}")
         return [fallback_tag] if fallback_tag else []
     
-def process_upload(link, filename, settings, thumbnail_path=None):
+def _prepare_upload(link, filename, settings, thumbnail_path=None, extra_links=None):
+    """
+    Parse the filename and load local state for one upload (no network calls).
+    Returns the job dict the other stages work on, or None when the release
+    is still waiting for its other primary host link.
+    """
+    # Add error handling for loading cache files
     try:
-        logger.info(f"Starting upload process for {filename}")
+        posted_cache = load_json(POSTED_CACHE)
+    except Exception as e:
+        logger.error(f"Failed to load posted cache: {e}")
+        posted_cache = {}
         
-        # Add error handling for loading cache files
-        try:
-            posted_cache = load_json(POSTED_CACHE)
-        except Exception as e:
-            logger.error(f"Failed to load posted cache: {e}")
-            posted_cache = {}
-            
-        try:
-            pending_links = load_json(PENDING_LINKS)
-        except Exception as e:
-            logger.error(f"Failed to load pending links: {e}")
-            pending_links = {}
-
-        # First get the cleaned title and raw name
-        cleaned_title, raw_name = clean_title(filename)
-        season, episode = detect_season_episode(raw_name)
-        base_name = os.path.splitext(os.path.basename(filename))[0]
+    try:
+        pending_links = load_json(PENDING_LINKS)
+    except Exception as e:
+        logger.error(f"Failed to load pending links: {e}")
+        pending_links = {}
 
-        # THEN check if we have both primary hosts when required
-        if settings.get("require_both_hosts", True):
-            primary_hosts = get_primary_hosts()
-            if len(primary_hosts) >= 2:
-                host = detect_host(link)
-                if raw_name in pending_links:
-                    existing_hosts = set(pending_links[raw_name].keys())
-                else:
-                    existing_hosts = set()
+    # First get the cleaned title and raw name
+    cleaned_title, raw_name = clean_title(filename)
+    season, episode = detect_season_episode(raw_name)
+
+    links = [link] + [l for l in (extra_links or []) if l and l != link]
+
+    def track_link(data):
+        entry = data.setdefault(raw_name, {})
+        for l in links:
+            entry[detect_host(l)] = l
+
+    # THEN check if we have both primary hosts when required
+    if settings.get("require_both_hosts", True):
+        primary_hosts = get_primary_hosts()
+        if len(primary_hosts) >= 2:
+            if raw_name in pending_links:
+                existing_hosts = set(pending_links[raw_name].keys())
+            else:
+                existing_hosts = set()
+            
+            existing_hosts.update(detect_host(l) for l in links)
+            
+            # Check if we have both primary hosts
+            has_both = all(h in existing_hosts for h in primary_hosts[:2])
+            if not has_both:
+                logger.info(f"Skipping upload - require_both_hosts is True but only have {existing_hosts}")
+                log_to_csv(raw_name or "Unknown", link or "None", "Skipped", "⏳ Waiting for both primary hosts")
                 
-                existing_hosts.add(host)
+                # Store the pending link for future use
+                update_json(PENDING_LINKS, track_link)
                 
-                # Check if we have both primary hosts
-                has_both = all(h in existing_hosts for h in primary_hosts[:2])
-                if not has_both:
-                    logger.info(f"Skipping upload - require_both_hosts is True but only have {existing_hosts}")
-                    log_to_csv(raw_name or "Unknown", link or "None", "Skipped", "⏳ Waiting for both primary hosts")
-                    
-                    # Store the pending link for future use
-                    if raw_name not in pending_links:
-                        pending_links[raw_name] = {}
-                    pending_links[raw_name][host] = link
-                    save_json(PENDING_LINKS, pending_links)
-                    
-                    return  # Exit without posting
-
-        # Rest of your existing process_upload function continues here...
-        quality = "4K" if "2160p" in filename.lower() else \
-                "HD" if "1080p" in filename.lower() else \
-                "SD" if "720p" in filename.lower() else \
-                "LD" if "480p" in filename.lower() else ""
-
-        title = raw_name
-        media_type = "tv_episode" if season and episode else "movie"
-        if any(x in filename.lower() for x in ["anime", "episode", "season"]):
-            media_type = "anime"
-        is_anime = (
-            any(x in filename.lower() for x in ["anime", "episode", "season"]) or
-            "[SubsPlease]" in filename  # Common anime release group
+                return None  # Exit without posting
+
+    quality = "4K" if "2160p" in filename.lower() else \
+            "HD" if "1080p" in filename.lower() else \
+            "SD" if "720p" in filename.lower() else \
+            "LD" if "480p" in filename.lower() else ""
+
+    media_type = "tv_episode" if season and episode else "movie"
+    if any(x in filename.lower() for x in ["anime", "episode", "season"]):
+        media_type = "anime"
+    is_anime = is_anime_file(filename)
+    if is_anime:
+        media_type = "anime"
+
+    wp = {
+        "url": settings["wp_url"],
+        "user": settings["wp_user"],
+        "pass": settings["wp_app_password"]
+    }
+
+    return {
+        "link": link,
+        "filename": filename,
+        "settings": settings,
+        "thumbnail_path": thumbnail_path,
+        "posted_cache": posted_cache,
+        "pending_links": pending_links,
+        "track_link": track_link,
+        "cleaned_title": cleaned_title,
+        "raw_name": raw_name,
+        "season": season,
+        "episode": episode,
+        "quality": quality,
+        "title": raw_name,
+        "media_type": media_type,
+        "is_anime": is_anime,
+        "meta": None,
+        "wp": wp,
+        "auth": HTTPBasicAuth(wp["user"], wp["pass"]),
+        "media_id": None,
+        "thumbnail": "",
+        "existing_post_id": None,
+        "category_ids": [],
+        "tag_ids": []
+    }
+
+def is_anime_file(filename):
+    return (
+        any(x in filename.lower() for x in ["anime", "episode", "season"]) or
+        "[SubsPlease]" in filename  # Common anime release group
+    )
+
+def prefetch_anilist(items, settings):
+    """
+    Resolve the AniList lookups that _stage_metadata will make for these queue
+    items in batched requests, so the uploads themselves hit the metadata cache.
+    """
+    if not (settings.get("enable_anilist") and settings.get("tmdb_api_key")):
+        return
+    titles = []
+    for item in items:
+        cleaned_title, raw_name = clean_title(item["filename"])
+        candidates = ([raw_name] if is_anime_file(item["filename"]) else []) + [cleaned_title]
+        titles.extend(
+            title for title in candidates
+            if any(name == "anilist" for name, _ in _metadata_sources(title, settings))
         )
+    if len(set(titles)) > 1:
+        fetch_anilist_batch(titles)
 
-        if is_anime:
-            # Use Romaji title if available, otherwise default to cleaned title
-            meta = get_media_metadata(title, settings)
-            title = meta.get("romaji_title") if meta else title
-            media_type = "anime"
-            
-        meta = get_media_metadata(cleaned_title, settings) if settings.get("skip_tmdb_if_unrecognized", True) else None
+def _stage_metadata(job):
+    """Look up TMDb/OMDb/AniList metadata (and the Romaji title for anime)"""
+    settings = job["settings"]
+    if job["is_anime"]:
+        # Use Romaji title if available, otherwise default to cleaned title
+        meta = get_media_metadata(job["title"], settings)
+        job["title"] = (meta.get("romaji_title") if meta else None) or job["title"]
+        
+    job["meta"] = get_media_metadata(job["cleaned_title"], settings) if settings.get("skip_tmdb_if_unrecognized", True) else None
 
-        wp = {
-            "url": settings["wp_url"],
-            "user": settings["wp_user"],
-            "pass": settings["wp_app_password"]
-        }
-        auth = HTTPBasicAuth(wp["user"], wp["pass"])
+def _stage_find_poster(job):
+    """FEATURED IMAGE, part 1: existing WP media (needs only the parsed filename)"""
+    settings, wp, auth = job["settings"], job["wp"], job["auth"]
+    cleaned_title = job["cleaned_title"]
+    media_id = None
 
-        # FEATURED IMAGE: TMDb/OMDb or existing WP media
-        thumbnail = ""
-        media_id = None
+    if settings.get("include_thumbnails"):
+        # Create search title without adding _poster suffix yet
+        search_title = re.sub(r'[^\w\-_. ]', '', cleaned_title.replace(" ", "_").lower())
+        
+        # Let find_existing_media handle the _poster suffix addition
+        logger.debug(f"Checking for existing media for: {search_title}")
+        media_id, media_url = find_existing_media(search_title, wp, auth)
+        
+        if media_id:
+            logger.info(f"Found existing media for {search_title} (ID: {media_id}, URL: {media_url})")
 
-        if settings.get("include_thumbnails"):
-            # Create search title without adding _poster suffix yet
-            search_title = re.sub(r'[^\w\-_. ]', '', cleaned_title.replace(" ", "_").lower())
-            
-            # Let find_existing_media handle the _poster suffix addition
-            logger.debug(f"Checking for existing media for: {search_title}")
-            media_id, media_url = find_existing_media(search_title, wp, auth)
-            
-            if media_id:
-                logger.info(f"Found existing media for {search_title} (ID: {media_id}, URL: {media_url})")
-                thumbnail = f'<img src="{media_url}" alt="{cleaned_title}">'
-            else:
-                # Only proceed with new upload if no existing poster found
-                logger.debug("No existing poster found, attempting metadata image")
-                img_path = None
-                local_img_path = None
+    job["media_id"] = media_id
 
-                try:
-                    if meta:
-                        img_path = (
-                            meta.get("backdrop_path") if settings.get("preferred_image") == "backdrop"
-                            else meta.get("poster_path")
-                        ) or meta.get("poster_path") or meta.get("backdrop_path")
-
-                        if not img_path and settings.get("enable_omdb_fallback"):
-                            img_path = meta.get("poster_path")
-
-                    img_url = None
-                    if img_path:
-                        if img_path.startswith("/"):
-                            img_url = f"https://image.tmdb.org/t/p/w780{img_path}"
-                        else:
-                            img_url = img_path
-
-                    if img_url and img_url.startswith("http"):
-                        logger.debug(f"Attempting to download featured image from: {img_url}")
-
-                        safe_name = re.sub(r'[^\w\-_. ]', '', cleaned_title.replace(" ", "_").lower())
-                        local_img_path = os.path.join("log", f"{safe_name}_poster.jpg")
-
-                        try:
-                            with requests.get(img_url, stream=True, timeout=15) as r:
-                                r.raise_for_status()
-                                content_length = int(r.headers.get('content-length', 0))
-                                if content_length > 5 * 1024 * 1024:
-                                    raise ValueError(f"Image too large: {content_length} bytes")
-
-                                os.makedirs(os.path.dirname(local_img_path), exist_ok=True)
-                                with open(local_img_path, "wb") as img_file:
-                                    for chunk in r.iter_content(8192):
-                                        img_file.write(chunk)
-
-                            if os.path.exists(local_img_path):
-                                # Upload with _poster suffix in filename
-                                media_id, media_url = upload_media_to_wp(local_img_path, wp, auth)
-                                thumbnail = f'<img src="{media_url}" alt="{cleaned_title}">'
-                                logger.info(f"Uploaded new poster image to WordPress (ID: {media_id})")
-                            else:
-                                logger.warning(f"Downloaded image not found: {local_img_path}")
-
-                        except Exception as e:
-                            logger.warning(f"Failed to download or upload featured image: {e}")
+def _stage_featured_image(job):
+    """FEATURED IMAGE, part 2: upload the TMDb/OMDb image when no WP media exists"""
+    settings, wp, auth = job["settings"], job["wp"], job["auth"]
+    cleaned_title, meta = job["cleaned_title"], job["meta"]
+    media_id = job["media_id"]
+
+    if settings.get("include_thumbnails"):
+        if not media_id:
+            # Only proceed with new upload if no existing poster found
+            logger.debug("No existing poster found, attempting metadata image")
+            img_path = None
+
+            try:
+                if meta:
+                    img_path = (
+                        meta.get("backdrop_path") if settings.get("preferred_image") == "backdrop"
+                        else meta.get("poster_path")
+                    ) or meta.get("poster_path") or meta.get("backdrop_path")
+
+                    if not img_path and settings.get("enable_omdb_fallback"):
+                        img_path = meta.get("poster_path")
+
+                max_width = int(settings.get("poster_max_width", 780))
+                img_url = None
+                if img_path:
+                    if img_path.startswith("/"):
+                        # TMDb path: ask for the rendition that fits max_width
+                        kind = "backdrop" if img_path == meta.get("backdrop_path") else "poster"
+                        img_url = tmdb_image_url(img_path, max_width, kind)
                     else:
-                        logger.debug("No valid image URL available for download.")
+                        img_url = img_path
 
-                except Exception as e:
-                    logger.warning(f"Failed to upload featured image: {e}")
-                finally:
-                    if local_img_path and os.path.exists(local_img_path):
-                        try:
-                            os.remove(local_img_path)
-                        except Exception:
-                            pass
-
-        # Determine if this is a new post
-        is_new_post = raw_name not in posted_cache
-
-        # THUMBNAIL for post body
-        thumbnail = ""
-        if is_new_post and settings.get("include_thumbnails"):
-            # 1. Check WordPress for existing thumbnail using base pattern
-            base_name = os.path.splitext(os.path.basename(filename))[0]
-            base_pattern = re.sub(r'\.\d{3,4}p\..*$', '', base_name)
-            thumb_id, thumb_url = find_existing_media(base_pattern, wp, auth, is_thumbnail=True)
-            
-            if thumb_url and "_thumb_1" in thumb_url.lower():
-                thumbnail = f'<img src="{thumb_url}" alt="{cleaned_title}">'
-                logger.info(f"Reusing existing WordPress thumbnail: {os.path.basename(thumb_url)}")
-            else:
-                # 2. If no WordPress thumb found, check local folders
-                if settings.get("thumbnail_folder") and os.path.isdir(settings["thumbnail_folder"]):
-                    thumb_folder = settings["thumbnail_folder"]
-                else:
-                    # Fallback to video file's folder
-                    thumb_folder = os.path.dirname(filename) if os.path.isabs(filename) else os.path.join(SCRIPT_DIR, os.path.dirname(filename))
+                if img_url and img_url.startswith("http"):
+                    logger.debug(f"Attempting to download featured image from: {img_url}")
+
+                    safe_name = re.sub(r'[^\w\-_. ]', '', cleaned_title.replace(" ", "_").lower())
 
-                local_thumb = find_local_thumbnail(thumb_folder, filename)
-                
-                
-                if local_thumb:
                     try:
-                        _, wp_thumb_url = upload_media_to_wp(local_thumb, wp, auth)
-                        thumbnail = f'<img src="{wp_thumb_url}" alt="{cleaned_title}">'
-                        logger.info(f"Uploaded new thumbnail from local folder: {os.path.basename(local_thumb)}")
+                        # Kept in memory and uploaded from there; nothing is written to disk
+                        data, _ = download_image(img_url)
+                        # Width is what poster_max_width limits; any poster/backdrop height fits
+                        data, ext = image_engine.resize(data, (max_width, max_width * 3))
+                        # Upload with _poster suffix in filename
+                        media_id, media_url = upload_media_bytes(data, f"{safe_name}_poster{ext}", wp, auth)
+                        logger.info(f"Uploaded new poster image to WordPress (ID: {media_id})")
+
                     except Exception as e:
-                        logger.warning(f"Failed to upload local thumbnail: {e}")
+                        logger.warning(f"Failed to download or upload featured image: {e}")
                 else:
-                    logger.debug("No local thumbnail found - proceeding without one")
-                    
-        # TEMPLATE VARS
-        primary_hosts = get_primary_hosts()
-        template_vars = {
-            "title": cleaned_title,
-            "full_title": f"{cleaned_title} S{season:02d}E{episode:02d}" if season and episode else cleaned_title,
-            "season": season,
-            "episode": episode,
-            "quality": quality,
-            "overview": meta.get("overview") if meta else "",
-            "rating": meta.get("rating") if meta else "",
-            "year": meta.get("year") if meta else "",
-            "release_date": meta.get("release_date") if meta else "",
-            "thumbnail": thumbnail,
-            **{f"{host}_link": "" for host in primary_hosts},
-            "host_links": ""
+                    logger.debug("No valid image URL available for download.")
+
+            except Exception as e:
+                logger.warning(f"Failed to upload featured image: {e}")
+
+    job["media_id"] = media_id
+
+def _stage_body_thumbnail(job):
+    """THUMBNAIL for post body (only for new posts)"""
+    settings, wp, auth = job["settings"], job["wp"], job["auth"]
+    filename, cleaned_title = job["filename"], job["cleaned_title"]
+
+    # Determine if this is a new post
+    is_new_post = job["raw_name"] not in job["posted_cache"]
+
+    thumbnail = ""
+    if is_new_post and settings.get("include_thumbnails"):
+        # 1. Check WordPress for existing thumbnail using base pattern
+        base_name = os.path.splitext(os.path.basename(filename))[0]
+        base_pattern = re.sub(r'\.\d{3,4}p\..*$', '', base_name)
+        thumb_id, thumb_url = find_existing_media(base_pattern, wp, auth, is_thumbnail=True)
+        
+        if thumb_url and "_thumb_1" in thumb_url.lower():
+            thumbnail = f'<img src="{thumb_url}" alt="{cleaned_title}">'
+            logger.info(f"Reusing existing WordPress thumbnail: {os.path.basename(thumb_url)}")
+        else:
+            # 2. If no WordPress thumb found, check local folders
+            if settings.get("thumbnail_folder") and os.path.isdir(settings["thumbnail_folder"]):
+                thumb_folder = settings["thumbnail_folder"]
+            else:
+                # Fallback to video file's folder
+                thumb_folder = os.path.dirname(filename) if os.path.isabs(filename) else os.path.join(SCRIPT_DIR, os.path.dirname(filename))
+
+            local_thumb = find_local_thumbnail(thumb_folder, filename)
+            
+            if local_thumb:
+                try:
+                    # Shrunk (and re-encoded per image_format) by the image engine, then uploaded from memory
+                    data, ext = resize_image(local_thumb)
+                    thumb_name = os.path.splitext(os.path.basename(local_thumb))[0] + ext
+                    _, wp_thumb_url = upload_media_bytes(data, thumb_name, wp, auth)
+                    thumbnail = f'<img src="{wp_thumb_url}" alt="{cleaned_title}">'
+                    logger.info(f"Uploaded new thumbnail from local folder: {os.path.basename(local_thumb)}")
+                except Exception as e:
+                    logger.warning(f"Failed to upload local thumbnail: {e}")
+            else:
+                logger.debug("No local thumbnail found - proceeding without one")
+
+    job["thumbnail"] = thumbnail
+
+def _stage_build_body(job):
+    """Record the host links and render the post body from the template"""
+    settings, meta = job["settings"], job["meta"]
+    cleaned_title, raw_name = job["cleaned_title"], job["raw_name"]
+    season, episode = job["season"], job["episode"]
+
+    # TEMPLATE VARS
+    primary_hosts = get_primary_hosts()
+    template_vars = {
+        "title": cleaned_title,
+        "full_title": f"{cleaned_title} S{season:02d}E{episode:02d}" if season and episode else cleaned_title,
+        "season": season,
+        "episode": episode,
+        "quality": job["quality"],
+        "overview": meta.get("overview") if meta else "",
+        "rating": meta.get("rating") if meta else "",
+        "year": meta.get("year") if meta else "",
+        "release_date": meta.get("release_date") if meta else "",
+        "thumbnail": job["thumbnail"],
+        **{f"{host}_link": "" for host in primary_hosts},
+        "host_links": ""
+    }
+
+    # HOST LINK TRACKING
+    pending_links = update_json(PENDING_LINKS, job["track_link"])
+    job["pending_links"] = pending_links
+
+    if raw_name in pending_links:
+        update_data = {
+            f"{host}_link": pending_links[raw_name].get(host, "")
+            for host in get_primary_hosts()
         }
+        update_data["host_links"] = "\n".join(
+            v for k, v in pending_links[raw_name].items()
+            if k not in get_primary_hosts()
+        )
+        template_vars.update(update_data)
 
-        # HOST LINK TRACKING
-        host = detect_host(link)
-        if raw_name not in pending_links:
-            pending_links[raw_name] = {}
-        pending_links[raw_name][host] = link
-        save_json(PENDING_LINKS, pending_links)
+    if not all(isinstance(x, str) and len(x) > 0 for x in (cleaned_title, raw_name)):
+        raise ValueError(f"Invalid title components from filename: {job['filename']}")
 
-        if raw_name in pending_links:
-            update_data = {
-                f"{host}_link": pending_links[raw_name].get(host, "")
-                for host in get_primary_hosts()
-            }
-            update_data["host_links"] = "\n".join(
-                v for k, v in pending_links[raw_name].items()
-                if k not in get_primary_hosts()
-            )
-            template_vars.update(update_data)
+    # APPLY TEMPLATE
+    body = apply_template(job["media_type"], template_vars, settings)
+    logger.debug(f"Template vars: {json.dumps(template_vars, indent=2)}")
+    logger.debug(f"Generated body: {body[:500]}...")
 
-        if not all(isinstance(x, str) and len(x) > 0 for x in (cleaned_title, raw_name)):
-            raise ValueError(f"Invalid title components from filename: {filename}")
+    job["template_vars"] = template_vars
+    job["body"] = body
 
-        # APPLY TEMPLATE
-        body = apply_template(media_type, template_vars, settings)
-        logger.debug(f"Template vars: {json.dumps(template_vars, indent=2)}")
-        logger.debug(f"Generated body: {body[:500]}...")
+def _stage_find_post(job):
+    job["existing_post_id"] = find_existing_post(job["title"], job["wp"], job["auth"], job["settings"])
 
-        posted_cache_key = raw_name
+def _stage_categories(job):
+    settings, cleaned_title = job["settings"], job["cleaned_title"]
+    # Prepare categories
+    all_categories = settings.get("categories", [])
+    if cleaned_title not in all_categories:
+        all_categories = [cleaned_title] + all_categories
+    job["category_ids"] = resolve_terms(job["wp"], job["auth"], all_categories, "categories")
 
-        # CREATE OR UPDATE POST
-        existing_post_id = find_existing_post(title, wp, auth, settings)
+def _stage_tags(job):
+    settings = job["settings"]
+    # Prepare tags
+    cleaned_tag = clean_tag_string(job["cleaned_title"])
+    raw_tags = extract_tags_from_title(job["filename"])
+    # Combine cleaned title tag with extracted tags and any settings tags
+    all_tags = list(set([cleaned_tag] + raw_tags + settings.get("tags", [])))
+    job["tag_ids"] = resolve_terms(job["wp"], job["auth"], all_tags, taxonomy="tags")
 
-        # Prepare categories
-        all_categories = settings.get("categories", [])
-        if cleaned_title not in all_categories:
-            all_categories = [cleaned_title] + all_categories
-        category_ids = resolve_terms(wp, auth, all_categories, "categories")
+def _rest_error_code(e):
+    """WordPress error code ("rest_...") of a failed request, or None"""
+    response = getattr(e, "response", None)
+    if response is None:
+        return None
+    try:
+        return response.json().get("code") or ""
+    except ValueError:
+        return ""
+
+def _stage_publish(job):
+    """CREATE OR UPDATE POST and clear the release from pending links once complete"""
+    settings, wp, auth = job["settings"], job["wp"], job["auth"]
+    title, link, raw_name = job["title"], job["link"], job["raw_name"]
+    posted_cache, pending_links = job["posted_cache"], job["pending_links"]
+    template_vars, body, media_type = job["template_vars"], job["body"], job["media_type"]
+    existing_post_id = job["existing_post_id"]
 
-        # Prepare tags
-        cleaned_tag = clean_tag_string(cleaned_title)
-        raw_tags = extract_tags_from_title(filename)
-        # Combine cleaned title tag with extracted tags and any settings tags
-        all_tags = list(set([cleaned_tag] + raw_tags + settings.get("tags", [])))
-        tag_ids = resolve_terms(wp, auth, all_tags, taxonomy="tags")
+    posted_cache_key = raw_name
+
+    if existing_post_id is None:
+        # New post creation
+        site = wp['url'].rstrip('/')
+        post_args = dict(
+            title=title,
+            content=body,
+            wp=wp,
+            auth=auth,
+            status=settings.get("post_status", "publish"),
+            categories=job["category_ids"],
+            tags=job["tag_ids"]
+        )
+        try:
+            try:
+                wp_post_url = create_post_wp(media_id=job["media_id"], **post_args)
+            except RequestException as e:
+                if not job["media_id"] or _rest_error_code(e) != "rest_invalid_featured_media":
+                    raise
+                # The poster was deleted on the site after it was indexed
+                logger.warning(f"Featured media {job['media_id']} no longer exists, posting without it")
+                get_media_index().remove(site, job["media_id"])
+                job["media_id"] = None
+                wp_post_url = create_post_wp(media_id=None, **post_args)
+        except RequestException as e:
+            if getattr(e, "response", None) is not None and e.response.status_code == 400:
+                # Possibly a stale cached term ID - force the term listings to refresh
+                term_cache.invalidate(site, "categories", term_ids=job["category_ids"])
+                term_cache.invalidate(site, "tags", term_ids=job["tag_ids"])
+            raise
         
-        if existing_post_id is None:
-            # New post creation
-            wp_post_url = create_post_wp(
-            
-                title=title,  # Changed from post_title to title
-                content=body,  # Changed from post_body to body
-                wp=wp,
-                auth=auth,
-                media_id=media_id,  # Also changed from featured_image_id to media_id
-                status=settings.get("post_status", "publish"),
-                categories=category_ids,
-                tags=tag_ids
-            )
-            
-            posted_cache[posted_cache_key] = existing_post_id
-            save_json(POSTED_CACHE, posted_cache)
-            log_to_csv(title, link, wp_post_url, "✅ Posted")
-        else:
-            # Update existing post
-            logger.info(f"Found existing post ID: {existing_post_id}")
-            
-            # Check if this is a different instance trying to create a duplicate
-            if posted_cache_key in posted_cache and posted_cache[posted_cache_key] != existing_post_id:
-                logger.warning(f"Duplicate post detected! Original ID: {posted_cache[posted_cache_key]}, New ID: {existing_post_id}")
-                # Merge the content and delete the duplicate
-                try:
-                    # Get content from both posts
-                    original_post = requests.get(
-                        f"{wp['url'].rstrip('/')}/wp-json/wp/v2/posts/{posted_cache[posted_cache_key]}", 
-                        auth=auth
-                    ).json()
-                    duplicate_post = requests.get(
-                        f"{wp['url'].rstrip('/')}/wp-json/wp/v2/posts/{existing_post_id}", 
+        posted_cache[posted_cache_key] = existing_post_id
+        update_json(POSTED_CACHE, lambda data: data.update({posted_cache_key: existing_post_id}))
+        log_to_csv(title, link, wp_post_url, "✅ Posted")
+    else:
+        # Update existing post
+        logger.info(f"Found existing post ID: {existing_post_id}")
+        
+        # Check if this is a different instance trying to create a duplicate
+        if posted_cache_key in posted_cache and posted_cache[posted_cache_key] != existing_post_id:
+            logger.warning(f"Duplicate post detected! Original ID: {posted_cache[posted_cache_key]}, New ID: {existing_post_id}")
+            # Merge the content and delete the duplicate
+            try:
+                # Get content from both posts
+                original_post = http_client.get(
+                    "wordpress",
+                    f"{wp['url'].rstrip('/')}/wp-json/wp/v2/posts/{posted_cache[posted_cache_key]}", 
+                    auth=auth
+                ).json()
+                duplicate_post = http_client.get(
+                    "wordpress",
+                    f"{wp['url'].rstrip('/')}/wp-json/wp/v2/posts/{existing_post_id}", 
+                    auth=auth
+                ).json()
+                
+                # Merge links
+                original_links = extract_existing_links(original_post['content']['rendered'])
+                duplicate_links = extract_existing_links(duplicate_post['content']['rendered'])
+                
+                # Combine links, preferring original where both exist
+                merged_links = {
+                    "rapidgator": original_links.get("rapidgator") or duplicate_links.get("rapidgator"),
+                    "nitroflare": original_links.get("nitroflare") or duplicate_links.get("nitroflare"),
+                    "other": list(set(original_links.get("other", []) + duplicate_links.get("other", [])))
+                }
+                
+                # Update the original post with merged content
+                template_vars.update({
+                    "rapidgator_link": merged_links["rapidgator"] or "",
+                    "nitroflare_link": merged_links["nitroflare"] or "",
+                    "host_links": "\n".join(merged_links["other"]),
+                    "thumbnail": original_post.get('thumbnail') or duplicate_post.get('thumbnail')
+                })
+                
+                merged_body = apply_template(media_type, template_vars, settings)
+                update_post_wp(posted_cache[posted_cache_key], merged_body, wp, auth)
+                
+                # Delete the duplicate post if allowed
+                if settings.get("allow_post_deletion", False):
+                    http_client.delete(
+                        "wordpress",
+                        f"{wp['url'].rstrip('/')}/wp-json/wp/v2/posts/{existing_post_id}?force=true",
                         auth=auth
-                    ).json()
-                    
-                    # Merge links
-                    original_links = extract_existing_links(original_post['content']['rendered'])
-                    duplicate_links = extract_existing_links(duplicate_post['content']['rendered'])
-                    
-                    # Combine links, preferring original where both exist
-                    merged_links = {
-                        "rapidgator": original_links.get("rapidgator") or duplicate_links.get("rapidgator"),
-                        "nitroflare": original_links.get("nitroflare") or duplicate_links.get("nitroflare"),
-                        "other": list(set(original_links.get("other", []) + duplicate_links.get("other", [])))
-                    }
-                    
-                    # Update the original post with merged content
-                    template_vars.update({
-                        "rapidgator_link": merged_links["rapidgator"] or "",
-                        "nitroflare_link": merged_links["nitroflare"] or "",
-                        "host_links": "\n".join(merged_links["other"]),
-                        "thumbnail": original_post.get('thumbnail') or duplicate_post.get('thumbnail')
-                    })
-                    
-                    merged_body = apply_template(media_type, template_vars, settings)
-                    update_post_wp(posted_cache[posted_cache_key], merged_body, wp, auth)
-                    
-                    # Delete the duplicate post if allowed
-                    if settings.get("allow_post_deletion", False):
-                        requests.delete(
-                            f"{wp['url'].rstrip('/')}/wp-json/wp/v2/posts/{existing_post_id}?force=true",
-                            auth=auth
-                        )
-                        logger.info(f"Deleted duplicate post ID: {existing_post_id}")
-                    
-                    log_to_csv(title, f"Merged: {link}", wp_post_url, "🔄 Merged duplicate posts")
-                    return
-                    
-                except Exception as e:
-                    logger.error(f"Failed to merge duplicate posts: {str(e)}")
-            
-            # Normal update case
-            wp_post_url = update_post_wp(existing_post_id, body, wp, auth)
-            posted_cache[posted_cache_key] = existing_post_id
-            save_json(POSTED_CACHE, posted_cache)
-            log_to_csv(title, f"Updated: {link}", wp_post_url, "🔄 Updated with new links")
-
-        if (posted_cache_key in posted_cache and
-                all(h in pending_links.get(raw_name, {}) for h in get_primary_hosts())):
-            if raw_name in pending_links:
-                del pending_links[raw_name]
-                save_json(PENDING_LINKS, pending_links)
+                    )
+                    logger.info(f"Deleted duplicate post ID: {existing_post_id}")
+                
+                log_to_csv(title, f"Merged: {link}", wp_post_url, "🔄 Merged duplicate posts")
+                return
+                
+            except Exception as e:
+                logger.error(f"Failed to merge duplicate posts: {str(e)}")
+        
+        # Normal update case
+        wp_post_url = update_post_wp(existing_post_id, body, wp, auth)
+        posted_cache[posted_cache_key] = existing_post_id
+        update_json(POSTED_CACHE, lambda data: data.update({posted_cache_key: existing_post_id}))
+        log_to_csv(title, f"Updated: {link}", wp_post_url, "🔄 Updated with new links")
+
+    if (posted_cache_key in posted_cache and
+            all(h in pending_links.get(raw_name, {}) for h in get_primary_hosts())):
+        if raw_name in pending_links:
+            del pending_links[raw_name]
+            update_json(PENDING_LINKS, lambda data: data.pop(raw_name, None))
+
+def _upload_stages(job):
+    """
+    Stage graph of one upload: stage -> (function, stages it waits for).
+    Everything that only needs the parsed filename starts at once; the
+    featured image upload and the body wait for metadata, and the post
+    lookup does too for anime (metadata replaces the title with the Romaji one).
+    """
+    return {
+        "metadata": (_stage_metadata, ()),
+        "find_poster": (_stage_find_poster, ()),
+        "body_thumbnail": (_stage_body_thumbnail, ()),
+        "categories": (_stage_categories, ()),
+        "tags": (_stage_tags, ()),
+        "find_post": (_stage_find_post, ("metadata",) if job["is_anime"] else ()),
+        "featured_image": (_stage_featured_image, ("metadata", "find_poster")),
+        "build_body": (_stage_build_body, ("metadata", "body_thumbnail")),
+        "publish": (_stage_publish, ("featured_image", "build_body", "find_post", "categories", "tags")),
+    }
+
+# Executor threads one upload keeps busy at most (its widest set of independent stages)
+UPLOAD_DAG_WIDTH = max(stage_width(_upload_stages({"is_anime": anime})) for anime in (False, True))
+
+async def process_upload_async(link, filename, settings, thumbnail_path=None, extra_links=None):
+    """
+    Create or update the post for one release.
+    extra_links are further host links for the same file (coalesced queue items);
+    they are merged into the same post write as link.
+    Each blocking stage runs on the pipeline's thread pool, so one event loop can
+    keep many uploads in flight; http_client bounds concurrency per upstream.
+    Independent stages of the upload run concurrently (see _upload_stages).
+    """
+    raw_name = None
+    try:
+        logger.info(f"Starting upload process for {filename}")
+        job = await run_blocking(_prepare_upload, link, filename, settings, thumbnail_path, extra_links)
+        if job is None:
+            return
+        raw_name = job["raw_name"]
+
+        await run_stages(_upload_stages(job), job)
 
     except Exception as e:
         logger.error(f"Upload failed: {str(e)}", exc_info=True)
         log_to_csv(raw_name or "Unknown", link or "None", "Failed", f"❌ Error: {str(e)}")
         raise
+
+def process_upload(link, filename, settings, thumbnail_path=None, extra_links=None):
+    """Synchronous entry point for process_upload_async()"""
+    return run_pipeline(process_upload_async(link, filename, settings, thumbnail_path, extra_links),
+                        max_threads=UPLOAD_DAG_WIDTH)
         
+async def _process_queue_item_async(store, items, config):
+    """
+    Upload one claimed release (one or more coalesced queue items) and complete
+    or fail its items. Returns True on success.
+    """
+    head = items[0]
+    extra_links = [item['link'] for item in items[1:]]
+    thumbnail_path = next((item['thumbnail_path'] for item in items if item.get('thumbnail_path')), None)
+    try:
+        if extra_links:
+            logger.info(f"Processing {len(items)} coalesced links for: {head['filename']}")
+        else:
+            logger.info(f"Processing link for: {head['filename']}")
+        await process_upload_async(
+            head['link'],
+            head['filename'],
+            config,
+            thumbnail_path,
+            extra_links=extra_links
+        )
+        # Remove the processed items
+        for item in items:
+            await run_blocking(store.complete, item['id'])
+        logger.info(f"Successfully processed: {head['filename']}")
+        return True
+    except Exception as e:
+        logger.error(f"Failed to process queued link: {str(e)}")
+        # Back off before retrying; items that keep failing end up in dead letters
+        for item in items:
+            await run_blocking(store.fail, item['id'], e)
+        return False
+
+def _process_queue_item(runner, store, items, config):
+    """_process_queue_item_async() on the drain's shared EventLoopThread"""
+    return runner.run(_process_queue_item_async(store, items, config))
+
+# Workers per stage of the staged engine (pipeline_workers in settings overrides these)
+PIPELINE_WORKERS = {"parse": 2, "enrich": 8, "media": 4, "publish": 4}
+
+def _pipeline_parse(job):
+    """parse: filename -> title, season/episode, quality; drops releases still waiting for hosts"""
+    items = job["items"]
+    head = items[0]
+    logger.info(f"Starting upload process for {head['filename']}")
+    upload = _prepare_upload(
+        head['link'],
+        head['filename'],
+        job["settings"],
+        next((item['thumbnail_path'] for item in items if item.get('thumbnail_path')), None),
+        extra_links=[item['link'] for item in items[1:]]
+    )
+    if upload is None:
+        return False
+    job.update(upload)
+    return True
+
+def _pipeline_enrich(job):
+    """enrich: TMDb/AniList/OMDb metadata"""
+    _stage_metadata(job)
+    return True
+
+def _pipeline_media(job):
+    """media: featured image and body thumbnail"""
+    _stage_find_poster(job)
+    _stage_featured_image(job)
+    _stage_body_thumbnail(job)
+    return True
+
+def _pipeline_publish(job):
+    """publish: body, terms and the post write"""
+    _stage_build_body(job)
+    _stage_find_post(job)
+    _stage_categories(job)
+    _stage_tags(job)
+    _stage_publish(job)
+    return True
+
+def _process_queue_staged(store, config, window, min_age):
+    """
+    Drain the queue through parse -> enrich -> media -> publish, each stage
+    with its own workers and a bounded queue in front of it.
+    """
+    workers = dict(PIPELINE_WORKERS, **config.get("pipeline_workers", {}))
+    queue_size = config.get("pipeline_queue_size")
+    processed = []
+
+    def on_done(job):
+        for item in job["items"]:
+            store.complete(item['id'])
+        processed.append(job["items"][0]['filename'])
+        logger.info(f"Successfully processed: {job['items'][0]['filename']}")
+
+    def on_error(job, e):
+        head = job["items"][0]
+        logger.error(f"Upload failed: {str(e)}", exc_info=True)
+        log_to_csv(job.get("raw_name") or head['filename'], head['link'], "Failed", f"❌ Error: {str(e)}")
+        for item in job["items"]:
+            store.fail(item['id'], e)
+
+    pipeline = StagedPipeline(
+        [
+            Stage("parse", _pipeline_parse, workers["parse"], queue_size),
+            Stage("enrich", _pipeline_enrich, workers["enrich"], queue_size),
+            Stage("media", _pipeline_media, workers["media"], queue_size),
+            Stage("publish", _pipeline_publish, workers["publish"], queue_size),
+        ],
+        on_done=on_done,
+        on_error=on_error,
+        stats_interval=config.get("pipeline_stats_interval", 30)
+    ).start()
+    try:
+        while True:
+            items = get_next_group(window, min_age)
+            if not items:
+                logger.info("No more links to process")
+                break
+            _, raw_name = clean_title(items[0]['filename'])
+            pipeline.submit(raw_name, {"items": items, "settings": config})
+    finally:
+        pipeline.shutdown()
+        logger.info(f"Pipeline finished: {pipeline.format_stats()}")
+    return len(processed)
+
+def process_queue(config, workers=1, hold=False, engine="threads"):
+    """
+    Drain the pending link queue once. Returns the number of releases processed.
+    Pending links of the same release enqueued within coalesce_window seconds
+    are merged into a single post write. With hold=True (daemon mode) a
+    release is only picked up once its first link is coalesce_window old.
+    With workers > 1 uploads run concurrently - on a thread pool, or with
+    engine="async" as up to `workers` uploads in flight on one event loop - but
+    links that share a raw_name are still processed one after another in queue order.
+    engine="staged" splits uploads into parse/enrich/media/publish stages with
+    their own worker counts (pipeline_workers) instead of using `workers`.
+    """
+    store = get_store()
+    store.set_retry_policy(
+        max_attempts=config.get("queue_max_attempts"),
+        base_delay=config.get("queue_retry_delay"),
+        max_delay=config.get("queue_retry_max_delay")
+    )
+    # Pick up any link files left by an older save_links.py
+    store.migrate_directory()
+    window = float(config.get("coalesce_window", 10))
+    min_age = window if hold else 0
+    try:
+        prefetch_anilist(store.peek(ANILIST_PREFETCH_ITEMS, min_age=min_age), config)
+    except Exception as e:
+        logger.warning(f"AniList prefetch failed: {str(e)}")
+
+    if engine == "staged":
+        set_metadata_concurrency(dict(PIPELINE_WORKERS, **config.get("pipeline_workers", {}))["enrich"])
+        return _process_queue_staged(store, config, window, min_age)
+    set_metadata_concurrency(workers)
+
+    if engine == "async":
+        async def handle(items):
+            return await _process_queue_item_async(store, items, config)
+
+        results = run_pipeline(
+            drain(
+                lambda: get_next_group(window, min_age),
+                handle,
+                lambda items: clean_title(items[0]['filename'])[1],
+                max(1, workers)
+            ),
+            # Every upload in flight runs its independent stages side by side; +1 for claims
+            max_threads=max(1, workers) * UPLOAD_DAG_WIDTH + 1
+        )
+        logger.info("No more links to process")
+        return sum(results)
+
+    # One event loop and executor for the whole drain, shared by the worker threads
+    with EventLoopThread(max_threads=max(1, workers) * UPLOAD_DAG_WIDTH) as runner:
+        if workers <= 1:
+            processed = 0
+            while True:
+                items = get_next_group(window, min_age)
+                if not items:
+                    logger.info("No more links to process")
+                    break
+                if _process_queue_item(runner, store, items, config):
+                    processed += 1
+            return processed
+
+        results = []
+
+        def run(items):
+            results.append(_process_queue_item(runner, store, items, config))
+
+        pool = KeyedWorkerPool(workers)
+        try:
+            while True:
+                items = get_next_group(window, min_age)
+                if not items:
+                    logger.info("No more links to process")
+                    break
+                _, raw_name = clean_title(items[0]['filename'])
+                pool.submit(raw_name, run, items)
+        finally:
+            pool.shutdown()
+        return sum(results)
+
+def _settings_mtime():
+    try:
+        return os.path.getmtime(SETTINGS_FILE)
+    except OSError:
+        return None
+
+def run_daemon(config, poll_interval=5.0, workers=1, engine="threads"):
+    """
+    Stay resident and drain the queue whenever pending_links/ changes.
+    Settings are loaded once and only reloaded when settings.json changes.
+    """
+    watcher = QueueWatcher(LINKS_DIR).start()
+    settings_mtime = _settings_mtime()
+    with open(DAEMON_PID_FILE, "w", encoding="utf-8") as f:
+        f.write(str(os.getpid()))
+    logger.info(f"Queue daemon started (PID {os.getpid()})")
+
+    try:
+        while True:
+            watcher.clear()
+            if _settings_mtime() != settings_mtime:
+                logger.info("Settings changed on disk, reloading")
+                config = load_settings()
+                settings_mtime = _settings_mtime()
+            try:
+                process_queue(config, workers=workers, hold=True, engine=engine)
+            except Exception as e:
+                logger.error(f"Queue drain failed: {str(e)}", exc_info=True)
+            # Wake up early when a held release becomes due
+            timeout = poll_interval
+            ready_in = get_store().seconds_until_ready(float(config.get("coalesce_window", 10)))
+            if ready_in is not None:
+                timeout = min(timeout, ready_in + 0.1)
+            watcher.wait(timeout=timeout)
+    except KeyboardInterrupt:
+        logger.info("Queue daemon stopping")
+    finally:
+        watcher.stop()
+        try:
+            os.remove(DAEMON_PID_FILE)
+        except OSError:
+            pass
+
+def backfill_post_slugs(settings, dry_run=False):
+    """
+    One-off migration: give every existing post its canonical slug.
+    Posts whose canonical slug is already taken by another post are left alone.
+    Returns the number of posts changed (or that would be changed).
+    """
+    wp = {"url": settings["wp_url"]}
+    auth = HTTPBasicAuth(settings["wp_user"], settings["wp_app_password"])
+    site = wp['url'].rstrip('/')
+    params = {"_fields": "id,title,slug,modified", "orderby": "id", "order": "asc"}
+
+    posts = [post for page in fetch_all(wp, auth, "posts", params) for post in page]
+    taken = {post["slug"] for post in posts}
+    changed = 0
+    for post in posts:
+        slug = canonical_slug(html.unescape(post["title"]["rendered"]))
+        if not slug or post["slug"] == slug:
+            continue
+        if slug in taken:
+            logger.warning(f"Slug '{slug}' already used, skipping post {post['id']} ({post['slug']})")
+            continue
+        changed += 1
+        if dry_run:
+            logger.info(f"Would rename post {post['id']}: {post['slug']} -> {slug}")
+            continue
+        try:
+            res = http_client.post("wordpress", f"{site}/wp-json/wp/v2/posts/{post['id']}", json={"slug": slug},
+                                   auth=auth, idempotent=True)
+            res.raise_for_status()
+            taken.discard(post["slug"])
+            taken.add(slug)
+            logger.info(f"Renamed post {post['id']}: {post['slug']} -> {slug}")
+        except RequestException as e:
+            changed -= 1
+            logger.error(f"Failed to update slug of post {post['id']}: {str(e)}")
+    logger.info(f"Slug backfill {'(dry run) ' if dry_run else ''}finished: {changed} of {len(posts)} post(s)")
+    return changed
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument("--link", help="Download link")
@@ -1054,36 +1714,46 @@ if __name__ == "__main__":
     parser.add_argument("--thumbnail-path", help="Path to file for thumbnail search")
     parser.add_argument("--process-queue", action="store_true", 
                        help="Process all queued links")
+    parser.add_argument("--daemon", action="store_true",
+                       help="Stay resident and process links as they are queued")
+    parser.add_argument("--poll-interval", type=float, default=5.0,
+                       help="Seconds between queue checks in daemon mode (default: 5)")
+    parser.add_argument("--workers", type=int, default=1,
+                       help="Number of concurrent uploads when processing the queue (default: 1)")
+    parser.add_argument("--engine", choices=["threads", "async", "staged"], default="threads",
+                       help="Run concurrent uploads on a thread pool, on one asyncio event loop, "
+                            "or as a parse/enrich/media/publish pipeline")
+    parser.add_argument("--backfill-slugs", action="store_true",
+                       help="Give existing posts their canonical slug (one-off migration)")
+    parser.add_argument("--dry-run", action="store_true",
+                       help="With --backfill-slugs, only report what would change")
     args = parser.parse_args()
 
     # Load config
     config = load_settings()
+    for upstream, limit in config.get("upstream_concurrency", {}).items():
+        http_client.set_max_concurrency(upstream, limit)
+    for upstream, overrides in config.get("upstream_retry", {}).items():
+        retry_policy.configure(upstream, **overrides)
+    for upstream, overrides in config.get("upstream_rate", {}).items():
+        rate_governor.configure(upstream, **overrides)
+    get_metadata_cache().configure(
+        ttl=config.get("metadata_cache_ttl"),
+        negative_ttl=config.get("metadata_cache_negative_ttl")
+    )
+    image_engine.configure(
+        workers=config.get("image_workers"),
+        fmt=config.get("image_format"),
+        quality=config.get("image_quality")
+    )
     
-    if args.process_queue:
-        logger.info("Starting queue processing")
-        # Process all queued links
-        while True:
-            link_data = get_next_link()
-            if not link_data:
-                logger.info("No more links to process")
-                break
-                
-            try:
-                logger.info(f"Processing link for: {link_data['filename']}")
-                process_upload(
-                    link_data['link'],
-                    link_data['filename'],
-                    config,
-                    link_data.get('thumbnail_path')
-                )
-                # Delete the processed file
-                os.remove(os.path.join(SCRIPT_DIR, "pending_links", 
-                                     f"link_{link_data['timestamp']}.json"))
-                logger.info(f"Successfully processed: {link_data['filename']}")
-            except Exception as e:
-                logger.error(f"Failed to process queued link: {str(e)}")
-                # Keep the file in queue for retry
-                continue
+    if args.backfill_slugs:
+        backfill_post_slugs(config, dry_run=args.dry_run)
+    elif args.daemon:
+        run_daemon(config, poll_interval=args.poll_interval, workers=args.workers, engine=args.engine)
+    elif args.process_queue:
+        logger.info(f"Starting queue processing with {args.workers} worker(s) ({args.engine} engine)")
+        process_queue(config, workers=args.workers, engine=args.engine)
     elif args.link and args.filename:
         # Process single link
         logger.info(f"Processing single link for: {args.filename}")
@@ -1092,5 +1762,7 @@ if __name__ == "__main__":
         logger.error("No valid arguments provided")
         print("Usage:")
         print("  Single link: --link <url> --filename <name> [--thumbnail-path <path>]")
-        print("  Process queue: --process-queue")
+        print("  Process queue: --process-queue [--workers <n>] [--engine threads|async|staged]")
+        print("  Queue daemon: --daemon [--poll-interval <seconds>] [--workers <n>] [--engine threads|async|staged]")
+        print("  Slug migration: --backfill-slugs [--dry-run]")
         sys.exit(1)
\ No newline at end of file
@@ -0,0 +1,152 @@
+# async_pipeline.py
+import asyncio
+import functools
+import logging
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+# Threads available to blocking stages; requests beyond an upstream's
+# max_concurrency simply wait in http_client, so this only needs to cover
+# the uploads kept in flight.
+DEFAULT_MAX_THREADS = 64
+
+async def run_blocking(fn, *args, **kwargs):
+    """Run a blocking stage on the event loop's executor"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, functools.partial(fn, *args, **kwargs))
+
+def run_pipeline(coro, max_threads=DEFAULT_MAX_THREADS):
+    """Run a coroutine on a fresh event loop whose executor has max_threads threads"""
+    async def main():
+        executor = ThreadPoolExecutor(max_workers=max_threads, thread_name_prefix="pipeline")
+        asyncio.get_running_loop().set_default_executor(executor)
+        return await coro
+    return asyncio.run(main())
+
+class EventLoopThread:
+    """
+    One event loop on a background thread, shared by synchronous callers:
+    run(coro) blocks the calling thread until coro has finished on the loop.
+    Lets a thread pool drive coroutines without a new loop and executor per call.
+    """
+
+    def __init__(self, max_threads=DEFAULT_MAX_THREADS):
+        self.loop = asyncio.new_event_loop()
+        self._executor = ThreadPoolExecutor(max_workers=max_threads, thread_name_prefix="pipeline")
+        self.loop.set_default_executor(self._executor)
+        self._thread = threading.Thread(target=self.loop.run_forever, name="pipeline-loop", daemon=True)
+        self._thread.start()
+
+    def run(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result()
+
+    def close(self):
+        """Stop the loop once every run() has returned"""
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join()
+        self.loop.close()
+        self._executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def stage_width(stages):
+    """
+    Widest level of a run_stages() graph: the number of its stages that start
+    side by side, i.e. the executor threads one run keeps busy.
+    """
+    levels = {}
+
+    def level(name):
+        if name not in levels:
+            levels[name] = 1 + max((level(dep) for dep in stages[name][1]), default=-1)
+        return levels[name]
+
+    return max(Counter(level(name) for name in stages).values(), default=1)
+
+async def run_stages(stages, *args):
+    """
+    Run a dependency graph of blocking stages: stages maps a name to
+    (fn, names of the stages it needs). Every stage calls fn(*args) as soon as
+    its dependencies are done, so independent stages overlap. After the first
+    failure no further stage starts; stages already running on the executor
+    are waited for, then the failure is re-raised.
+    """
+    loop = asyncio.get_running_loop()
+    failed = threading.Event()
+    tasks = {}
+    submitted = []
+
+    def call(fn):
+        # A stage still queued on the executor when another stage failed is skipped
+        if failed.is_set():
+            return None
+        return fn(*args)
+
+    async def run(name):
+        fn, deps = stages[name]
+        if deps:
+            await asyncio.gather(*(tasks[dep] for dep in deps))
+        future = loop.run_in_executor(None, call, fn)
+        submitted.append(future)
+        # Shielded: cancelling this task must not lose track of a running thread
+        return await asyncio.shield(future)
+
+    for name in stages:
+        tasks[name] = asyncio.ensure_future(run(name))
+    try:
+        await asyncio.gather(*tasks.values())
+    except BaseException:
+        failed.set()
+        for task in tasks.values():
+            task.cancel()
+        # Cancelling does not stop executor threads: wait until every submitted
+        # stage has returned, so a retry of the same upload cannot overlap it
+        await asyncio.gather(*submitted, return_exceptions=True)
+        raise
+
+async def drain(claim, handle, key_for, concurrency):
+    """
+    Keep up to `concurrency` handle(items) coroutines in flight until claim()
+    returns nothing. Items with the same key_for(items) run one after another.
+    Returns the list of handle() results.
+    """
+    slots = asyncio.Semaphore(concurrency)
+    key_locks = {}
+    tasks = set()
+    results = []
+
+    async def run(items):
+        key = key_for(items)
+        entry = key_locks.setdefault(key, [asyncio.Lock(), 0])
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                results.append(await handle(items))
+        except Exception as e:
+            logger.error(f"Pipeline task for '{key}' failed: {str(e)}", exc_info=True)
+        finally:
+            entry[1] -= 1
+            if not entry[1]:
+                del key_locks[key]
+            slots.release()
+
+    while True:
+        await slots.acquire()
+        items = await run_blocking(claim)
+        if not items:
+            slots.release()
+            break
+        task = asyncio.create_task(run(items))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+
+    if tasks:
+        await asyncio.gather(*tasks)
+    return results
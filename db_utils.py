@@ -0,0 +1,35 @@
+# db_utils.py
+import os
+import sqlite3
+import logging
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+def connect(path, busy_timeout=30, synchronous="NORMAL"):
+    """Open a SQLite connection in WAL mode suitable for several processes.
+
+    Use synchronous="FULL" for data that must survive a power loss (the queue);
+    caches can keep the cheaper NORMAL level.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    conn = sqlite3.connect(path, timeout=busy_timeout, isolation_level=None, check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    try:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(f"PRAGMA synchronous={synchronous}")
+    except sqlite3.DatabaseError as e:
+        logger.warning(f"Could not enable WAL mode for {path}: {e}")
+    return conn
+
+@contextmanager
+def transaction(conn):
+    """Run a block inside BEGIN IMMEDIATE so concurrent writers serialize cleanly."""
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield conn
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    else:
+        conn.execute("COMMIT")
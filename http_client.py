@@ -0,0 +1,118 @@
+# http_client.py
+import logging
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from requests.exceptions import RequestException
+from retry_policy import get_policy
+from rate_governor import get_governor
+
+logger = logging.getLogger(__name__)
+
+USER_AGENT = "MRS-Poster/1.0 (+AutoUploader)"
+
+# Maximum concurrent requests (also the connection pool size) and
+# (connect, read) timeout for each upstream
+UPSTREAMS = {
+    "wordpress": {"max_concurrency": 16, "timeout": (5, 30)},
+    "tmdb": {"max_concurrency": 16, "timeout": (5, 10)},
+    "omdb": {"max_concurrency": 4, "timeout": (5, 10)},
+    "anilist": {"max_concurrency": 4, "timeout": (5, 10)},
+    "images": {"max_concurrency": 8, "timeout": (5, 15)},
+}
+
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+_limits = {
+    upstream: threading.BoundedSemaphore(config["max_concurrency"])
+    for upstream, config in UPSTREAMS.items()
+}
+
+def _build_session(upstream):
+    config = UPSTREAMS[upstream]
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=config["max_concurrency"])
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update({"User-Agent": USER_AGENT})
+    return session
+
+def get_session(upstream):
+    """Keep-alive session shared by every call to the given upstream"""
+    if upstream not in UPSTREAMS:
+        raise ValueError(f"Unknown upstream: {upstream}")
+    with _sessions_lock:
+        session = _sessions.get(upstream)
+        if session is None:
+            session = _sessions[upstream] = _build_session(upstream)
+        return session
+
+def set_max_concurrency(upstream, limit):
+    """Change how many requests an upstream may have in flight (and its pool size)"""
+    limit = max(1, int(limit))
+    with _sessions_lock:
+        UPSTREAMS[upstream] = dict(UPSTREAMS[upstream], max_concurrency=limit)
+        _limits[upstream] = threading.BoundedSemaphore(limit)
+        # Replaced sessions are left to in-flight requests and garbage collected
+        _sessions.pop(upstream, None)
+
+def _rewind(kwargs):
+    """Seek file bodies back to the start so a retried request resends them"""
+    bodies = [kwargs.get("data")]
+    files = kwargs.get("files")
+    if isinstance(files, dict):
+        for value in files.values():
+            bodies.append(value[1] if isinstance(value, tuple) else value)
+    for body in bodies:
+        if hasattr(body, "seek"):
+            body.seek(0)
+
+def request(upstream, method, url, idempotent=None, **kwargs):
+    """
+    Send a request through the pooled session of an upstream with its default timeout.
+    Blocks while the upstream already has max_concurrency requests in flight and
+    paces sends to the upstream's learned rate (see rate_governor).
+    Failures are retried by the upstream's retry policy (see retry_policy); pass
+    idempotent=True for a POST that is safe to resend after a timeout.
+    """
+    kwargs.setdefault("timeout", UPSTREAMS[upstream]["timeout"])
+    if idempotent is None:
+        idempotent = method.upper() in IDEMPOTENT_METHODS
+    attempts = []
+
+    def send():
+        if attempts:
+            _rewind(kwargs)
+        attempts.append(1)
+        session = get_session(upstream)
+        governor = get_governor(upstream)
+        # Wait for a send slot before taking a connection, so queued callers hold no socket
+        governor.acquire()
+        with _limits[upstream]:
+            try:
+                response = session.request(method, url, **kwargs)
+            except RequestException as e:
+                governor.observe(error=e)
+                raise
+        governor.observe(response)
+        return response
+
+    return get_policy(upstream).call(send, idempotent=idempotent, label=f"{method} {url.split('?')[0]}")
+
+def get(upstream, url, **kwargs):
+    return request(upstream, "GET", url, **kwargs)
+
+def post(upstream, url, **kwargs):
+    return request(upstream, "POST", url, **kwargs)
+
+def delete(upstream, url, **kwargs):
+    return request(upstream, "DELETE", url, **kwargs)
+
+def close_all():
+    """Close every pooled connection"""
+    with _sessions_lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
@@ -0,0 +1,175 @@
+# image_engine.py
+import io
+import os
+import time
+import logging
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from PIL import Image, features
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_QUALITY = 85
+# In-thread by default: on Windows, pool workers are spawned and re-import the
+# launching script (AutoUploader) with all of its import-time setup
+DEFAULT_WORKERS = 0
+
+# Output formats: Pillow format name, file extension, save options
+FORMATS = {
+    "jpeg": ("JPEG", ".jpg", {"progressive": True, "optimize": True}),
+    "webp": ("WEBP", ".webp", {"method": 4}),
+    "png": ("PNG", ".png", {"optimize": True}),
+}
+# Source formats that may be passed through untouched; anything else
+# (GIF, BMP, TIFF...) is always re-encoded so the extension matches the bytes
+SOURCE_FORMATS = {"JPEG": "jpeg", "MPO": "jpeg", "WEBP": "webp", "PNG": "png"}
+
+def process_image(data, max_size, fmt=None, quality=DEFAULT_QUALITY, draft=True):
+    """
+    Shrink an encoded image to fit max_size and encode it as fmt ("jpeg" is
+    progressive, "webp", "png" or None to keep the source format).
+    Returns (bytes, extension). An image that already fits and is in the
+    requested format is returned untouched. With draft, JPEGs are decoded at
+    a reduced scale (1/2, 1/4 or 1/8) that stays at least twice the final
+    size, so the resize from there keeps full quality.
+    """
+    with Image.open(io.BytesIO(data)) as img:
+        source = SOURCE_FORMATS.get(img.format)
+        if fmt:
+            target = fmt
+        elif source:
+            target = source
+        else:
+            target = "png" if img.mode in ("RGBA", "LA", "P", "PA") or "transparency" in img.info else "jpeg"
+        fits = img.width <= max_size[0] and img.height <= max_size[1]
+        if fits and target == source:
+            return data, FORMATS[source][1]
+
+        if draft and img.format == "JPEG":
+            # thumbnail() drafts at twice the bounding box, which rarely allows
+            # a reduced decode when the aspect ratios differ; twice the final
+            # size is the same quality margin (reducing_gap=2.0)
+            scale = min(max_size[0] / img.width, max_size[1] / img.height, 1.0)
+            img.draft("RGB", (max(1, int(img.width * scale * 2)), max(1, int(img.height * scale * 2))))
+        img.thumbnail(max_size, Image.LANCZOS, reducing_gap=2.0 if draft else None)
+
+        name, ext, options = FORMATS[target]
+        if name == "JPEG" and img.mode not in ("RGB", "L"):
+            img = img.convert("RGB")
+        elif img.mode not in ("RGB", "RGBA", "L", "LA"):
+            img = img.convert("RGBA" if "transparency" in img.info else "RGB")
+        out = io.BytesIO()
+        save_options = dict(options)
+        if name != "PNG":
+            save_options["quality"] = quality
+        img.save(out, name, **save_options)
+        return out.getvalue(), ext
+
+class ImageEngine:
+    """
+    Runs process_image() in a pool of worker processes, so decoding and
+    encoding large images neither holds the GIL nor blocks an upload thread.
+    With workers=0 (the default) images are processed in the calling thread.
+    """
+
+    def __init__(self, workers=DEFAULT_WORKERS, fmt=None, quality=DEFAULT_QUALITY):
+        self.workers = workers
+        self.fmt = fmt
+        self.quality = quality
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def configure(self, workers=None, fmt=None, quality=None):
+        """Apply settings; fmt "" keeps the source format"""
+        if workers is not None and workers != self.workers:
+            self.shutdown()
+            self.workers = workers
+        if fmt is not None:
+            self.fmt = fmt or None
+        if quality is not None:
+            self.quality = quality
+        if self.fmt == "webp" and not features.check("webp"):
+            logger.warning("This Pillow build cannot write WebP, encoding images as JPEG")
+            self.fmt = "jpeg"
+        if self.fmt is not None and self.fmt not in FORMATS:
+            raise ValueError(f"Unknown image format: {self.fmt}")
+
+    def _pool(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            return self._executor
+
+    def resize(self, data, max_size, fmt=None, quality=None):
+        """process_image() in the pool with the engine's format and quality unless given"""
+        args = (data, tuple(max_size), fmt or self.fmt, quality or self.quality)
+        if self.workers <= 0:
+            return process_image(*args)
+        try:
+            return self._pool().submit(process_image, *args).result()
+        except BrokenProcessPool as e:
+            logger.warning(f"Image worker pool failed ({str(e)}), resizing in this process")
+            self.shutdown()
+            return process_image(*args)
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+                self._executor = None
+
+image_engine = ImageEngine()
+
+def _sample_image(size=(3000, 2000)):
+    """A photo-like JPEG for benchmarking when no images are given"""
+    gradient = Image.linear_gradient("L").resize(size)
+    noise = Image.effect_noise(size, 40)
+    img = Image.merge("RGB", (gradient, noise, gradient.transpose(Image.FLIP_LEFT_RIGHT)))
+    out = io.BytesIO()
+    img.save(out, "JPEG", quality=90)
+    return out.getvalue()
+
+if __name__ == "__main__":
+    import argparse
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    parser = argparse.ArgumentParser(description="Benchmark image resizing")
+    parser.add_argument("images", nargs="*", help="Images to resize (default: a generated 3000x2000 JPEG)")
+    parser.add_argument("--max-size", type=int, nargs=2, default=[1200, 1200], metavar=("W", "H"))
+    parser.add_argument("--formats", default="keep,jpeg,webp", help="Comma-separated output formats")
+    parser.add_argument("--quality", type=int, default=DEFAULT_QUALITY)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--repeat", type=int, default=20, help="Times each image is processed per format")
+    args = parser.parse_args()
+
+    images = []
+    for path in args.images:
+        with open(path, "rb") as f:
+            images.append(f.read())
+    images = (images or [_sample_image()]) * args.repeat
+    max_size = tuple(args.max_size)
+    print(f"{len(images)} image(s) per run, max size {max_size[0]}x{max_size[1]}, {args.workers} worker(s)")
+
+    # Baseline: full-resolution decode in this process, as resize_image used to do
+    started = time.perf_counter()
+    for data in images:
+        process_image(data, max_size, "jpeg", args.quality, draft=False)
+    elapsed = time.perf_counter() - started
+    print(f"{'jpeg, full decode, 1 process':<32} {len(images) / elapsed:8.1f} images/s")
+
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        for fmt in args.formats.split(","):
+            fmt = None if fmt == "keep" else fmt
+            if fmt == "webp" and not features.check("webp"):
+                print("webp: not supported by this Pillow build")
+                continue
+            list(pool.map(process_image, images[:args.workers], [max_size] * args.workers))  # warm up
+            started = time.perf_counter()
+            results = list(pool.map(process_image, images, [max_size] * len(images),
+                                    [fmt] * len(images), [args.quality] * len(images)))
+            elapsed = time.perf_counter() - started
+            size = sum(len(data) for data, _ in results) / len(results)
+            print(f"{(fmt or 'keep') + ', draft decode, pool':<32} {len(images) / elapsed:8.1f} images/s"
+                  f"  ({size / 1024:.0f} KB avg)")
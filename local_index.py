@@ -0,0 +1,348 @@
+# local_index.py
+import os
+import re
+import html
+import time
+import logging
+import threading
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+import http_client
+from db_utils import connect, transaction
+from utils import post_key
+
+logger = logging.getLogger(__name__)
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+LOCAL_INDEX_DB = os.path.join(SCRIPT_DIR, "config", "local_index.db")
+
+# Check WordPress for items modified elsewhere at most this often
+SYNC_INTERVAL = 5 * 60
+PAGE_SIZE = 100
+PAGE_WORKERS = 4
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS posts (
+    site TEXT NOT NULL,
+    post_id INTEGER NOT NULL,
+    title TEXT NOT NULL,
+    base_title TEXT NOT NULL,
+    season INTEGER NOT NULL DEFAULT 0,
+    episode INTEGER NOT NULL DEFAULT 0,
+    quality TEXT NOT NULL DEFAULT '',
+    modified TEXT,
+    PRIMARY KEY (site, post_id)
+);
+CREATE INDEX IF NOT EXISTS idx_posts_key ON posts(site, base_title, season, episode, quality);
+CREATE TABLE IF NOT EXISTS media (
+    site TEXT NOT NULL,
+    media_id INTEGER NOT NULL,
+    slug TEXT NOT NULL,
+    name TEXT NOT NULL,
+    source_url TEXT NOT NULL,
+    media_type TEXT NOT NULL DEFAULT '',
+    modified TEXT,
+    PRIMARY KEY (site, media_id)
+);
+CREATE INDEX IF NOT EXISTS idx_media_slug ON media(site, slug);
+CREATE INDEX IF NOT EXISTS idx_media_name ON media(site, name);
+CREATE TABLE IF NOT EXISTS pending_creates (
+    site TEXT NOT NULL,
+    slug TEXT NOT NULL,
+    started_at REAL NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 1,
+    PRIMARY KEY (site, slug)
+);
+CREATE TABLE IF NOT EXISTS sync_state (
+    site TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    cursor TEXT,
+    synced_at REAL NOT NULL,
+    PRIMARY KEY (site, kind)
+);
+"""
+
+def _site(wp):
+    return wp['url'].rstrip('/')
+
+def fetch_all(wp, auth, endpoint, params):
+    """
+    Yield every page of a WordPress collection. The first page reports
+    X-WP-TotalPages; the remaining pages are fetched a few at a time.
+    """
+    url = f"{_site(wp)}/wp-json/wp/v2/{endpoint}"
+    params = dict(params, per_page=PAGE_SIZE)
+
+    def fetch(page):
+        res = http_client.get("wordpress", url, params=dict(params, page=page), auth=auth)
+        if res.status_code == 400 and page > 1:
+            # rest_post_invalid_page_number: the collection shrank while paging
+            return []
+        res.raise_for_status()
+        return res.json()
+
+    first = http_client.get("wordpress", url, params=dict(params, page=1), auth=auth)
+    first.raise_for_status()
+    yield first.json()
+    total_pages = int(first.headers.get("X-WP-TotalPages", 1))
+    if total_pages <= 1:
+        return
+    with ThreadPoolExecutor(max_workers=PAGE_WORKERS) as executor:
+        yield from executor.map(fetch, range(2, total_pages + 1))
+
+class _LocalDB:
+    """Thread-local connections to the local index database"""
+
+    def __init__(self, path=LOCAL_INDEX_DB):
+        self.path = path
+        self._local = threading.local()
+        self._conn().executescript(SCHEMA)
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = connect(self.path)
+            self._local.conn = conn
+        return conn
+
+class _SiteIndex(_LocalDB, ABC):
+    """Per-site SQLite index of a WordPress collection kept current with modified_after"""
+
+    kind = None
+    fields = None
+    # Extra collection parameters for the listing
+    params = {}
+
+    def __init__(self, path=LOCAL_INDEX_DB, sync_interval=SYNC_INTERVAL):
+        self.sync_interval = sync_interval
+        self._sync_lock = threading.Lock()
+        super().__init__(path)
+
+    @abstractmethod
+    def add(self, site, items):
+        """Insert or refresh items as returned by the REST collection"""
+
+    def _sync_state(self, site):
+        return self._conn().execute(
+            "SELECT cursor, synced_at FROM sync_state WHERE site = ? AND kind = ?", (site, self.kind)
+        ).fetchone()
+
+    def _save_sync_state(self, site, cursor):
+        self._conn().execute(
+            "INSERT OR REPLACE INTO sync_state (site, kind, cursor, synced_at) VALUES (?, ?, ?, ?)",
+            (site, self.kind, cursor, time.time())
+        )
+
+    def is_built(self, site):
+        """True once a full listing of the site has been indexed"""
+        return self._sync_state(site) is not None
+
+    def sync(self, wp, auth, force=False):
+        """
+        Bring the index up to date: a full listing the first time, afterwards
+        only items modified since the last sync. Returns the number of items read.
+        """
+        site = _site(wp)
+        state = self._sync_state(site)
+        if state and not force and time.time() - state["synced_at"] < self.sync_interval:
+            return 0
+        if not self._sync_lock.acquire(blocking=False):
+            # Another thread is syncing; use what is already indexed
+            return 0
+        try:
+            params = dict(self.params, _fields=self.fields)
+            if state and state["cursor"]:
+                # One second of overlap so items saved in the same second are not missed
+                since = datetime.fromisoformat(state["cursor"]) - timedelta(seconds=1)
+                params.update(modified_after=since.isoformat(), orderby="modified", order="asc")
+            else:
+                logger.info(f"Building local {self.kind} index for {site}")
+                params.update(orderby="id", order="asc")
+
+            cursor = state["cursor"] if state else None
+            count = 0
+            for items in fetch_all(wp, auth, self.kind, params):
+                self.add(site, items)
+                count += len(items)
+                modified = [item["modified"] for item in items if item.get("modified")]
+                if modified:
+                    cursor = max([cursor] + modified if cursor else modified)
+            self._save_sync_state(site, cursor)
+            if count:
+                logger.info(f"{self.kind.capitalize()} index for {site}: {count} item(s) synced")
+            return count
+        finally:
+            self._sync_lock.release()
+
+    def sync_in_background(self, wp, auth):
+        """Run sync() on a daemon thread; errors are logged and retried on the next call"""
+        def run():
+            try:
+                self.sync(wp, auth)
+            except Exception as e:
+                logger.warning(f"Background {self.kind} index sync failed: {str(e)}")
+        if self._sync_lock.locked():
+            return
+        threading.Thread(target=run, name=f"{self.kind}-index-sync", daemon=True).start()
+
+class PostIndex(_SiteIndex):
+    """
+    Local copy of (normalized base title, season, episode, quality) -> post ID
+    for the posts of a site, so duplicate checks do not need a REST search.
+    """
+
+    kind = "posts"
+    fields = "id,title,modified"
+    # Drafts and pending posts too, which needs an authenticated listing
+    params = {"status": "any"}
+
+    @staticmethod
+    def _row(site, post):
+        title = html.unescape(post["title"]["rendered"])
+        base_title, season, episode, quality = post_key(title)
+        return (site, post["id"], title, base_title, season or 0, episode or 0,
+                quality or "", post.get("modified"))
+
+    def add(self, site, posts):
+        """Insert or refresh posts as returned by /wp/v2/posts"""
+        rows = [self._row(site, post) for post in posts if post.get("id") and post.get("title")]
+        if not rows:
+            return
+        with transaction(self._conn()) as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO posts "
+                "(site, post_id, title, base_title, season, episode, quality, modified) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                rows
+            )
+
+    def remove(self, site, post_id):
+        self._conn().execute("DELETE FROM posts WHERE site = ? AND post_id = ?", (site, post_id))
+
+    def find(self, site, title, match_quality=True):
+        """Post ID for a release title, or None when the index has no entry"""
+        base_title, season, episode, quality = post_key(title)
+        query = "SELECT post_id FROM posts WHERE site = ? AND base_title = ? AND season = ? AND episode = ?"
+        args = [site, base_title, season or 0, episode or 0]
+        if match_quality:
+            query += " AND quality = ?"
+            args.append(quality or "")
+        row = self._conn().execute(query + " ORDER BY post_id DESC LIMIT 1", args).fetchone()
+        return row["post_id"] if row else None
+
+def media_key(text):
+    """Normalize a media slug, filename or search pattern the way WordPress builds slugs"""
+    text = html.unescape(str(text))
+    if "/" in text:
+        # A source URL or path: use the file name without extension
+        text = os.path.splitext(os.path.basename(text))[0]
+    text = re.sub(r"[\s.]+", "-", text.lower())
+    text = re.sub(r"[^a-z0-9_-]", "", text)
+    return re.sub(r"-+", "-", text).strip("-")
+
+class MediaIndex(_SiteIndex):
+    """
+    Local copy of media slug and file name -> (ID, source_url), so poster and
+    thumbnail lookups do not search the whole media library.
+    """
+
+    kind = "media"
+    fields = "id,slug,source_url,media_type,modified"
+
+    def add(self, site, media):
+        """Insert or refresh attachments as returned by /wp/v2/media"""
+        rows = [
+            (site, item["id"], media_key(item.get("slug") or ""), media_key(item["source_url"]),
+             item["source_url"], item.get("media_type") or "", item.get("modified"))
+            for item in media if item.get("id") and item.get("source_url")
+        ]
+        if not rows:
+            return
+        with transaction(self._conn()) as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO media "
+                "(site, media_id, slug, name, source_url, media_type, modified) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                rows
+            )
+
+    def remove(self, site, media_id):
+        self._conn().execute("DELETE FROM media WHERE site = ? AND media_id = ?", (site, media_id))
+
+    def find(self, site, pattern, prefix=False, media_type=None):
+        """
+        (ID, source_url) of the newest attachment whose slug or file name equals
+        pattern (or starts with it when prefix is set), else (None, None).
+        Slugs WordPress de-duplicated with a -N suffix count as exact matches.
+        """
+        key = media_key(pattern)
+        if not key:
+            return None, None
+        conn = self._conn()
+        best = None
+        for column in ("slug", "name"):
+            # Range scans use the (site, column) indexes for both lookups
+            query = f"SELECT media_id, source_url, {column} AS matched FROM media WHERE site = ? AND {column} >= ? AND {column} < ?"
+            args = [site, key, key + "\uffff"]
+            if media_type:
+                query += " AND media_type = ?"
+                args.append(media_type)
+            for row in conn.execute(query + " ORDER BY media_id DESC", args):
+                rest = row["matched"][len(key):]
+                if prefix or not rest or re.fullmatch(r"-\d+", rest):
+                    if best is None or row["media_id"] > best[0]:
+                        best = (row["media_id"], row["source_url"])
+                    break
+        return best if best else (None, None)
+
+class CreateLedger(_LocalDB):
+    """
+    Post creates that were sent but not confirmed, keyed by the canonical slug.
+    The slug doubles as the idempotency token on the WordPress side: before a
+    create is retried, the post is looked up by slug instead of created again.
+    """
+
+    def begin(self, site, slug):
+        """Record a create attempt; returns how many attempts were made so far"""
+        conn = self._conn()
+        with transaction(conn):
+            conn.execute(
+                "INSERT INTO pending_creates (site, slug, started_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(site, slug) DO UPDATE SET attempts = attempts + 1",
+                (site, slug, time.time())
+            )
+            row = conn.execute(
+                "SELECT attempts FROM pending_creates WHERE site = ? AND slug = ?", (site, slug)
+            ).fetchone()
+        return row["attempts"]
+
+    def is_pending(self, site, slug):
+        return self._conn().execute(
+            "SELECT 1 FROM pending_creates WHERE site = ? AND slug = ?", (site, slug)
+        ).fetchone() is not None
+
+    def complete(self, site, slug):
+        self._conn().execute("DELETE FROM pending_creates WHERE site = ? AND slug = ?", (site, slug))
+
+_shared = {}
+_shared_lock = threading.Lock()
+
+def _get_shared(cls):
+    # Opened on first use, so importing this module creates no database
+    with _shared_lock:
+        if cls not in _shared:
+            _shared[cls] = cls()
+        return _shared[cls]
+
+def get_post_index():
+    """Shared post index for the default local index database"""
+    return _get_shared(PostIndex)
+
+def get_media_index():
+    """Shared media index for the default local index database"""
+    return _get_shared(MediaIndex)
+
+def get_create_ledger():
+    """Shared create ledger for the default local index database"""
+    return _get_shared(CreateLedger)
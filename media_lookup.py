@@ -1,38 +1,32 @@
 # media_lookup.py
+import io
 import os
 import re
-import logging
-import requests
 import time
+import logging
+import mimetypes
+import sqlite3
+import http_client
 from requests.auth import HTTPBasicAuth
 from requests.exceptions import RequestException
-from PIL import Image
-from functools import wraps
+from image_engine import image_engine
 from utils import detect_season_episode
+from local_index import get_media_index
+from singleflight import singleflight
 from host_config import get_primary_hosts, get_host_display_name
 
 logger = logging.getLogger(__name__)
 
-def retry_with_backoff(max_retries=3, initial_delay=1, backoff_factor=2):
-    """Decorator for retrying API calls with exponential backoff"""
-    def decorator(func):
-        @wraps(func)
-        def wrapper(*args, **kwargs):
-            retries = 0
-            delay = initial_delay
-            while retries < max_retries:
-                try:
-                    return func(*args, **kwargs)
-                except RequestException:
-                    retries += 1
-                    if retries >= max_retries:
-                        raise
-                    time.sleep(delay)
-                    delay *= backoff_factor
-        return wrapper
-    return decorator
-
-@retry_with_backoff()
+# Renditions TMDb serves for each image kind (widths in pixels, besides "original")
+TMDB_IMAGE_WIDTHS = {
+    "poster": (92, 154, 185, 342, 500, 780),
+    "backdrop": (300, 780, 1280),
+}
+# Downloaded images larger than this are refused
+MAX_IMAGE_BYTES = 5 * 1024 * 1024
+
+@singleflight(lambda title, wp, auth, media_type="image", is_thumbnail=False:
+              (wp['url'].rstrip('/'), title, media_type, is_thumbnail))
 def find_existing_media(title, wp, auth, media_type="image", is_thumbnail=False):
     """Media lookup that uses title directly for search without special suffix handling"""
     logger.info(f"Starting media lookup for: {title} (thumbnail: {is_thumbnail})")
@@ -51,10 +45,29 @@ def find_existing_media(title, wp, auth, media_type="image", is_thumbnail=False)
             search_pattern = re.sub(r'_poster$', '', cleaned_title) + "_poster"
 
         logger.debug(f"Final search pattern: {search_pattern}")
+
+        # Once the local media index is built, lookups never search the media library
+        site = wp['url'].rstrip('/')
+        media_index = get_media_index()
+        try:
+            if media_index.is_built(site):
+                media_index.sync(wp, auth)
+                media_id, media_url = media_index.find(
+                    site, search_pattern, prefix=is_thumbnail, media_type=media_type
+                )
+                if media_id:
+                    logger.debug(f"Media index hit - ID: {media_id}, URL: {media_url}")
+                    return media_id, media_url
+                logger.info(f"No matching media found for '{search_pattern}' in local index")
+                return None, None
+            media_index.sync_in_background(wp, auth)
+        except (RequestException, sqlite3.Error, ValueError) as e:
+            logger.warning(f"Local media index unavailable: {str(e)}")
         
         try:
             logger.debug(f"Querying WordPress media API for: {search_pattern}")
-            res = requests.get(
+            res = http_client.get(
+                "wordpress",
                 f"{wp['url'].rstrip('/')}/wp-json/wp/v2/media",
                 params={
                     "search": search_pattern,
@@ -63,8 +76,7 @@ def find_existing_media(title, wp, auth, media_type="image", is_thumbnail=False)
                     "orderby": "date",
                     "order": "desc"
                 },
-                auth=auth,
-                timeout=10
+                auth=auth
             )
             res.raise_for_status()
             found_media = res.json()
@@ -85,53 +97,99 @@ def find_existing_media(title, wp, auth, media_type="image", is_thumbnail=False)
         logger.error(f"Media lookup error: {str(e)}", exc_info=True)
         return None, None
 
-@retry_with_backoff()
+def _post_media(body, filename, size, wp, auth):
+    """
+    POST a file-like body to the WordPress media endpoint in raw upload mode
+    (Content-Disposition header, no multipart), so it is streamed as-is.
+    Returns (media ID, source URL).
+    """
+    title = os.path.splitext(filename)[0]
+    logger.debug(f"Preparing upload headers - filename: {filename}, title: {title}")
+    headers = {
+        "Content-Disposition": f'attachment; filename="{filename}"',
+        "Content-Type": mimetypes.guess_type(filename)[0] or "application/octet-stream"
+    }
+
+    logger.debug(f"Making POST request to WordPress media API")
+    started = time.monotonic()
+    res = http_client.post(
+        "wordpress",
+        f"{wp['url'].rstrip('/')}/wp-json/wp/v2/media",
+        headers=headers,
+        params={"title": title},
+        data=body,
+        auth=auth
+    )
+    elapsed = time.monotonic() - started
+
+    logger.debug(f"Response status: {res.status_code}")
+    res.raise_for_status()
+
+    media_data = res.json()
+    get_media_index().add(wp['url'].rstrip('/'), [media_data])
+    logger.info(
+        f"Uploaded {filename}: {size / 1024:.0f} KB in {elapsed:.2f}s "
+        f"({size / 1024 / max(elapsed, 0.001):.0f} KB/s)"
+    )
+    logger.debug(f"Upload successful - ID: {media_data['id']}, URL: {media_data['source_url']}")
+    return media_data["id"], media_data["source_url"]
+
 def upload_media_to_wp(image_path, wp, auth):
-    """Upload media file to WordPress"""
+    """
+    Upload media file to WordPress (retries are handled by http_client).
+    The file is sent as the raw request body with a Content-Disposition
+    header, so it is streamed from disk instead of built into a multipart body.
+    """
     logger.info(f"Starting media upload for: {image_path}")
     
-    for attempt in range(3):
-        try:
-            logger.debug(f"Attempt {attempt + 1} of 3")
-            logger.debug(f"Opening file: {image_path}")
-            
-            with open(image_path, "rb") as f:
-                filename = os.path.basename(image_path)
-                title = os.path.splitext(filename)[0]
-                
-                logger.debug(f"Preparing upload headers - filename: {filename}, title: {title}")
-                headers = {
-                    "Content-Disposition": f'attachment; filename="{filename}"'
-                }
-                
-                logger.debug(f"Making POST request to WordPress media API")
-                res = requests.post(
-                    f"{wp['url'].rstrip('/')}/wp-json/wp/v2/media",
-                    headers=headers,
-                    files={"file": (filename, f)},
-                    auth=auth,
-                    timeout=30,
-                    data={"title": title}
-                )
-                
-                logger.debug(f"Response status: {res.status_code}")
-                res.raise_for_status()
-                
-                media_data = res.json()
-                logger.debug(f"Upload successful - ID: {media_data['id']}, URL: {media_data['source_url']}")
-                return media_data["id"], media_data["source_url"]
-                
-        except (IOError, PermissionError) as e:
-            logger.warning(f"File access error on attempt {attempt + 1}: {str(e)}")
-            if attempt == 2:
-                logger.error("Max attempts reached for file access")
-                raise RequestException(f"File access failed: {str(e)}")
-            time.sleep(1 * (2 ** attempt))
-            logger.debug(f"Waiting {1 * (2 ** attempt)} seconds before retry")
+    try:
+        logger.debug(f"Opening file: {image_path}")
+        
+        with open(image_path, "rb") as f:
+            return _post_media(f, os.path.basename(image_path), os.fstat(f.fileno()).st_size, wp, auth)
             
-        except RequestException as e:
-            logger.error(f"WordPress upload failed: {str(e)}")
-            raise RequestException(f"WordPress upload failed: {str(e)}")
+    except (IOError, PermissionError) as e:
+        logger.error(f"File access error: {str(e)}")
+        raise RequestException(f"File access failed: {str(e)}")
+        
+    except RequestException as e:
+        logger.error(f"WordPress upload failed: {str(e)}")
+        raise RequestException(f"WordPress upload failed: {str(e)}")
+
+def upload_media_bytes(data, filename, wp, auth):
+    """Upload an in-memory image to WordPress under the given file name"""
+    logger.info(f"Starting media upload for: {filename} ({len(data)} bytes in memory)")
+    try:
+        return _post_media(io.BytesIO(data), filename, len(data), wp, auth)
+    except RequestException as e:
+        logger.error(f"WordPress upload failed: {str(e)}")
+        raise RequestException(f"WordPress upload failed: {str(e)}")
+
+def tmdb_image_url(path, max_width, kind="poster"):
+    """
+    URL of the smallest TMDb rendition of path that is at least max_width
+    wide (e.g. w500 for 450), or the original when no rendition is wide enough.
+    """
+    width = next((w for w in TMDB_IMAGE_WIDTHS.get(kind, TMDB_IMAGE_WIDTHS["poster"]) if w >= max_width), None)
+    return f"https://image.tmdb.org/t/p/{f'w{width}' if width else 'original'}{path}"
+
+def download_image(url, max_bytes=MAX_IMAGE_BYTES):
+    """
+    Download an image into memory. Returns (bytes, content type); raises
+    ValueError as soon as more than max_bytes arrive.
+    """
+    with http_client.get("images", url, stream=True) as r:
+        r.raise_for_status()
+        content_length = int(r.headers.get('content-length', 0))
+        if content_length > max_bytes:
+            raise ValueError(f"Image too large: {content_length} bytes")
+
+        buffer = io.BytesIO()
+        for chunk in r.iter_content(64 * 1024):
+            buffer.write(chunk)
+            if buffer.tell() > max_bytes:
+                raise ValueError(f"Image too large: more than {max_bytes} bytes")
+        return buffer.getvalue(), r.headers.get("content-type", "").split(";")[0].strip()
 
 def find_local_thumbnail(folder, filename, settings=None):
     """
@@ -221,30 +279,24 @@ def find_local_thumbnail(folder, filename, settings=None):
         logger.error(f"Local thumbnail search failed: {str(e)}", exc_info=True)
         return None
 
-def resize_image(input_path, max_size=(1200, 1200)):
-    """Resize image to specified maximum dimensions"""
+def resize_image(input_path, max_size=(1200, 1200), fmt=None, quality=None):
+    """
+    Resize image to specified maximum dimensions and return (bytes, extension).
+    The source file is left as it is; decoding and encoding run in the
+    image_engine process pool, re-encoding to fmt ("webp", "jpeg") if given.
+    """
     logger.info(f"Starting image resize for {input_path} (max size: {max_size})")
     
     try:
-        logger.debug(f"Opening image file: {input_path}")
-        with Image.open(input_path) as img:
-            original_size = img.size
-            logger.debug(f"Original dimensions: {original_size}")
-            
-            logger.debug("Resizing image...")
-            img.thumbnail(max_size)
-            
-            new_size = img.size
-            logger.debug(f"New dimensions: {new_size}")
-            
-            if new_size != original_size:
-                logger.info(f"Resized from {original_size} to {new_size}")
-            else:
-                logger.debug("Image already within size limits - no resizing needed")
-                
-            logger.debug("Saving resized image")
-            img.save(input_path)
+        with open(input_path, "rb") as f:
+            data = f.read()
+        resized, ext = image_engine.resize(data, max_size, fmt, quality)
+        if resized is not data:
+            logger.info(f"Resized {os.path.basename(input_path)}: {len(data) / 1024:.0f} KB -> {len(resized) / 1024:.0f} KB ({ext})")
+        else:
+            logger.debug("Image already within size limits - no resizing needed")
+        return resized, ext
             
     except Exception as e:
         logger.error(f"Image resize failed: {str(e)}", exc_info=True)
-        raise
\ No newline at end of file
+        raise
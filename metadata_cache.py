@@ -0,0 +1,151 @@
+# metadata_cache.py
+import os
+import re
+import json
+import time
+import logging
+import threading
+from db_utils import connect
+from singleflight import Group
+
+logger = logging.getLogger(__name__)
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+METADATA_CACHE_DB = os.path.join(SCRIPT_DIR, "config", "metadata_cache.db")
+
+# How long a found result is reused, and how long a "not found" is remembered
+DEFAULT_TTL = 7 * 24 * 60 * 60
+DEFAULT_NEGATIVE_TTL = 6 * 60 * 60
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS metadata (
+    source TEXT NOT NULL,
+    query TEXT NOT NULL,
+    value TEXT,
+    fetched_at REAL NOT NULL,
+    expires_at REAL NOT NULL,
+    PRIMARY KEY (source, query)
+);
+"""
+
+def normalize_query(query):
+    return re.sub(r"\s+", " ", str(query)).strip().lower()
+
+class MetadataCache:
+    """
+    On-disk cache of TMDb/OMDb/AniList lookups keyed by (source, normalized query).
+    A lookup that found nothing is cached as well (as null) for a shorter time.
+    Lookups that failed are never cached.
+    """
+
+    def __init__(self, path=METADATA_CACHE_DB, ttl=DEFAULT_TTL, negative_ttl=DEFAULT_NEGATIVE_TTL):
+        self.path = path
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._flights = Group()
+        self._local = threading.local()
+        self._conn().executescript(SCHEMA)
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = connect(self.path)
+            self._local.conn = conn
+        return conn
+
+    def configure(self, ttl=None, negative_ttl=None):
+        if ttl is not None:
+            self.ttl = ttl
+        if negative_ttl is not None:
+            self.negative_ttl = negative_ttl
+
+    def lookup(self, source, query):
+        """(True, value) for a fresh entry - value may be None for a cached miss - else (False, None)"""
+        row = self._conn().execute(
+            "SELECT value, expires_at FROM metadata WHERE source = ? AND query = ?",
+            (source, normalize_query(query))
+        ).fetchone()
+        if row is None or row["expires_at"] < time.time():
+            return False, None
+        return True, json.loads(row["value"]) if row["value"] is not None else None
+
+    def store(self, source, query, value):
+        now = time.time()
+        ttl = self.ttl if value is not None else self.negative_ttl
+        self._conn().execute(
+            "INSERT OR REPLACE INTO metadata (source, query, value, fetched_at, expires_at) VALUES (?, ?, ?, ?, ?)",
+            (source, normalize_query(query), json.dumps(value) if value is not None else None, now, now + ttl)
+        )
+
+    def get_or_fetch(self, source, query, fetch, hedge=False):
+        """
+        Cached value for (source, query), else fetch() and cache what it returns.
+        Concurrent misses for the same key share a single fetch(), except
+        hedged calls: they exist to send a second request, so they fetch on their own.
+        """
+        hit, value = self.lookup(source, query)
+        if hit:
+            logger.debug(f"Metadata cache hit for {source}: '{query}'{' (not found)' if value is None else ''}")
+            return value
+        if hedge:
+            return self._fetch_and_store(source, query, fetch)
+        return self._flights.do((source, normalize_query(query)), self._fetch_and_store, source, query, fetch)
+
+    def _fetch_and_store(self, source, query, fetch):
+        # A caller that waited for the previous flight of this key may find it cached now
+        hit, value = self.lookup(source, query)
+        if hit:
+            return value
+        value = fetch()
+        self.store(source, query, value)
+        return value
+
+    def purge_expired(self):
+        return self._conn().execute("DELETE FROM metadata WHERE expires_at < ?", (time.time(),)).rowcount
+
+    def clear(self, source=None):
+        if source:
+            return self._conn().execute("DELETE FROM metadata WHERE source = ?", (source,)).rowcount
+        return self._conn().execute("DELETE FROM metadata").rowcount
+
+    def stats(self):
+        now = time.time()
+        return [
+            dict(row) for row in self._conn().execute(
+                "SELECT source, COUNT(*) AS entries, SUM(value IS NULL) AS misses, "
+                "SUM(expires_at < ?) AS expired FROM metadata GROUP BY source",
+                (now,)
+            )
+        ]
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+def get_metadata_cache():
+    """Shared metadata cache for the default cache database"""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = MetadataCache()
+        return _default_cache
+
+if __name__ == "__main__":
+    import argparse
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    parser = argparse.ArgumentParser(description="Inspect or clear the metadata cache")
+    parser.add_argument("--stats", action="store_true", help="Show cached entries per source")
+    parser.add_argument("--purge-expired", action="store_true", help="Delete expired entries")
+    parser.add_argument("--clear", nargs="?", const="", metavar="SOURCE",
+                        help="Delete all entries (or only those of tmdb, omdb or anilist)")
+    args = parser.parse_args()
+
+    metadata_cache = get_metadata_cache()
+    if args.purge_expired:
+        print(f"Purged {metadata_cache.purge_expired()} expired entries")
+    if args.clear is not None:
+        print(f"Deleted {metadata_cache.clear(args.clear or None)} entries")
+    if args.stats or not (args.purge_expired or args.clear is not None):
+        for row in metadata_cache.stats():
+            print(f"{row['source']}: {row['entries']} entries ({row['misses']} not found, {row['expired']} expired)")
@@ -0,0 +1,443 @@
+# queue_store.py
+import os
+import json
+import time
+import logging
+import threading
+from datetime import datetime
+from db_utils import connect, transaction
+from utils import release_key
+
+logger = logging.getLogger(__name__)
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+LINKS_DIR = os.path.join(SCRIPT_DIR, "pending_links")
+QUEUE_DB = os.path.join(LINKS_DIR, "queue.db")
+# Rewritten next to the database whenever links become claimable, so QueueWatcher
+# can tell new work from the daemon's own writes to queue.db
+SIGNAL_FILE = "queue.signal"
+
+# Claimed items that were never completed (crashed worker) become visible again after this
+CLAIM_TIMEOUT = 15 * 60
+
+# Failed items are retried with exponential backoff and moved to the
+# dead-letter state once they have failed MAX_ATTEMPTS times
+MAX_ATTEMPTS = 5
+RETRY_BASE_DELAY = 30
+RETRY_MAX_DELAY = 60 * 60
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS queue (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    link TEXT NOT NULL,
+    filename TEXT NOT NULL,
+    thumbnail_path TEXT,
+    timestamp TEXT NOT NULL,
+    enqueued_at REAL NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    claimed_at REAL,
+    source TEXT UNIQUE,
+    release_key TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_eligible_at REAL NOT NULL DEFAULT 0,
+    last_error TEXT
+);
+"""
+
+# Bumped when stored values must be recomputed (PRAGMA user_version)
+SCHEMA_VERSION = 1
+
+# Columns added after the first release of the queue database
+UPGRADE_COLUMNS = {
+    "release_key": "TEXT",
+    "attempts": "INTEGER NOT NULL DEFAULT 0",
+    "next_eligible_at": "REAL NOT NULL DEFAULT 0",
+    "last_error": "TEXT"
+}
+
+INDEXES = """
+CREATE INDEX IF NOT EXISTS idx_queue_status_enqueued ON queue(status, enqueued_at, id);
+CREATE INDEX IF NOT EXISTS idx_queue_release ON queue(release_key, status, enqueued_at);
+"""
+
+def _new_timestamp():
+    return datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+
+class QueueStore:
+    """
+    SQLite-backed link queue.
+    Enqueue and claim are single indexed statements (O(log N)) and claims are
+    atomic, so several processes can drain the same queue safely.
+    """
+
+    def __init__(self, path=QUEUE_DB, claim_timeout=CLAIM_TIMEOUT, max_attempts=MAX_ATTEMPTS,
+                 retry_base_delay=RETRY_BASE_DELAY, retry_max_delay=RETRY_MAX_DELAY):
+        self.path = path
+        self.claim_timeout = claim_timeout
+        self.max_attempts = max_attempts
+        self.retry_base_delay = retry_base_delay
+        self.retry_max_delay = retry_max_delay
+        self.signal_path = os.path.join(os.path.dirname(os.path.abspath(path)), SIGNAL_FILE)
+        self._local = threading.local()
+        conn = self._conn()
+        conn.executescript(SCHEMA)
+        self._upgrade_schema(conn)
+        conn.executescript(INDEXES)
+
+    def _upgrade_schema(self, conn):
+        existing = {row["name"] for row in conn.execute("PRAGMA table_info(queue)")}
+        missing = {name: decl for name, decl in UPGRADE_COLUMNS.items() if name not in existing}
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        if not missing and version >= SCHEMA_VERSION:
+            return
+        with transaction(conn):
+            for name, decl in missing.items():
+                conn.execute(f"ALTER TABLE queue ADD COLUMN {name} {decl}")
+            if "release_key" in missing or version < SCHEMA_VERSION:
+                # Version 1: release_key() is None for filenames without a title
+                rows = conn.execute("SELECT id, filename FROM queue").fetchall()
+                conn.executemany(
+                    "UPDATE queue SET release_key = ? WHERE id = ?",
+                    ((release_key(row["filename"]), row["id"]) for row in rows)
+                )
+            conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        if missing:
+            logger.info(f"Upgraded queue database with columns: {', '.join(missing)}")
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = connect(self.path, synchronous="FULL")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _row_to_item(row):
+        item = {
+            "id": row["id"],
+            "link": row["link"],
+            "filename": row["filename"],
+            "timestamp": row["timestamp"],
+            "release_key": row["release_key"],
+            "attempts": row["attempts"],
+            "processed": False
+        }
+        if row["thumbnail_path"]:
+            item["thumbnail_path"] = row["thumbnail_path"]
+        return item
+
+    def _notify(self):
+        """Tell a watching daemon that there is new work"""
+        try:
+            with open(self.signal_path, "w", encoding="utf-8") as f:
+                f.write(str(time.time()))
+        except OSError as e:
+            logger.warning(f"Could not signal new queue items: {str(e)}")
+
+    def set_retry_policy(self, max_attempts=None, base_delay=None, max_delay=None):
+        """Override the retry budget and backoff used by fail()"""
+        if max_attempts is not None:
+            self.max_attempts = max(1, int(max_attempts))
+        if base_delay is not None:
+            self.retry_base_delay = float(base_delay)
+        if max_delay is not None:
+            self.retry_max_delay = float(max_delay)
+
+    def _reclaim_stale(self, conn, now):
+        """Return expired claims to the queue; a crash while processing counts as a failed attempt"""
+        conn.execute(
+            "UPDATE queue SET status = CASE WHEN attempts + 1 >= ? THEN 'dead' ELSE 'pending' END, "
+            "attempts = attempts + 1, claimed_at = NULL, last_error = 'Claim expired before completion' "
+            "WHERE status = 'claimed' AND claimed_at < ?",
+            (self.max_attempts, now - self.claim_timeout)
+        )
+
+    def enqueue(self, link, filename, thumbnail_path=None, timestamp=None, enqueued_at=None, source=None):
+        """Add a link to the queue and return its item id"""
+        with transaction(self._conn()) as conn:
+            cur = conn.execute(
+                "INSERT OR IGNORE INTO queue (link, filename, thumbnail_path, timestamp, enqueued_at, source, release_key) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (link, filename, thumbnail_path, timestamp or _new_timestamp(),
+                 enqueued_at if enqueued_at is not None else time.time(), source, release_key(filename))
+            )
+        if not cur.rowcount:
+            return None
+        self._notify()
+        return cur.lastrowid
+
+    def enqueue_many(self, items):
+        """
+        Add many links in a single transaction (one durable commit).
+        Items are dicts with link, filename and optional thumbnail_path.
+        Returns the number of rows inserted.
+        """
+        now = time.time()
+        rows = (
+            (item["link"], item["filename"], item.get("thumbnail_path"),
+             item.get("timestamp") or _new_timestamp(), now, None, release_key(item["filename"]))
+            for item in items
+        )
+        with transaction(self._conn()) as conn:
+            before = conn.total_changes
+            conn.executemany(
+                "INSERT OR IGNORE INTO queue (link, filename, thumbnail_path, timestamp, enqueued_at, source, release_key) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                rows
+            )
+            inserted = conn.total_changes - before
+        if inserted:
+            self._notify()
+        return inserted
+
+    def claim(self):
+        """Atomically claim the oldest pending item, or return None when the queue is empty"""
+        now = time.time()
+        with transaction(self._conn()) as conn:
+            self._reclaim_stale(conn, now)
+            row = conn.execute(
+                "SELECT * FROM queue WHERE status = 'pending' AND next_eligible_at <= ? "
+                "ORDER BY enqueued_at, id LIMIT 1",
+                (now,)
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE queue SET status = 'claimed', claimed_at = ? WHERE id = ?",
+                (now, row["id"])
+            )
+        return self._row_to_item(row)
+
+    def claim_group(self, window=0, min_age=0):
+        """
+        Claim the oldest pending item together with every pending item of the
+        same release enqueued within `window` seconds of it, so all host links
+        of a release can be published in one write.
+        Only items at least `min_age` seconds old are eligible as the head,
+        giving late host links a chance to arrive. Returns a list (empty when
+        nothing is ready).
+        """
+        now = time.time()
+        with transaction(self._conn()) as conn:
+            self._reclaim_stale(conn, now)
+            head = conn.execute(
+                "SELECT * FROM queue WHERE status = 'pending' AND enqueued_at <= ? "
+                "AND next_eligible_at <= ? ORDER BY enqueued_at, id LIMIT 1",
+                (now - min_age, now)
+            ).fetchone()
+            if head is None:
+                return []
+            rows = [head]
+            if head["release_key"]:
+                rows += conn.execute(
+                    "SELECT * FROM queue WHERE release_key = ? AND status = 'pending' "
+                    "AND enqueued_at <= ? AND next_eligible_at <= ? AND id != ? ORDER BY enqueued_at, id",
+                    (head["release_key"], head["enqueued_at"] + window, now, head["id"])
+                ).fetchall()
+            conn.executemany(
+                "UPDATE queue SET status = 'claimed', claimed_at = ? WHERE id = ?",
+                ((now, row["id"]) for row in rows)
+            )
+        return [self._row_to_item(row) for row in rows]
+
+    def seconds_until_ready(self, min_age=0):
+        """
+        Seconds until some pending item is at least min_age old and past its
+        retry backoff, or None if nothing is pending.
+        """
+        row = self._conn().execute(
+            "SELECT MIN(MAX(enqueued_at + ?, next_eligible_at)) FROM queue WHERE status = 'pending'",
+            (min_age,)
+        ).fetchone()
+        if row[0] is None:
+            return None
+        return max(0.0, row[0] - time.time())
+
+    def complete(self, item_id):
+        """Remove a successfully processed item"""
+        with transaction(self._conn()) as conn:
+            conn.execute("DELETE FROM queue WHERE id = ?", (item_id,))
+
+    def release(self, item_id):
+        """Return a claimed item to the queue"""
+        with transaction(self._conn()) as conn:
+            conn.execute(
+                "UPDATE queue SET status = 'pending', claimed_at = NULL WHERE id = ?",
+                (item_id,)
+            )
+
+    def fail(self, item_id, error):
+        """
+        Record a failed attempt. The item becomes eligible again after an
+        exponential backoff, or moves to the dead-letter state once its retry
+        budget is spent. Returns True if the item was dead-lettered.
+        """
+        now = time.time()
+        with transaction(self._conn()) as conn:
+            row = conn.execute("SELECT attempts FROM queue WHERE id = ?", (item_id,)).fetchone()
+            if row is None:
+                return False
+            attempts = row["attempts"] + 1
+            dead = attempts >= self.max_attempts
+            delay = min(self.retry_max_delay, self.retry_base_delay * (2 ** (attempts - 1)))
+            conn.execute(
+                "UPDATE queue SET status = ?, attempts = ?, next_eligible_at = ?, "
+                "claimed_at = NULL, last_error = ? WHERE id = ?",
+                ("dead" if dead else "pending", attempts, now + delay, str(error)[:1000], item_id)
+            )
+        if dead:
+            logger.error(f"Queue item #{item_id} moved to dead letters after {attempts} attempts")
+        else:
+            logger.warning(f"Queue item #{item_id} failed (attempt {attempts}/{self.max_attempts}), "
+                           f"retrying in {delay:.0f}s")
+        return dead
+
+    def dead_letters(self):
+        """All dead-lettered items, oldest first"""
+        rows = self._conn().execute(
+            "SELECT * FROM queue WHERE status = 'dead' ORDER BY enqueued_at, id"
+        ).fetchall()
+        items = []
+        for row in rows:
+            item = self._row_to_item(row)
+            item["last_error"] = row["last_error"]
+            items.append(item)
+        return items
+
+    def requeue(self, item_ids=None):
+        """Move dead letters (all, or the given ids) back to the queue with a fresh retry budget"""
+        with transaction(self._conn()) as conn:
+            if item_ids is None:
+                cur = conn.execute(
+                    "UPDATE queue SET status = 'pending', attempts = 0, next_eligible_at = 0 "
+                    "WHERE status = 'dead'"
+                )
+            else:
+                cur = conn.executemany(
+                    "UPDATE queue SET status = 'pending', attempts = 0, next_eligible_at = 0 "
+                    "WHERE status = 'dead' AND id = ?",
+                    ((item_id,) for item_id in item_ids)
+                )
+        if cur.rowcount:
+            self._notify()
+        return cur.rowcount
+
+    def peek(self, limit=100, min_age=0):
+        """
+        Pending items that claim_group() could hand out now (at least min_age
+        seconds old and past their retry backoff), in queue order, without claiming them
+        """
+        now = time.time()
+        rows = self._conn().execute(
+            "SELECT * FROM queue WHERE status = 'pending' AND enqueued_at <= ? AND next_eligible_at <= ? "
+            "ORDER BY enqueued_at, id LIMIT ?",
+            (now - min_age, now, limit)
+        ).fetchall()
+        return [self._row_to_item(row) for row in rows]
+
+    def count(self, status=None):
+        """Number of items in the queue, optionally filtered by status"""
+        if status:
+            row = self._conn().execute("SELECT COUNT(*) FROM queue WHERE status = ?", (status,)).fetchone()
+        else:
+            row = self._conn().execute("SELECT COUNT(*) FROM queue").fetchone()
+        return row[0]
+
+    def migrate_directory(self, directory=LINKS_DIR):
+        """
+        Import legacy link_*.json files from the pending_links directory.
+        Files are imported in modification-time order and deleted once committed;
+        re-running after an interrupted migration does not create duplicates.
+        """
+        if not os.path.isdir(directory):
+            return 0
+
+        files = sorted(
+            (f for f in os.listdir(directory) if f.endswith('.json')),
+            key=lambda x: os.path.getmtime(os.path.join(directory, x))
+        )
+        if not files:
+            return 0
+
+        imported = []
+        with transaction(self._conn()) as conn:
+            for name in files:
+                path = os.path.join(directory, name)
+                try:
+                    with open(path, 'r', encoding='utf-8') as f:
+                        data = json.load(f)
+                    conn.execute(
+                        "INSERT OR IGNORE INTO queue (link, filename, thumbnail_path, timestamp, enqueued_at, source, release_key) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        (data["link"], data["filename"], data.get("thumbnail_path"),
+                         data.get("timestamp") or _new_timestamp(), os.path.getmtime(path), name,
+                         release_key(data["filename"]))
+                    )
+                    imported.append(path)
+                except (json.JSONDecodeError, KeyError) as e:
+                    logger.error(f"Skipping invalid queue file {path}: {str(e)}")
+                except OSError as e:
+                    logger.error(f"Could not read queue file {path}: {str(e)}")
+
+        for path in imported:
+            try:
+                os.remove(path)
+            except OSError as e:
+                logger.warning(f"Imported {path} but could not remove it: {str(e)}")
+
+        logger.info(f"Migrated {len(imported)} queued links from {directory}")
+        return len(imported)
+
+_default_store = None
+_default_store_lock = threading.Lock()
+
+def get_store():
+    """Shared queue store for the default queue database"""
+    global _default_store
+    with _default_store_lock:
+        if _default_store is None:
+            _default_store = QueueStore()
+        return _default_store
+
+if __name__ == "__main__":
+    import argparse
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    def requeue_id(value):
+        """--requeue argument: a queue item ID or 'all'"""
+        if value == "all":
+            return value
+        try:
+            item_id = int(value)
+        except ValueError:
+            item_id = 0
+        if item_id <= 0:
+            raise argparse.ArgumentTypeError(f"invalid ID {value!r} (expected a link ID or 'all')")
+        return item_id
+
+    parser = argparse.ArgumentParser(description="Manage the pending link queue")
+    parser.add_argument("--migrate", nargs="?", const=LINKS_DIR, metavar="DIR",
+                        help="Import link_*.json files from a pending_links directory")
+    parser.add_argument("--stats", action="store_true", help="Show queue counts")
+    parser.add_argument("--dead", action="store_true", help="List dead-lettered links")
+    parser.add_argument("--requeue", nargs="+", metavar="ID", type=requeue_id,
+                        help="Move dead-lettered links back to the queue (IDs or 'all')")
+    args = parser.parse_args()
+    if args.requeue and "all" in args.requeue and len(args.requeue) > 1:
+        parser.error("--requeue: 'all' cannot be combined with IDs")
+
+    store = get_store()
+    if args.migrate:
+        print(f"Imported {store.migrate_directory(args.migrate)} links")
+    if args.dead:
+        for item in store.dead_letters():
+            print(f"#{item['id']}  {item['filename']}  ({item['attempts']} attempts)")
+            print(f"    {item['link']}")
+            print(f"    Last error: {item['last_error']}")
+    if args.requeue:
+        ids = None if args.requeue == ["all"] else args.requeue
+        print(f"Requeued {store.requeue(ids)} links")
+    if args.stats or not (args.migrate or args.dead or args.requeue):
+        print(f"Pending: {store.count('pending')}  Claimed: {store.count('claimed')}  "
+              f"Dead: {store.count('dead')}")
@@ -0,0 +1,109 @@
+# queue_watcher.py
+import os
+import time
+import logging
+import threading
+from queue_store import SIGNAL_FILE
+
+logger = logging.getLogger(__name__)
+
+try:
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+    WATCHDOG_AVAILABLE = True
+except ImportError:  # Optional dependency - fall back to polling
+    WATCHDOG_AVAILABLE = False
+
+def _is_input(path):
+    """New work: the queue's signal file or a link_*.json file from an older save_links.py"""
+    name = os.path.basename(path)
+    return name == SIGNAL_FILE or name.endswith(".json")
+
+class QueueWatcher:
+    """
+    Wait for new links in the pending_links directory.
+    Uses native filesystem events (inotify / ReadDirectoryChangesW via watchdog)
+    when available and falls back to cheap stat polling otherwise. Only the
+    signal file written by enqueues and new link files count; the daemon's own
+    writes to queue.db and the removal of imported link files do not.
+    """
+
+    def __init__(self, directory, poll_interval=1.0):
+        self.directory = directory
+        self.poll_interval = poll_interval
+        self._event = threading.Event()
+        self._observer = None
+        self._last_signature = None
+        os.makedirs(directory, exist_ok=True)
+
+    def start(self):
+        if WATCHDOG_AVAILABLE:
+            try:
+                watcher = self
+
+                class _Handler(FileSystemEventHandler):
+                    def on_any_event(self, event):
+                        if event.is_directory or event.event_type not in ("created", "modified", "moved", "closed"):
+                            return
+                        if _is_input(getattr(event, "dest_path", "") or event.src_path):
+                            watcher._event.set()
+
+                self._observer = Observer()
+                self._observer.schedule(_Handler(), self.directory, recursive=False)
+                self._observer.start()
+                logger.info(f"Watching {self.directory} for filesystem events")
+                return self
+            except Exception as e:
+                logger.warning(f"Filesystem events unavailable ({e}), falling back to polling")
+                self._observer = None
+        logger.info(f"Polling {self.directory} every {self.poll_interval}s")
+        self._last_signature = self._signature()
+        return self
+
+    def stop(self):
+        if self._observer:
+            self._observer.stop()
+            self._observer.join(timeout=5)
+            self._observer = None
+
+    def _signature(self):
+        """Cheap change marker: the signal file's mtime and the link files present"""
+        try:
+            st = os.stat(os.path.join(self.directory, SIGNAL_FILE))
+            signal = (st.st_mtime_ns, st.st_size)
+        except OSError:
+            signal = None
+        try:
+            files = frozenset(name for name in os.listdir(self.directory) if _is_input(name))
+        except OSError:
+            files = frozenset()
+        return signal, files
+
+    def _changed(self, signature):
+        """A new signal or link file; link files disappearing (imported) does not count"""
+        signal, files = signature
+        old_signal, old_files = self._last_signature
+        return (signal is not None and signal != old_signal) or not files <= old_files
+
+    def clear(self):
+        """Forget events seen so far (call right before draining the queue)"""
+        self._event.clear()
+        if not self._observer:
+            self._last_signature = self._signature()
+
+    def wait(self, timeout=None):
+        """Block until the directory changes or timeout expires. Returns True on change."""
+        if self._observer:
+            return self._event.wait(timeout)
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            signature = self._signature()
+            changed = self._changed(signature)
+            self._last_signature = signature
+            if changed:
+                return True
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            remaining = self.poll_interval if deadline is None else min(self.poll_interval, deadline - time.monotonic())
+            time.sleep(max(remaining, 0.05))
@@ -0,0 +1,114 @@
+# rate_governor.py
+import time
+import logging
+import threading
+from retry_policy import retry_after_seconds
+
+logger = logging.getLogger(__name__)
+
+# Requests per second for each upstream: where to start, the ceiling the
+# governor may climb to, the floor it never drops below, and how many
+# requests may go out back to back. AniList documents 90 requests/minute.
+GOVERNORS = {
+    "wordpress": {"rate": 10.0, "max_rate": 50.0, "min_rate": 0.5, "burst": 10},
+    "tmdb": {"rate": 20.0, "max_rate": 40.0, "min_rate": 1.0, "burst": 20},
+    "omdb": {"rate": 5.0, "max_rate": 10.0, "min_rate": 0.2, "burst": 5},
+    "anilist": {"rate": 1.5, "max_rate": 1.5, "min_rate": 0.1, "burst": 3},
+    "images": {"rate": 50.0, "max_rate": 100.0, "min_rate": 1.0, "burst": 20},
+}
+
+class RateGovernor:
+    """
+    AIMD rate limiter for one upstream. Callers queue in acquire() for the next
+    send slot (a token bucket kept as a theoretical arrival time) instead of
+    failing. Every accepted response raises the rate a little; 429s halve it
+    (at most once per cooldown), and Retry-After or an exhausted
+    X-RateLimit-Remaining pauses all sends until the server is ready again.
+    """
+
+    def __init__(self, name, rate, max_rate, min_rate=0.1, burst=1, decrease=0.5, cooldown=2.0):
+        self.name = name
+        self.max_rate = float(max_rate)
+        self.min_rate = float(min_rate)
+        self.rate = min(float(rate), self.max_rate)
+        self.burst = max(1, int(burst))
+        self.decrease = decrease
+        self.cooldown = cooldown
+        # Additive increase: about 2% of the ceiling per second of full-rate success
+        self.increase = self.max_rate * 0.02
+        self._tat = 0.0
+        self._paused_until = 0.0
+        self._last_decrease = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a request may be sent"""
+        with self._lock:
+            now = time.monotonic()
+            tat = max(self._tat, now, self._paused_until)
+            ready = max(tat - (self.burst - 1) / self.rate, self._paused_until)
+            self._tat = tat + 1.0 / self.rate
+        wait = ready - now
+        if wait > 0:
+            time.sleep(wait)
+        return max(wait, 0.0)
+
+    def pause(self, seconds):
+        """Hold every send for the given number of seconds"""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    def _slow_down(self, reason):
+        with self._lock:
+            now = time.monotonic()
+            if now - self._last_decrease < self.cooldown:
+                return
+            self._last_decrease = now
+            old = self.rate
+            self.rate = max(self.min_rate, self.rate * self.decrease)
+        logger.info(f"{self.name}: {reason}, rate {old:.2f} -> {self.rate:.2f} req/s")
+
+    def observe(self, response=None, error=None):
+        """Learn from the outcome of a request sent after acquire()"""
+        if response is None:
+            if error is not None and "timed out" in str(error).lower():
+                self._slow_down("request timed out")
+            return
+
+        status = response.status_code
+        if status == 429 or (status == 503 and "Retry-After" in response.headers):
+            self._slow_down(f"HTTP {status}")
+            delay = retry_after_seconds(response)
+            if delay:
+                self.pause(delay)
+            return
+
+        remaining = response.headers.get("X-RateLimit-Remaining")
+        reset = response.headers.get("X-RateLimit-Reset")
+        if remaining is not None and reset and remaining.strip() == "0":
+            try:
+                # AniList (and others) send the reset time as a Unix timestamp
+                self.pause(max(0.0, float(reset) - time.time()))
+            except ValueError:
+                pass
+
+        if status < 500:
+            with self._lock:
+                self.rate = min(self.max_rate, self.rate + self.increase / self.rate)
+
+_governors = {}
+_governors_lock = threading.Lock()
+
+def get_governor(upstream):
+    with _governors_lock:
+        governor = _governors.get(upstream)
+        if governor is None:
+            config = GOVERNORS.get(upstream, {"rate": 10.0, "max_rate": 10.0})
+            governor = _governors[upstream] = RateGovernor(upstream, **config)
+        return governor
+
+def configure(upstream, **overrides):
+    """Replace an upstream's governor with GOVERNORS[upstream] updated by overrides"""
+    with _governors_lock:
+        GOVERNORS[upstream] = dict(GOVERNORS.get(upstream, {"rate": 10.0, "max_rate": 10.0}), **overrides)
+        _governors[upstream] = RateGovernor(upstream, **GOVERNORS[upstream])
@@ -0,0 +1,236 @@
+# retry_policy.py
+import time
+import random
+import logging
+import threading
+from email.utils import parsedate_to_datetime
+from requests.exceptions import RequestException, ConnectionError, ConnectTimeout, Timeout
+
+logger = logging.getLogger(__name__)
+
+# Responses worth another attempt. 429 and 503 mean the request was not
+# processed, so they are retried even for non-idempotent methods.
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+REJECTED_STATUSES = {429, 503}
+# 429 responses retried on top of max_attempts before giving up
+MAX_THROTTLED_RETRIES = 10
+
+# Retry settings for each upstream:
+#   max_attempts     attempts per call including the first
+#   base_delay       full-jitter backoff: sleep uniform(0, min(max_delay, base_delay * 2**n))
+#   max_retry_after  give up instead of honoring a longer Retry-After
+#   budget_ratio     retries allowed per request made (plus budget_reserve in reserve)
+#   failure_threshold / reset_timeout  circuit breaker: open after this many consecutive
+#                    failures, then let one probe through after reset_timeout seconds
+POLICIES = {
+    "wordpress": {"max_attempts": 4, "base_delay": 1.0, "max_delay": 30, "max_retry_after": 120,
+                  "budget_ratio": 0.2, "budget_reserve": 10, "failure_threshold": 5, "reset_timeout": 60},
+    "tmdb": {"max_attempts": 3, "base_delay": 0.5, "max_delay": 10, "max_retry_after": 30,
+             "budget_ratio": 0.2, "budget_reserve": 10, "failure_threshold": 5, "reset_timeout": 30},
+    "omdb": {"max_attempts": 3, "base_delay": 0.5, "max_delay": 10, "max_retry_after": 30,
+             "budget_ratio": 0.2, "budget_reserve": 5, "failure_threshold": 5, "reset_timeout": 60},
+    "anilist": {"max_attempts": 3, "base_delay": 1.0, "max_delay": 30, "max_retry_after": 90,
+                "budget_ratio": 0.2, "budget_reserve": 10, "failure_threshold": 5, "reset_timeout": 60},
+    "images": {"max_attempts": 3, "base_delay": 0.5, "max_delay": 10, "max_retry_after": 30,
+               "budget_ratio": 0.2, "budget_reserve": 10, "failure_threshold": 8, "reset_timeout": 30},
+}
+
+class CircuitOpenError(RequestException):
+    """Raised without sending anything while an upstream's circuit is open"""
+
+class RetryBudget:
+    """
+    Caps retries to a fraction of the requests made, so an outage cannot
+    multiply traffic: every request deposits `ratio` tokens, every retry
+    withdraws one.
+    """
+
+    def __init__(self, ratio, reserve):
+        self.ratio = ratio
+        self.capacity = reserve
+        self._tokens = float(reserve)
+        self._lock = threading.Lock()
+
+    def deposit(self):
+        with self._lock:
+            self._tokens = min(self.capacity, self._tokens + self.ratio)
+
+    def withdraw(self):
+        with self._lock:
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
+
+class CircuitBreaker:
+    """Closed -> open after consecutive failures -> half-open probe after reset_timeout"""
+
+    def __init__(self, name, failure_threshold, reset_timeout):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self):
+        with self._lock:
+            return self._opened_at is not None
+
+    def before_call(self):
+        """
+        Raise CircuitOpenError unless a request may be sent now.
+        Returns True when this call is the half-open probe; the caller must
+        then call end_probe() once it is done, whatever the outcome.
+        """
+        with self._lock:
+            if self._opened_at is None:
+                return False
+            remaining = self._opened_at + self.reset_timeout - time.monotonic()
+            if remaining > 0 or self._probing:
+                raise CircuitOpenError(
+                    f"{self.name} is unavailable, failing fast for {max(remaining, 0):.0f}s"
+                )
+            # Half-open: let this one request find out whether the upstream is back
+            self._probing = True
+            return True
+
+    def end_probe(self):
+        """Let the next call probe again if the probe ended without recording an outcome"""
+        with self._lock:
+            self._probing = False
+
+    def record_success(self):
+        with self._lock:
+            if self._opened_at is not None:
+                logger.info(f"{self.name} circuit closed")
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._probing or (self._opened_at is None and self._failures >= self.failure_threshold):
+                logger.warning(f"{self.name} circuit opened after {self._failures} failure(s)")
+                self._opened_at = time.monotonic()
+            self._probing = False
+
+def retry_after_seconds(response):
+    """Seconds requested by a Retry-After header (delta or HTTP date), else None"""
+    value = response.headers.get("Retry-After") if response is not None else None
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+class RetryPolicy:
+    """Retries, backoff, retry budget and circuit breaker of one upstream"""
+
+    def __init__(self, name, max_attempts=3, base_delay=0.5, max_delay=10, max_retry_after=30,
+                 budget_ratio=0.2, budget_reserve=10, failure_threshold=5, reset_timeout=30):
+        self.name = name
+        self.max_attempts = max(1, int(max_attempts))
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_retry_after = max_retry_after
+        self.budget = RetryBudget(budget_ratio, budget_reserve)
+        self.breaker = CircuitBreaker(name, failure_threshold, reset_timeout)
+
+    def backoff(self, retry):
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** retry)))
+
+    def call(self, send, idempotent=True, label=""):
+        """
+        Call send() until it returns a non-retryable response or attempts run out.
+        Returns the last response; raises the last exception if none was received.
+        """
+        label = label or self.name
+        probe = self.breaker.before_call()
+        try:
+            self.budget.deposit()
+            attempt = throttled_retries = 0
+            while True:
+                attempt += 1
+                response, error = None, None
+                try:
+                    response = send()
+                except RequestException as e:
+                    error = e
+
+                if error is not None:
+                    self.breaker.record_failure()
+                    # A POST that timed out while reading may have been processed already
+                    retryable = idempotent or isinstance(error, ConnectTimeout) or (
+                        isinstance(error, ConnectionError) and not isinstance(error, Timeout)
+                        and "Connection aborted" not in str(error)
+                    )
+                    delay = self.backoff(attempt - 1)
+                else:
+                    status = response.status_code
+                    if status >= 500:
+                        self.breaker.record_failure()
+                    else:
+                        self.breaker.record_success()
+                    retryable = status in RETRY_STATUSES and (idempotent or status in REJECTED_STATUSES)
+                    if not retryable:
+                        return response
+                    delay = retry_after_seconds(response)
+                    if delay is None:
+                        delay = self.backoff(attempt - 1)
+                    elif delay > self.max_retry_after:
+                        logger.warning(f"{label}: Retry-After {delay:.0f}s is too long, giving up")
+                        return response
+
+                # Rate-limited requests are queued by rate_governor rather than failed:
+                # they neither count as attempts nor spend the retry budget
+                throttled = response is not None and response.status_code == 429
+                if throttled:
+                    throttled_retries += 1
+                    attempt -= 1
+                if not retryable or attempt >= self.max_attempts or throttled_retries > MAX_THROTTLED_RETRIES:
+                    break
+                if self.breaker.is_open:
+                    logger.warning(f"{label}: {self.name} circuit opened, not retrying")
+                    break
+                if not throttled and not self.budget.withdraw():
+                    logger.warning(f"{label}: {self.name} retry budget exhausted, not retrying")
+                    break
+                reason = str(error) if error is not None else f"HTTP {response.status_code}"
+                logger.info(f"{label} failed ({reason}), retrying in {delay:.1f}s")
+                if response is not None:
+                    response.close()
+                time.sleep(delay)
+
+            if error is not None:
+                raise error
+            return response
+        finally:
+            if probe:
+                # Without this, a probe that raised something other than a
+                # RequestException would leave the circuit half-open for good
+                self.breaker.end_probe()
+
+_policies = {}
+_policies_lock = threading.Lock()
+
+def get_policy(upstream):
+    with _policies_lock:
+        policy = _policies.get(upstream)
+        if policy is None:
+            policy = _policies[upstream] = RetryPolicy(upstream, **POLICIES.get(upstream, {}))
+        return policy
+
+def configure(upstream, **overrides):
+    """Replace an upstream's policy with POLICIES[upstream] updated by overrides"""
+    with _policies_lock:
+        POLICIES[upstream] = dict(POLICIES.get(upstream, {}), **overrides)
+        _policies[upstream] = RetryPolicy(upstream, **POLICIES[upstream])
@@ -5,6 +5,7 @@ import time
 import logging
 import tempfile
 import errno
+import threading
 import msvcrt  # Windows-specific
 from typing import Any, Dict, Optional
 
@@ -103,4 +104,22 @@ def save_json(path: str, data: Any, max_retries: int = 3, retry_delay: float = 0
             continue
     
     logger.error(f"Failed to save JSON after {max_retries} attempts: {last_error}")
-    return False
\ No newline at end of file
+    return False
+
+_path_locks = {}
+_path_locks_guard = threading.Lock()
+
+def _path_lock(path: str) -> threading.RLock:
+    with _path_locks_guard:
+        return _path_locks.setdefault(os.path.abspath(path), threading.RLock())
+
+def update_json(path: str, mutator) -> Dict[str, Any]:
+    """
+    Load, modify and save a JSON file as one step for all threads of this process.
+    mutator receives the loaded dict and changes it in place. Returns the saved data.
+    """
+    with _path_lock(path):
+        data = load_json(path)
+        mutator(data)
+        save_json(path, data)
+        return data
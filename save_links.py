@@ -3,8 +3,8 @@ import os
 import json
 import time
 import logging
-from datetime import datetime
 from file_utils import force_file_unlock  # Your existing Windows file utility
+from queue_store import get_store, LINKS_DIR
 
 # Configure logging
 logging.basicConfig(
@@ -18,7 +18,6 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
-LINKS_DIR = os.path.join(SCRIPT_DIR, "pending_links")
 LOCK_FILE = os.path.join(LINKS_DIR, ".lock")
 os.makedirs(LINKS_DIR, exist_ok=True)
 
@@ -51,56 +50,142 @@ def release_lock():
         force_file_unlock(LOCK_FILE)  # Force unlock if normal removal fails
 
 def save_link(link, filename, thumbnail_path=None):
-    """Thread-safe link saving with file locking"""
+    """Thread-safe link saving into the queue store"""
+    try:
+        data = _normalize_item((link, filename, thumbnail_path))
+    except ValueError as e:
+        logger.error(f"Not saving link: {str(e)}")
+        return None
+
     if not acquire_lock():
         logger.error("Could not acquire lock, skipping save")
         return None
     
     try:
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
-        filepath = os.path.join(LINKS_DIR, f"link_{timestamp}.json")
-        
-        data = {
-            "link": link,
-            "filename": filename,
-            "timestamp": timestamp,
-            "processed": False
-        }
-        
-        if thumbnail_path:
-            data["thumbnail_path"] = thumbnail_path
-        
-        # Atomic write operation
-        temp_path = f"{filepath}.tmp"
-        with open(temp_path, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=2)
-            f.flush()
-            os.fsync(f.fileno())
-        
-        # Rename temp file to final name
-        os.replace(temp_path, filepath)
-        logger.info(f"Saved link to {filepath}")
-        return filepath
+        item_id = get_store().enqueue(data["link"], data["filename"], data.get("thumbnail_path"))
+        logger.info(f"Queued link #{item_id} for {data['filename']}")
+        return item_id
     except Exception as e:
         logger.error(f"Failed to save link: {str(e)}")
         return None
     finally:
         release_lock()
 
+def _normalize_item(item):
+    """
+    Accept dicts or (link, filename[, thumbnail_path]) sequences.
+    Raises ValueError unless link and filename are non-empty strings.
+    """
+    if isinstance(item, dict):
+        data = dict(item)
+    elif isinstance(item, (list, tuple)) and len(item) >= 2:
+        data = dict(zip(("link", "filename", "thumbnail_path"), item))
+    else:
+        raise ValueError(f"Expected link and filename: {item!r}")
+    for field in ("link", "filename"):
+        value = data.get(field)
+        if not isinstance(value, str) or not value.strip():
+            raise ValueError(f"Missing {field}: {item!r}")
+        data[field] = value.strip()
+    if not data.get("thumbnail_path"):
+        data.pop("thumbnail_path", None)
+    return data
+
+def save_links_bulk(items):
+    """
+    Enqueue a whole batch under one lock with one durable commit.
+    Returns the number of links queued, or None if the batch could not be saved.
+    """
+    batch = []
+    for item in items:
+        try:
+            batch.append(_normalize_item(item))
+        except ValueError as e:
+            logger.warning(f"Skipping invalid entry: {str(e)}")
+
+    if not acquire_lock():
+        logger.error("Could not acquire lock, skipping bulk save")
+        return None
+
+    try:
+        start = time.perf_counter()
+        count = get_store().enqueue_many(batch)
+        elapsed = time.perf_counter() - start
+        rate = count / elapsed if elapsed > 0 else float("inf")
+        logger.info(f"Queued {count} links in {elapsed:.3f}s ({rate:.0f} items/s)")
+        return count
+    except Exception as e:
+        logger.error(f"Failed to save link batch: {str(e)}")
+        return None
+    finally:
+        release_lock()
+
+def read_jsonl(stream):
+    """
+    Yield queue entries from JSON Lines input.
+    Plain "link<TAB>filename[<TAB>thumbnail_path]" lines are accepted too.
+    """
+    for line_no, line in enumerate(stream, 1):
+        line = line.strip()
+        if not line:
+            continue
+        if line.startswith("{"):
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError as e:
+                logger.warning(f"Skipping line {line_no}: {str(e)}")
+        else:
+            yield line.split("\t")
+
 if __name__ == "__main__":
     import sys
-    
-    if len(sys.argv) < 3:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Queue download links for AutoUploader")
+    parser.add_argument("link", nargs="?", help="Download link")
+    parser.add_argument("filename", nargs="?", help="File name")
+    parser.add_argument("thumbnail_path", nargs="?", help="Path to file for thumbnail search")
+    parser.add_argument("--stdin", action="store_true", help="Read JSON Lines entries from stdin")
+    parser.add_argument("--jsonl", metavar="FILE", help="Read JSON Lines entries from FILE")
+    args = parser.parse_args()
+
+    if args.stdin or args.jsonl:
+        if args.jsonl:
+            try:
+                with open(args.jsonl, "r", encoding="utf-8") as f:
+                    items = list(read_jsonl(f))
+            except OSError as e:
+                parser.error(f"cannot read {args.jsonl}: {e.strerror or str(e)}")
+        else:
+            items = list(read_jsonl(sys.stdin))
+        errors = []
+        for n, item in enumerate(items, 1):
+            try:
+                _normalize_item(item)
+            except ValueError as e:
+                errors.append(f"entry {n}: {str(e)}")
+        if errors:
+            more = f" (and {len(errors) - 1} more)" if len(errors) > 1 else ""
+            parser.error(f"invalid input, nothing queued: {errors[0]}{more}")
+        count = save_links_bulk(items)
+        if count is None:
+            print("Failed to save links")
+            sys.exit(1)
+        print(f"Queued {count} links")
+        sys.exit(0)
+
+    if not (args.link and args.filename):
         print("Usage: python save_links.py <link> <filename> [thumbnail_path]")
+        print("       python save_links.py --stdin | --jsonl FILE")
         sys.exit(1)
+    try:
+        _normalize_item((args.link, args.filename, args.thumbnail_path))
+    except ValueError as e:
+        parser.error(str(e))
     
-    link = sys.argv[1]
-    filename = sys.argv[2]
-    thumbnail_path = sys.argv[3] if len(sys.argv) > 3 else None
-    
-    saved_path = save_link(link, filename, thumbnail_path)
-    if saved_path:
-        print(f"Link saved to: {saved_path}")
+    item_id = save_link(args.link, args.filename, args.thumbnail_path)
+    if item_id:
+        print(f"Link queued as #{item_id}")
         sys.exit(0)
     else:
         print("Failed to save link")
@@ -81,7 +81,25 @@ DEFAULT_SETTINGS = {
     "debug_templates": False,
     "enable_anilist": True,
     "strict_resolution_matching": True,
-    "preferred_anime_source": "anilist"  # or "tmdb"
+    "preferred_anime_source": "anilist",  # or "tmdb"
+    "coalesce_window": 10,  # Seconds to wait for the other host links of a release
+    "queue_max_attempts": 5,  # Failed uploads are dead-lettered after this many attempts
+    "queue_retry_delay": 30,  # First retry delay in seconds, doubled on each failure
+    "queue_retry_max_delay": 3600,
+    "upstream_concurrency": {},  # e.g. {"wordpress": 8} to override http_client limits
+    "upstream_retry": {},  # e.g. {"wordpress": {"max_attempts": 2}} to override retry_policy
+    "upstream_rate": {},  # e.g. {"anilist": {"max_rate": 0.5}} requests/s, see rate_governor
+    "metadata_cache_ttl": 604800,  # Seconds TMDb/OMDb/AniList results are reused
+    "metadata_cache_negative_ttl": 21600,  # Seconds a "not found" is remembered
+    "metadata_fanout": False,  # Query TMDb/AniList/OMDb concurrently (uses OMDb/AniList quota on every lookup)
+    "metadata_hedge_after": 0,  # Seconds before a slow metadata source gets a second request (0 = off)
+    "pipeline_workers": {},  # e.g. {"enrich": 16, "publish": 2} for --engine staged
+    "pipeline_queue_size": 20,  # Jobs waiting in front of each stage of --engine staged
+    "pipeline_stats_interval": 30,  # Seconds between stage statistics in the log (0 = off)
+    "poster_max_width": 780,  # Featured image width: picks the TMDb rendition (w342/w500/w780), larger images are shrunk
+    "image_format": "",  # Re-encode resized images as "webp" or "jpeg" (progressive); "" keeps the source format
+    "image_quality": 85,  # WebP/JPEG quality of re-encoded images
+    "image_workers": 0  # Processes used to resize images (0 = resize in the upload thread)
 }
 
 class SettingsEditor(tk.Tk):
@@ -0,0 +1,60 @@
+# singleflight.py
+import logging
+import threading
+from functools import wraps
+
+logger = logging.getLogger(__name__)
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+class Group:
+    """
+    Concurrent do() calls with the same key share one execution of fn: the
+    first caller runs it, the others wait and get the same result (or the
+    same exception). Nothing is remembered once the call has finished.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn, *args, **kwargs):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            logger.debug(f"Sharing in-flight call for {key!r}")
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn(*args, **kwargs)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+def singleflight(key):
+    """Decorator: calls for which key(*args, **kwargs) is equal share one execution"""
+    def decorator(func):
+        group = Group()
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            return group.do(key(*args, **kwargs), func, *args, **kwargs)
+        wrapper.group = group
+        return wrapper
+    return decorator
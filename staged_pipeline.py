@@ -0,0 +1,195 @@
+# staged_pipeline.py
+import time
+import queue
+import logging
+import threading
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+class Stage:
+    """
+    One step of a StagedPipeline: fn(job) run by `workers` threads that take
+    jobs from a bounded queue. fn returns a falsy value to finish the job early.
+    """
+
+    def __init__(self, name, fn, workers=1, queue_size=None):
+        self.name = name
+        self.fn = fn
+        self.workers = max(1, int(workers))
+        self.queue = queue.Queue(maxsize=queue_size if queue_size is not None else self.workers * 2)
+        self.busy = 0
+        self.done = 0
+        self.failed = 0
+        self.busy_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def _record(self, seconds, ok):
+        with self._lock:
+            self.busy -= 1
+            self.busy_seconds += seconds
+            if ok:
+                self.done += 1
+            else:
+                self.failed += 1
+
+    def stats(self, elapsed):
+        with self._lock:
+            finished = self.done + self.failed
+            return {
+                "stage": self.name,
+                "depth": self.queue.qsize(),
+                "busy": self.busy,
+                "workers": self.workers,
+                "done": self.done,
+                "failed": self.failed,
+                "per_second": finished / elapsed if elapsed > 0 else 0.0,
+                "avg_seconds": self.busy_seconds / finished if finished else 0.0,
+            }
+
+class _Task:
+    __slots__ = ("key", "job")
+
+    def __init__(self, key, job):
+        self.key = key
+        self.job = job
+
+class StagedPipeline:
+    """
+    Producer/consumer chain of Stages. A full stage queue blocks the stage in
+    front of it, and submit() blocks once every queue slot is taken, so a slow
+    stage throttles the whole pipeline instead of piling up work in memory.
+    Jobs submitted with the same key pass through the pipeline one at a time,
+    in submission order. on_done(job) / on_error(job, exc) are called on the
+    worker thread that finished the job.
+    """
+
+    def __init__(self, stages, on_done=None, on_error=None, stats_interval=0):
+        self.stages = list(stages)
+        self.on_done = on_done
+        self.on_error = on_error
+        self.stats_interval = stats_interval
+        capacity = sum(stage.queue.maxsize + stage.workers for stage in self.stages)
+        self._slots = threading.BoundedSemaphore(capacity)
+        self._admit = queue.Queue()
+        self._chains = {}
+        self._outstanding = 0
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._stopped = threading.Event()
+        self._threads = []
+        self._started = None
+
+    def start(self):
+        self._started = time.monotonic()
+        self._spawn(self._run_admit, "pipeline-admit")
+        for index, stage in enumerate(self.stages):
+            for n in range(stage.workers):
+                self._spawn(self._run_stage, f"pipeline-{stage.name}-{n}", index)
+        if self.stats_interval:
+            self._spawn(self._run_reporter, "pipeline-stats")
+        return self
+
+    def _spawn(self, target, name, *args):
+        thread = threading.Thread(target=target, args=args, name=name, daemon=True)
+        thread.start()
+        self._threads.append(thread)
+
+    def submit(self, key, job):
+        """Queue a job behind any job with the same key; blocks while the pipeline is full"""
+        self._slots.acquire()
+        task = _Task(key, job)
+        with self._lock:
+            self._outstanding += 1
+            if key in self._chains:
+                self._chains[key].append(task)
+                return
+            self._chains[key] = deque()
+        self._admit.put(task)
+
+    def _run_admit(self):
+        # Feeds the first stage on its own thread, so finishing workers that
+        # release the next job of a key never block on a full first queue
+        while True:
+            task = self._admit.get()
+            if task is _STOP:
+                return
+            self.stages[0].queue.put(task)
+
+    def _run_stage(self, index):
+        stage = self.stages[index]
+        while True:
+            task = stage.queue.get()
+            if task is _STOP:
+                return
+            with stage._lock:
+                stage.busy += 1
+            started = time.monotonic()
+            try:
+                proceed = stage.fn(task.job)
+            except Exception as e:
+                stage._record(time.monotonic() - started, False)
+                self._finish(task, e)
+                continue
+            stage._record(time.monotonic() - started, True)
+            if proceed and index + 1 < len(self.stages):
+                self.stages[index + 1].queue.put(task)
+            else:
+                self._finish(task)
+
+    def _finish(self, task, error=None):
+        try:
+            if error is not None:
+                if self.on_error:
+                    self.on_error(task.job, error)
+                else:
+                    logger.error(f"Pipeline job for '{task.key}' failed: {str(error)}")
+            elif self.on_done:
+                self.on_done(task.job)
+        except Exception as e:
+            logger.error(f"Pipeline callback for '{task.key}' failed: {str(e)}", exc_info=True)
+        finally:
+            self._slots.release()
+            with self._lock:
+                self._outstanding -= 1
+                chain = self._chains[task.key]
+                if chain:
+                    self._admit.put(chain.popleft())
+                else:
+                    del self._chains[task.key]
+                if not self._outstanding:
+                    self._idle.notify_all()
+
+    def stats(self):
+        """Queue depth, busy workers and throughput of each stage"""
+        elapsed = time.monotonic() - self._started if self._started else 0.0
+        return [stage.stats(elapsed) for stage in self.stages]
+
+    def format_stats(self):
+        return " | ".join(
+            f"{s['stage']}: queue {s['depth']}, busy {s['busy']}/{s['workers']}, "
+            f"{s['done']} done, {s['failed']} failed, {s['per_second']:.2f}/s, {s['avg_seconds']:.2f}s avg"
+            for s in self.stats()
+        )
+
+    def _run_reporter(self):
+        while not self._stopped.wait(self.stats_interval):
+            logger.info(f"Pipeline: {self.format_stats()}")
+
+    def join(self):
+        """Wait until every submitted job has finished"""
+        with self._lock:
+            while self._outstanding:
+                self._idle.wait()
+
+    def shutdown(self):
+        self.join()
+        self._stopped.set()
+        self._admit.put(_STOP)
+        for stage in self.stages:
+            for _ in range(stage.workers):
+                stage.queue.put(_STOP)
+        for thread in self._threads:
+            thread.join()
@@ -0,0 +1,121 @@
+# test_async_pipeline.py
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from async_pipeline import EventLoopThread, drain, run_blocking, run_pipeline, run_stages, stage_width
+
+def test_run_pipeline_runs_blocking_calls_on_its_executor():
+    async def main():
+        return await asyncio.gather(*(run_blocking(threading.current_thread) for _ in range(4)))
+
+    threads = run_pipeline(main(), max_threads=2)
+    assert all(thread.name.startswith("pipeline") for thread in threads)
+    assert len({thread.name for thread in threads}) <= 2
+
+def test_drain_bounds_concurrency_and_serializes_keys():
+    batches = [[("a", 1)], [("b", 1)], [("a", 2)], [("c", 1)], [("a", 3)], [("b", 2)]]
+    active = {"now": 0, "peak": 0}
+    running_keys = set()
+    order = []
+
+    async def handle(items):
+        key, n = items[0]
+        assert key not in running_keys
+        running_keys.add(key)
+        active["now"] += 1
+        active["peak"] = max(active["peak"], active["now"])
+        await asyncio.sleep(0.02)
+        order.append((key, n))
+        active["now"] -= 1
+        running_keys.discard(key)
+        return n
+
+    results = run_pipeline(drain(lambda: batches.pop(0) if batches else [], handle,
+                                 lambda items: items[0][0], concurrency=2))
+    assert sorted(results) == [1, 1, 1, 2, 2, 3]
+    assert active["peak"] == 2
+    assert [n for key, n in order if key == "a"] == [1, 2, 3]
+
+def test_drain_keeps_going_after_a_failed_item():
+    batches = [[1], [2], [3]]
+
+    async def handle(items):
+        if items[0] == 2:
+            raise RuntimeError("upload failed")
+        return items[0]
+
+    results = run_pipeline(drain(lambda: batches.pop(0) if batches else [], handle,
+                                 lambda items: items[0], concurrency=3))
+    assert sorted(results) == [1, 3]
+
+def test_event_loop_thread_is_shared_by_callers():
+    loops = []
+
+    async def job(n):
+        loops.append(asyncio.get_running_loop())
+        return await run_blocking(lambda: n * 2)
+
+    with EventLoopThread(max_threads=2) as runner:
+        with ThreadPoolExecutor(4) as pool:
+            assert list(pool.map(lambda n: runner.run(job(n)), range(8))) == [n * 2 for n in range(8)]
+    assert len(set(map(id, loops))) == 1
+    assert runner.loop.is_closed()
+    assert not any(thread.name == "pipeline-loop" for thread in threading.enumerate())
+
+def test_stage_width_is_the_widest_level():
+    def fn(job):
+        pass
+
+    stages = {
+        "a": (fn, ()),
+        "b": (fn, ()),
+        "c": (fn, ()),
+        "d": (fn, ("a",)),
+        "e": (fn, ("d", "b")),
+    }
+    assert stage_width(stages) == 3
+    assert stage_width({"only": (fn, ())}) == 1
+
+def _stage(log, name, seconds=0.0, error=None):
+    def fn(job):
+        log.append(("start", name))
+        time.sleep(seconds)
+        log.append(("end", name))
+        if error:
+            raise error
+        job[name] = True
+    return fn
+
+def test_run_stages_overlaps_independent_stages_and_respects_dependencies():
+    log, job = [], {}
+    stages = {
+        "a": (_stage(log, "a", 0.1), ()),
+        "b": (_stage(log, "b", 0.1), ()),
+        "c": (_stage(log, "c"), ("a", "b")),
+    }
+    started = time.monotonic()
+    run_pipeline(run_stages(stages, job), max_threads=2)
+    assert time.monotonic() - started < 0.19
+    assert job == {"a": True, "b": True, "c": True}
+    assert log.index(("start", "c")) > max(log.index(("end", "a")), log.index(("end", "b")))
+
+def test_run_stages_waits_for_running_stages_after_a_failure():
+    log, job = [], {}
+    stages = {
+        "fails": (_stage(log, "fails", error=RuntimeError("boom")), ()),
+        "slow": (_stage(log, "slow", 0.2), ()),
+        "after": (_stage(log, "after"), ("fails",)),
+    }
+
+    async def main():
+        with pytest.raises(RuntimeError):
+            await run_stages(stages, job)
+        return list(log)  # what had happened when the failure was raised
+
+    log_at_failure = run_pipeline(main(), max_threads=2)
+    assert ("end", "slow") in log_at_failure
+    assert ("start", "after") not in log
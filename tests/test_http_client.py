@@ -0,0 +1,88 @@
+# test_http_client.py
+import io
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import http_client
+import rate_governor
+import retry_policy
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def _respond(self):
+        server = self.server
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b""
+        with server.lock:
+            server.requests.append((self.client_address[1], self.command, self.path, body))
+            status = server.statuses.pop(0) if server.statuses else 200
+            server.active += 1
+            server.peak = max(server.peak, server.active)
+        time.sleep(server.delay)
+        with server.lock:
+            server.active -= 1
+        self.send_response(status)
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"ok")
+
+    do_GET = do_POST = _respond
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def server(monkeypatch):
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    httpd.daemon_threads = True
+    httpd.lock = threading.Lock()
+    httpd.requests, httpd.statuses = [], []
+    httpd.active = httpd.peak = 0
+    httpd.delay = 0
+    httpd.url = f"http://127.0.0.1:{httpd.server_address[1]}"
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    # Fresh retry policy and governor without sleeps for the upstream under test
+    monkeypatch.setitem(retry_policy._policies, "images", retry_policy.RetryPolicy("images", base_delay=0))
+    monkeypatch.setitem(rate_governor._governors, "images",
+                        rate_governor.RateGovernor("images", rate=1000, max_rate=1000, burst=100))
+    monkeypatch.setitem(http_client.UPSTREAMS, "images", http_client.UPSTREAMS["images"])
+    monkeypatch.setitem(http_client._limits, "images", http_client._limits["images"])
+    yield httpd
+    http_client.close_all()
+    httpd.shutdown()
+    httpd.server_close()
+
+def test_requests_reuse_one_keep_alive_connection(server):
+    for n in range(5):
+        assert http_client.get("images", f"{server.url}/{n}").status_code == 200
+    assert len({port for port, *_ in server.requests}) == 1
+
+def test_retried_upload_resends_the_whole_body(server):
+    server.statuses = [503]
+    body = io.BytesIO(b"x" * 1000)
+    response = http_client.post("images", f"{server.url}/upload", data=body)
+    assert response.status_code == 200
+    assert [len(sent) for *_, sent in server.requests] == [1000, 1000]
+
+def test_post_is_not_retried_after_server_error(server):
+    server.statuses = [500]
+    assert http_client.post("images", f"{server.url}/create", data=b"{}").status_code == 500
+    assert len(server.requests) == 1
+
+def test_max_concurrency_bounds_requests_in_flight(server):
+    http_client.set_max_concurrency("images", 2)
+    server.delay = 0.05
+    with ThreadPoolExecutor(6) as pool:
+        statuses = list(pool.map(lambda n: http_client.get("images", f"{server.url}/{n}").status_code, range(6)))
+    assert statuses == [200] * 6
+    assert server.peak == 2
+
+def test_unknown_upstream_is_rejected():
+    with pytest.raises(ValueError):
+        http_client.get_session("example")
@@ -0,0 +1,67 @@
+# test_image_engine.py
+import io
+
+import pytest
+from PIL import Image, features
+
+from image_engine import ImageEngine, process_image
+
+def _encode(size, fmt, mode="RGB", **options):
+    img = Image.new(mode, size, "red" if mode == "RGB" else None)
+    out = io.BytesIO()
+    img.save(out, fmt, **options)
+    return out.getvalue()
+
+def _open(data):
+    img = Image.open(io.BytesIO(data))
+    return img.format, img.size
+
+def test_large_jpeg_is_shrunk_to_fit():
+    data, ext = process_image(_encode((3000, 2000), "JPEG"), (1200, 1200))
+    assert ext == ".jpg"
+    assert _open(data) == ("JPEG", (1200, 800))
+
+def test_draft_decode_keeps_the_exact_output_size():
+    source = _encode((3000, 2000), "JPEG")
+    assert _open(process_image(source, (500, 750))[0]) == _open(process_image(source, (500, 750), draft=False)[0])
+
+def test_image_that_fits_is_passed_through_untouched():
+    source = _encode((300, 200), "JPEG")
+    assert process_image(source, (1200, 1200)) == (source, ".jpg")
+    png = _encode((300, 200), "PNG")
+    assert process_image(png, (1200, 1200)) == (png, ".png")
+
+def test_requested_format_is_applied_even_when_the_image_fits():
+    data, ext = process_image(_encode((300, 200), "PNG"), (1200, 1200), fmt="jpeg")
+    assert ext == ".jpg"
+    assert _open(data)[0] == "JPEG"
+
+@pytest.mark.parametrize("fmt", ["GIF", "BMP"])
+def test_other_formats_are_reencoded_so_the_extension_matches(fmt):
+    data, ext = process_image(_encode((300, 200), fmt), (1200, 1200))
+    assert (_open(data)[0], ext) in {("JPEG", ".jpg"), ("PNG", ".png")}
+
+def test_transparent_images_stay_png():
+    data, ext = process_image(_encode((300, 200), "GIF", mode="P", transparency=0), (100, 100))
+    assert ext == ".png"
+    assert _open(data) == ("PNG", (100, 67))
+
+@pytest.mark.skipif(not features.check("webp"), reason="Pillow built without WebP")
+def test_webp_output():
+    data, ext = process_image(_encode((3000, 2000), "JPEG"), (1200, 1200), fmt="webp")
+    assert ext == ".webp"
+    assert _open(data) == ("WEBP", (1200, 800))
+
+def test_engine_resizes_in_process_and_in_the_pool():
+    source = _encode((2000, 1000), "JPEG")
+    in_process = ImageEngine(workers=0)
+    pooled = ImageEngine(workers=1)
+    try:
+        assert _open(in_process.resize(source, (400, 400))[0]) == ("JPEG", (400, 200))
+        assert _open(pooled.resize(source, (400, 400))[0]) == ("JPEG", (400, 200))
+    finally:
+        pooled.shutdown()
+
+def test_engine_rejects_unknown_formats():
+    with pytest.raises(ValueError):
+        ImageEngine(workers=0).configure(fmt="tiff")
@@ -0,0 +1,140 @@
+# test_local_index.py
+import json
+import time
+from datetime import datetime, timedelta
+
+import pytest
+import requests
+
+import local_index
+from local_index import CreateLedger, MediaIndex, PostIndex, _SiteIndex, media_key
+
+SITE = "http://wp.test"
+WP = {"url": SITE + "/"}
+
+def _modified(seconds):
+    return (datetime(2024, 1, 1) + timedelta(seconds=seconds)).isoformat()
+
+def _post(post_id, title, modified="2024-01-01T00:00:00"):
+    return {"id": post_id, "title": {"rendered": title}, "modified": modified}
+
+def _response(body, pages=1):
+    response = requests.Response()
+    response.status_code = 200
+    response._content = json.dumps(body).encode()
+    response.headers["X-WP-TotalPages"] = str(pages)
+    response.url = SITE
+    return response
+
+class FakeCollection:
+    """A /wp/v2/<kind> listing that honours page and modified_after"""
+
+    def __init__(self, items):
+        self.items = list(items)
+        self.requests = []
+
+    def get(self, upstream, url, params=None, **kwargs):
+        self.requests.append(dict(params))
+        items = self.items
+        if "modified_after" in params:
+            items = [item for item in items if item["modified"] > params["modified_after"]]
+        size = params["per_page"]
+        pages = max(1, -(-len(items) // size))
+        page = params["page"]
+        return _response(items[(page - 1) * size:page * size], pages)
+
+@pytest.fixture
+def collection(monkeypatch):
+    def install(items):
+        fake = FakeCollection(items)
+        monkeypatch.setattr(local_index.http_client, "get", fake.get)
+        return fake
+    return install
+
+@pytest.fixture
+def posts(tmp_path):
+    return PostIndex(str(tmp_path / "index.db"))
+
+def test_find_matches_title_season_episode_and_quality(posts):
+    posts.add(SITE, [_post(1, "Show Name S01E01 1080p"), _post(2, "Show Name S01E02 1080p"),
+                     _post(3, "Show Name S01E02 720p")])
+    assert posts.find(SITE, "Show Name S01E02 1080p") == 2
+    assert posts.find(SITE, "Show Name S01E02 720p") == 3
+    assert posts.find(SITE, "Show Name S01E03 1080p") is None
+    assert posts.find("http://other.test", "Show Name S01E02 1080p") is None
+
+def test_removed_post_is_not_found(posts):
+    posts.add(SITE, [_post(1, "Show Name S01E01 1080p")])
+    posts.remove(SITE, 1)
+    assert posts.find(SITE, "Show Name S01E01 1080p") is None
+
+def test_sync_lists_everything_once_then_only_modified_posts(posts, collection):
+    fake = collection([_post(n, f"Show S01E{n:02d} 1080p", _modified(n)) for n in range(1, 251)])
+    assert not posts.is_built(SITE)
+    assert posts.sync(WP, None) == 250
+    assert posts.is_built(SITE)
+    assert len(fake.requests) == 3
+    assert fake.requests[0]["status"] == "any"
+
+    fake.items.append(_post(251, "Show S02E01 1080p", _modified(3600)))
+    assert posts.sync(WP, None) == 0  # within sync_interval
+    assert posts.sync(WP, None, force=True) <= 2  # the newest post again (1s overlap) and the new one
+    assert "modified_after" in fake.requests[-1]
+    assert posts.find(SITE, "Show S02E01 1080p") == 251
+
+def test_sync_in_background_builds_the_index(posts, collection):
+    collection([_post(1, "Show S01E01 1080p")])
+    posts.sync_in_background(WP, None)
+    deadline = time.monotonic() + 5
+    while not posts.is_built(SITE) and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert posts.find(SITE, "Show S01E01 1080p") == 1
+
+def test_site_index_requires_add():
+    with pytest.raises(TypeError):
+        _SiteIndex()
+
+@pytest.fixture
+def media(tmp_path):
+    return MediaIndex(str(tmp_path / "index.db"))
+
+def _media(media_id, slug, source_url, media_type="image"):
+    return {"id": media_id, "slug": slug, "source_url": source_url, "media_type": media_type}
+
+def test_media_key_normalizes_slugs_file_names_and_urls():
+    assert media_key("Show_Name_poster") == "show_name_poster"
+    assert media_key("Show Name.S01E01 thumb") == "show-name-s01e01-thumb"
+    assert media_key("http://wp.test/uploads/2024/01/Show_Name_poster.jpg") == "show_name_poster"
+
+def test_media_find_matches_slug_or_file_name(media):
+    media.add(SITE, [
+        _media(1, "show_name_poster", "http://wp.test/uploads/show_name_poster.jpg"),
+        _media(2, "show_name_poster-2", "http://wp.test/uploads/show_name_poster-1.jpg"),
+        _media(3, "attachment-3", "http://wp.test/uploads/other_poster.png"),
+    ])
+    assert media.find(SITE, "show_name_poster") == (2, "http://wp.test/uploads/show_name_poster-1.jpg")
+    assert media.find(SITE, "other_poster") == (3, "http://wp.test/uploads/other_poster.png")
+    assert media.find(SITE, "show_name") == (None, None)
+    assert media.find(SITE, "show_name", prefix=True)[0] == 2
+    assert media.find(SITE, "other_poster", media_type="file") == (None, None)
+
+def test_removed_media_is_not_found(media):
+    media.add(SITE, [_media(1, "show_name_poster", "http://wp.test/uploads/show_name_poster.jpg")])
+    media.remove(SITE, 1)
+    assert media.find(SITE, "show_name_poster") == (None, None)
+
+def test_create_ledger_counts_attempts_until_completed(tmp_path):
+    ledger = CreateLedger(str(tmp_path / "index.db"))
+    assert not ledger.is_pending(SITE, "show-s01e01-1080p")
+    assert ledger.begin(SITE, "show-s01e01-1080p") == 1
+    assert ledger.begin(SITE, "show-s01e01-1080p") == 2
+    assert ledger.is_pending(SITE, "show-s01e01-1080p")
+    assert not ledger.is_pending("http://other.test", "show-s01e01-1080p")
+
+    ledger.complete(SITE, "show-s01e01-1080p")
+    assert not ledger.is_pending(SITE, "show-s01e01-1080p")
+    assert ledger.begin(SITE, "show-s01e01-1080p") == 1
+
+def test_create_ledger_survives_a_restart(tmp_path):
+    CreateLedger(str(tmp_path / "index.db")).begin(SITE, "show-s01e01-1080p")
+    assert CreateLedger(str(tmp_path / "index.db")).is_pending(SITE, "show-s01e01-1080p")
@@ -0,0 +1,144 @@
+# test_media_lookup.py
+import io
+import json
+import time
+
+import pytest
+import requests
+
+from local_index import MediaIndex
+
+SITE = "http://wp.test"
+WP = {"url": SITE}
+POSTER = {"id": 5, "slug": "show_name_poster", "source_url": f"{SITE}/uploads/show_name_poster.jpg",
+          "media_type": "image", "title": {"rendered": "show_name_poster"}}
+
+def _response(status, body):
+    response = requests.Response()
+    response.status_code = status
+    response._content = json.dumps(body).encode()
+    response.url = SITE
+    return response
+
+@pytest.fixture
+def media_lookup(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)  # host_config creates config/ in the working directory on import
+    import media_lookup
+    return media_lookup
+
+@pytest.fixture
+def media_index(media_lookup, tmp_path, monkeypatch):
+    index = MediaIndex(str(tmp_path / "index.db"))
+    monkeypatch.setattr(media_lookup, "get_media_index", lambda: index)
+    return index
+
+@pytest.fixture
+def searches(media_lookup, monkeypatch):
+    """Media library holding POSTER; returns the search terms sent"""
+    sent = []
+
+    def get(upstream, url, params=None, **kwargs):
+        if "search" in params:
+            sent.append(params["search"])
+            return _response(200, [POSTER] if params["search"] == POSTER["slug"] else [])
+        return _response(200, [POSTER])
+
+    monkeypatch.setattr(media_lookup.http_client, "get", get)
+    return sent
+
+def test_built_index_answers_without_searching(media_lookup, media_index, searches):
+    media_index.sync(WP, None)
+    assert media_lookup.find_existing_media("Show Name", WP, None) == (5, POSTER["source_url"])
+    assert media_lookup.find_existing_media("Other", WP, None) == (None, None)
+    assert searches == []
+
+def test_unbuilt_index_falls_back_to_search_and_builds(media_lookup, media_index, searches):
+    assert media_lookup.find_existing_media("Show Name", WP, None) == (5, POSTER["source_url"])
+    assert searches == ["show_name_poster"]
+    deadline = time.monotonic() + 5
+    while not media_index.is_built(SITE) and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert media_index.find(SITE, "show_name_poster")[0] == 5
+
+@pytest.fixture
+def uploads(media_lookup, media_index, monkeypatch):
+    """WordPress media endpoint; returns the bodies it received with their headers"""
+    received = []
+
+    def post(upstream, url, headers=None, params=None, data=None, **kwargs):
+        received.append({"headers": headers, "params": params, "data": data,
+                         "body": data.read() if hasattr(data, "read") else data})
+        name = headers["Content-Disposition"].split('filename="')[1].rstrip('"')
+        return _response(201, {"id": 40 + len(received), "slug": name.rsplit(".", 1)[0],
+                               "source_url": f"{SITE}/uploads/{name}", "media_type": "image"})
+
+    monkeypatch.setattr(media_lookup.http_client, "post", post)
+    return received
+
+def test_file_upload_streams_the_file_as_the_request_body(media_lookup, media_index, uploads, tmp_path):
+    path = tmp_path / "Show_Name_poster.jpg"
+    path.write_bytes(b"\xff\xd8" + b"x" * 100000)
+    assert media_lookup.upload_media_to_wp(str(path), WP, None) == (41, f"{SITE}/uploads/Show_Name_poster.jpg")
+
+    sent = uploads[0]
+    assert hasattr(sent["data"], "read")  # a file object, not a multipart body built in memory
+    assert sent["body"] == path.read_bytes()
+    assert sent["headers"] == {"Content-Disposition": 'attachment; filename="Show_Name_poster.jpg"',
+                               "Content-Type": "image/jpeg"}
+    assert sent["params"] == {"title": "Show_Name_poster"}
+    assert media_index.find(SITE, "Show_Name_poster")[0] == 41
+
+def test_unreadable_file_raises_a_request_error(media_lookup, uploads, tmp_path):
+    with pytest.raises(requests.RequestException):
+        media_lookup.upload_media_to_wp(str(tmp_path / "missing.jpg"), WP, None)
+    assert uploads == []
+
+@pytest.fixture
+def images(media_lookup, monkeypatch):
+    """Image host serving the bytes registered per URL"""
+    served = {}
+
+    def get(upstream, url, stream=False, **kwargs):
+        body, headers = served[url]
+        response = requests.Response()
+        response.status_code = 200
+        response.raw = io.BytesIO(body)
+        response.headers.update(headers)
+        response.url = url
+        return response
+
+    monkeypatch.setattr(media_lookup.http_client, "get", get)
+    return served
+
+def test_tmdb_image_url_picks_the_smallest_wide_enough_rendition(media_lookup):
+    assert media_lookup.tmdb_image_url("/p.jpg", 450) == "https://image.tmdb.org/t/p/w500/p.jpg"
+    assert media_lookup.tmdb_image_url("/p.jpg", 500) == "https://image.tmdb.org/t/p/w500/p.jpg"
+    assert media_lookup.tmdb_image_url("/p.jpg", 1000) == "https://image.tmdb.org/t/p/original/p.jpg"
+    assert media_lookup.tmdb_image_url("/b.jpg", 1000, kind="backdrop") == "https://image.tmdb.org/t/p/w1280/b.jpg"
+
+def test_download_image_keeps_the_image_in_memory(media_lookup, images):
+    images["http://img.test/p.jpg"] = (b"jpeg" * 1000, {"Content-Type": "image/jpeg; charset=binary"})
+    assert media_lookup.download_image("http://img.test/p.jpg") == (b"jpeg" * 1000, "image/jpeg")
+
+def test_download_image_refuses_oversized_images(media_lookup, images):
+    images["http://img.test/declared.jpg"] = (b"x", {"Content-Length": "2000"})
+    images["http://img.test/streamed.jpg"] = (b"x" * 2000, {})
+    for url in images:
+        with pytest.raises(ValueError):
+            media_lookup.download_image(url, max_bytes=1000)
+
+def test_in_memory_upload_needs_no_file(media_lookup, uploads, tmp_path):
+    assert media_lookup.upload_media_bytes(b"jpeg-bytes", "Show_Name_poster.jpg", WP, None)[0] == 41
+    assert uploads[0]["body"] == b"jpeg-bytes"
+    assert uploads[0]["headers"]["Content-Type"] == "image/jpeg"
+    assert [path.name for path in tmp_path.iterdir() if not path.name.startswith("index.db")] == []
+
+def test_resize_image_returns_shrunk_bytes_and_keeps_the_file(media_lookup, tmp_path):
+    from PIL import Image
+    path = tmp_path / "Show_Name_thumb_1.png"
+    Image.new("RGB", (2400, 1200), "red").save(path)
+    source = path.read_bytes()
+    data, ext = media_lookup.resize_image(str(path))
+    assert ext == ".png"
+    assert Image.open(io.BytesIO(data)).size == (1200, 600)
+    assert path.read_bytes() == source
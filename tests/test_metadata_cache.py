@@ -0,0 +1,90 @@
+# test_metadata_cache.py
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import metadata_cache
+from metadata_cache import MetadataCache
+
+@pytest.fixture
+def cache(tmp_path):
+    return MetadataCache(str(tmp_path / "metadata.db"), ttl=100, negative_ttl=10)
+
+class Fetch:
+    def __init__(self, value):
+        self.value = value
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        if isinstance(self.value, Exception):
+            raise self.value
+        return self.value
+
+def test_found_result_is_reused_for_equivalent_queries(cache):
+    fetch = Fetch({"title": "Show Name", "year": 2020})
+    assert cache.get_or_fetch("tmdb", "Show Name", fetch) == {"title": "Show Name", "year": 2020}
+    assert cache.get_or_fetch("tmdb", "  show   NAME ", fetch) == {"title": "Show Name", "year": 2020}
+    assert fetch.calls == 1
+    assert cache.get_or_fetch("omdb", "Show Name", fetch) == {"title": "Show Name", "year": 2020}
+    assert fetch.calls == 2
+
+def test_not_found_is_cached_for_the_negative_ttl(cache, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(metadata_cache.time, "time", lambda: now[0])
+    fetch = Fetch(None)
+    assert cache.get_or_fetch("tmdb", "Unknown", fetch) is None
+    assert cache.get_or_fetch("tmdb", "Unknown", fetch) is None
+    assert fetch.calls == 1
+    now[0] += 11
+    cache.get_or_fetch("tmdb", "Unknown", fetch)
+    assert fetch.calls == 2
+
+def test_found_result_expires_after_the_ttl(cache, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(metadata_cache.time, "time", lambda: now[0])
+    fetch = Fetch({"title": "Show"})
+    cache.get_or_fetch("tmdb", "Show", fetch)
+    now[0] += 50
+    cache.get_or_fetch("tmdb", "Show", fetch)
+    assert fetch.calls == 1
+    now[0] += 51
+    cache.get_or_fetch("tmdb", "Show", fetch)
+    assert fetch.calls == 2
+
+def test_failed_lookup_is_not_cached(cache):
+    with pytest.raises(RuntimeError):
+        cache.get_or_fetch("tmdb", "Show", Fetch(RuntimeError("HTTP 500")))
+    assert cache.lookup("tmdb", "Show") == (False, None)
+
+def test_entries_survive_a_restart(cache, tmp_path):
+    cache.get_or_fetch("anilist", "Show", Fetch({"id": 1}))
+    assert MetadataCache(str(tmp_path / "metadata.db")).lookup("anilist", "Show") == (True, {"id": 1})
+
+def test_stats_and_clear(cache):
+    cache.store("tmdb", "a", {"id": 1})
+    cache.store("tmdb", "b", None)
+    cache.store("omdb", "a", {"id": 2})
+    assert {row["source"]: (row["entries"], row["misses"]) for row in cache.stats()} == {
+        "tmdb": (2, 1), "omdb": (1, 0)}
+    assert cache.clear("tmdb") == 2
+    assert cache.clear() == 1
+
+def test_hedged_lookup_sends_its_own_request(cache):
+    started = threading.Event()
+    release = threading.Event()
+
+    def slow():
+        started.set()
+        release.wait(5)
+        return {"from": "first"}
+
+    with ThreadPoolExecutor(2) as pool:
+        first = pool.submit(cache.get_or_fetch, "tmdb", "Show", slow)
+        assert started.wait(5)
+        hedge = Fetch({"from": "hedge"})
+        assert cache.get_or_fetch("tmdb", "Show", hedge, hedge=True) == {"from": "hedge"}
+        assert hedge.calls == 1
+        release.set()
+        first.result()
@@ -0,0 +1,180 @@
+# test_queue_store.py
+import json
+import os
+import runpy
+import time
+
+import pytest
+
+from queue_store import QueueStore
+
+@pytest.fixture
+def store(tmp_path):
+    return QueueStore(str(tmp_path / "queue.db"))
+
+def test_claims_oldest_item_first(store):
+    first = store.enqueue("https://rapidgator.net/file/1", "Show.S01E01.1080p.mkv", enqueued_at=1)
+    store.enqueue("https://rapidgator.net/file/2", "Show.S01E02.1080p.mkv", enqueued_at=2)
+
+    item = store.claim()
+    assert item["id"] == first
+    assert item["link"] == "https://rapidgator.net/file/1"
+    assert store.count("claimed") == 1
+    assert store.count("pending") == 1
+
+def test_claimed_item_is_not_handed_out_twice(store):
+    store.enqueue("https://rapidgator.net/file/1", "Show.S01E01.1080p.mkv")
+    assert store.claim() is not None
+    assert store.claim() is None
+
+def test_complete_removes_and_release_requeues(store):
+    store.enqueue("https://rapidgator.net/file/1", "Show.S01E01.1080p.mkv")
+    item = store.claim()
+    store.release(item["id"])
+    assert store.claim()["id"] == item["id"]
+    store.complete(item["id"])
+    assert store.count() == 0
+
+def test_stale_claims_are_reclaimed(tmp_path):
+    store = QueueStore(str(tmp_path / "queue.db"), claim_timeout=0)
+    store.enqueue("https://rapidgator.net/file/1", "Show.S01E01.1080p.mkv")
+    item = store.claim()
+    time.sleep(0.01)
+    again = store.claim()
+    assert again["id"] == item["id"]
+    assert again["attempts"] == 1
+
+def test_enqueue_many_in_one_call(store):
+    count = store.enqueue_many([
+        {"link": f"https://rapidgator.net/file/{i}", "filename": f"Show.S01E{i:02d}.mkv"}
+        for i in range(1, 101)
+    ])
+    assert count == 100
+    assert store.count("pending") == 100
+
+def test_migrate_directory_imports_and_removes_files(store, tmp_path):
+    legacy = tmp_path / "pending_links"
+    legacy.mkdir()
+    for i in range(3):
+        path = legacy / f"link_{i}.json"
+        path.write_text(json.dumps({"link": f"https://rapidgator.net/file/{i}",
+                                    "filename": f"Show.S01E0{i + 1}.mkv"}))
+        os.utime(path, (1000 + i, 1000 + i))
+    (legacy / "broken.json").write_text("{")
+
+    assert store.migrate_directory(str(legacy)) == 3
+    assert sorted(os.listdir(legacy)) == ["broken.json"]
+    assert [store.claim()["link"] for _ in range(3)] == [f"https://rapidgator.net/file/{i}" for i in range(3)]
+
+def test_migrated_files_are_not_imported_twice(store, tmp_path):
+    legacy = tmp_path / "pending_links"
+    legacy.mkdir()
+    (legacy / "link_1.json").write_text(json.dumps({"link": "https://rapidgator.net/file/1",
+                                                    "filename": "Show.S01E01.mkv"}))
+    store.migrate_directory(str(legacy))
+    (legacy / "link_1.json").write_text(json.dumps({"link": "https://rapidgator.net/file/1",
+                                                    "filename": "Show.S01E01.mkv"}))
+    store.migrate_directory(str(legacy))
+    assert store.count() == 1
+
+def test_claim_group_coalesces_links_of_one_release(store):
+    store.enqueue("https://rapidgator.net/file/1", "Show.Name.S01E01.1080p.WEB-DL.mkv", enqueued_at=100)
+    store.enqueue("https://rapidgator.net/file/2", "Show.Name.S01E02.1080p.WEB-DL.mkv", enqueued_at=101)
+    store.enqueue("https://nitroflare.com/view/1", "Show Name S01E01 1080p WEB-DL.mkv", enqueued_at=105)
+    store.enqueue("https://ddownload.com/1", "Show.Name.S01E01.1080p.WEB-DL.mkv", enqueued_at=200)
+
+    group = store.claim_group(window=10)
+    assert [item["link"] for item in group] == ["https://rapidgator.net/file/1", "https://nitroflare.com/view/1"]
+    assert [item["link"] for item in store.claim_group(window=10)] == ["https://rapidgator.net/file/2"]
+    assert [item["link"] for item in store.claim_group(window=10)] == ["https://ddownload.com/1"]
+
+def test_claim_group_does_not_coalesce_untitled_files(store):
+    store.enqueue("https://rapidgator.net/file/1", "[].mkv", enqueued_at=100)
+    store.enqueue("https://rapidgator.net/file/2", "---.mkv", enqueued_at=101)
+    assert len(store.claim_group(window=10)) == 1
+    assert len(store.claim_group(window=10)) == 1
+
+def test_claim_group_holds_items_younger_than_min_age(store):
+    store.enqueue("https://rapidgator.net/file/1", "Show.S01E01.mkv")
+    assert store.claim_group(min_age=60) == []
+    assert len(store.claim_group(min_age=0)) == 1
+
+def test_release_keys_are_recomputed_on_upgrade(tmp_path):
+    path = str(tmp_path / "queue.db")
+    store = QueueStore(path)
+    store.enqueue("https://rapidgator.net/file/1", "[].mkv")
+    conn = store._conn()
+    conn.execute("UPDATE queue SET release_key = '[]|||'")
+    conn.execute("PRAGMA user_version = 0")
+    conn.commit()
+
+    store = QueueStore(path)
+    assert store.peek()[0]["release_key"] is None
+
+def test_failed_item_backs_off_exponentially(tmp_path):
+    store = QueueStore(str(tmp_path / "queue.db"), retry_base_delay=10, retry_max_delay=25)
+    item_id = store.enqueue("https://rapidgator.net/file/1", "Show.S01E01.mkv")
+    delays = []
+    for _ in range(3):
+        store.claim()
+        assert store.fail(item_id, RuntimeError("upload failed")) is False
+        delays.append(round(store.seconds_until_ready()))
+        store._conn().execute("UPDATE queue SET next_eligible_at = 0")  # skip the wait
+        store._conn().commit()
+    assert delays == [10, 20, 25]
+
+def test_failed_item_is_not_claimed_during_backoff(store):
+    item_id = store.enqueue("https://rapidgator.net/file/1", "Show.S01E01.mkv")
+    store.claim()
+    store.fail(item_id, "timeout")
+    assert store.claim() is None
+    assert store.claim_group() == []
+    assert store.peek() == []
+
+def test_item_is_dead_lettered_after_max_attempts(tmp_path):
+    store = QueueStore(str(tmp_path / "queue.db"), max_attempts=2, retry_base_delay=0)
+    item_id = store.enqueue("https://rapidgator.net/file/1", "Show.S01E01.mkv")
+    store.claim()
+    assert store.fail(item_id, "first") is False
+    store.claim()
+    assert store.fail(item_id, "second") is True
+
+    assert store.claim() is None
+    dead = store.dead_letters()
+    assert [(item["id"], item["attempts"], item["last_error"]) for item in dead] == [(item_id, 2, "second")]
+
+    assert store.requeue() == 1
+    item = store.claim()
+    assert item["id"] == item_id
+    assert item["attempts"] == 0
+
+def test_set_retry_policy_overrides_budget(store):
+    store.set_retry_policy(max_attempts=1, base_delay=0)
+    item_id = store.enqueue("https://rapidgator.net/file/1", "Show.S01E01.mkv")
+    store.claim()
+    assert store.fail(item_id, "boom") is True
+
+def test_peek_lists_only_claimable_items_without_claiming(store):
+    now = time.time()
+    claimed = store.enqueue("https://rapidgator.net/file/1", "Claimed.S01E01.mkv", enqueued_at=now - 120)
+    failed = store.enqueue("https://rapidgator.net/file/2", "Failed.S01E01.mkv", enqueued_at=now - 110)
+    ready = store.enqueue("https://rapidgator.net/file/3", "Ready.S01E01.mkv", enqueued_at=now - 100)
+    store.enqueue("https://rapidgator.net/file/4", "Fresh.S01E01.mkv", enqueued_at=now)
+    store.claim()
+    store.claim()
+    store.fail(failed, "timeout")
+
+    assert [item["id"] for item in store.peek(min_age=60)] == [ready]
+    assert len(store.peek()) == 2
+    assert len(store.peek(limit=1)) == 1
+    assert store.count("pending") == 3
+    assert claimed not in [item["id"] for item in store.peek()]
+
+@pytest.mark.parametrize("argv", [["--requeue", "abc"], ["--requeue", "0"], ["--requeue", "all", "3"]])
+def test_cli_rejects_invalid_requeue_ids(argv, monkeypatch, capsys):
+    import queue_store
+    monkeypatch.setattr("sys.argv", ["queue_store.py"] + argv)
+    with pytest.raises(SystemExit) as exc:
+        runpy.run_path(queue_store.__file__, run_name="__main__")
+    assert exc.value.code == 2
+    assert "--requeue" in capsys.readouterr().err
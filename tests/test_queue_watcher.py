@@ -0,0 +1,67 @@
+# test_queue_watcher.py
+import threading
+import time
+
+import pytest
+
+import queue_watcher
+from queue_store import QueueStore
+from queue_watcher import QueueWatcher
+
+@pytest.fixture(params=["polling", "events"])
+def watcher(request, tmp_path, monkeypatch):
+    if request.param == "events":
+        pytest.importorskip("watchdog")
+    else:
+        monkeypatch.setattr(queue_watcher, "WATCHDOG_AVAILABLE", False)
+    watcher = QueueWatcher(str(tmp_path), poll_interval=0.05).start()
+    yield watcher
+    watcher.stop()
+
+def test_wait_times_out_without_changes(watcher):
+    watcher.clear()
+    started = time.monotonic()
+    assert watcher.wait(timeout=0.2) is False
+    assert time.monotonic() - started >= 0.15
+
+def test_enqueue_wakes_the_watcher(watcher, tmp_path):
+    store = QueueStore(str(tmp_path / "queue.db"))
+    watcher.clear()
+    timer = threading.Timer(0.1, store.enqueue, ("https://rapidgator.net/file/1", "Show.S01E01.mkv"))
+    timer.start()
+    try:
+        assert watcher.wait(timeout=5) is True
+    finally:
+        timer.join()
+
+def test_draining_the_queue_does_not_wake_the_watcher(watcher, tmp_path):
+    store = QueueStore(str(tmp_path / "queue.db"))
+    store.enqueue("https://rapidgator.net/file/1", "Show.S01E01.mkv")
+    store.enqueue("https://rapidgator.net/file/2", "Show.S01E02.mkv")
+    time.sleep(0.1)
+    watcher.clear()
+    for item in store.claim_group():
+        store.complete(item["id"])
+    store.fail(store.claim()["id"], RuntimeError("upload failed"))
+    assert watcher.wait(timeout=0.3) is False
+
+def test_legacy_link_file_wakes_the_watcher(watcher, tmp_path):
+    watcher.clear()
+    (tmp_path / "link_1.json").write_text('{"link": "https://rapidgator.net/file/1", "filename": "Show.S01E01.mkv"}')
+    assert watcher.wait(timeout=5) is True
+
+def test_importing_link_files_does_not_wake_the_watcher(watcher, tmp_path):
+    (tmp_path / "link_1.json").write_text('{"link": "https://rapidgator.net/file/1", "filename": "Show.S01E01.mkv"}')
+    store = QueueStore(str(tmp_path / "queue.db"))
+    time.sleep(0.1)
+    watcher.clear()
+    assert store.migrate_directory(str(tmp_path)) == 1
+    assert watcher.wait(timeout=0.3) is False
+
+def test_held_item_reports_when_it_becomes_ready(tmp_path):
+    store = QueueStore(str(tmp_path / "queue.db"))
+    assert store.seconds_until_ready(min_age=10) is None
+    store.enqueue("https://rapidgator.net/file/1", "Show.S01E01.mkv", enqueued_at=time.time() - 4)
+    assert 5 < store.seconds_until_ready(min_age=10) <= 6
+    assert store.claim_group(min_age=10) == []
+    assert store.seconds_until_ready(min_age=0) == 0
@@ -0,0 +1,76 @@
+# test_rate_governor.py
+import pytest
+import requests
+from requests.exceptions import ReadTimeout
+
+import rate_governor
+from rate_governor import RateGovernor
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(rate_governor, "time", clock)
+    return clock
+
+def _response(status, headers=None):
+    response = requests.Response()
+    response.status_code = status
+    response.headers.update(headers or {})
+    return response
+
+def test_burst_goes_out_at_once_then_sends_are_paced(clock):
+    governor = RateGovernor("test", rate=10, max_rate=10, burst=3)
+    waits = [governor.acquire() for _ in range(5)]
+    assert waits[:3] == [0, 0, 0]
+    assert waits[3:] == [pytest.approx(0.1), pytest.approx(0.1)]
+
+def test_throttling_halves_the_rate_once_per_cooldown(clock):
+    governor = RateGovernor("test", rate=8, max_rate=8, cooldown=2)
+    governor.observe(_response(429))
+    governor.observe(_response(429))
+    assert governor.rate == 4
+    clock.sleep(2)
+    governor.observe(_response(429))
+    assert governor.rate == 2
+
+def test_rate_never_drops_below_the_floor(clock):
+    governor = RateGovernor("test", rate=1, max_rate=1, min_rate=0.5, cooldown=0)
+    for _ in range(5):
+        governor.observe(_response(429))
+    assert governor.rate == 0.5
+
+def test_successes_raise_the_rate_up_to_the_ceiling(clock):
+    governor = RateGovernor("test", rate=5, max_rate=10)
+    governor.observe(_response(200))
+    assert 5 < governor.rate < 10
+    for _ in range(10000):
+        governor.observe(_response(200))
+    assert governor.rate == 10
+
+def test_retry_after_pauses_every_send(clock):
+    governor = RateGovernor("test", rate=100, max_rate=100, burst=10)
+    governor.observe(_response(429, {"Retry-After": "5"}))
+    assert governor.acquire() == pytest.approx(5)
+
+def test_exhausted_rate_limit_waits_for_the_reset(clock):
+    governor = RateGovernor("test", rate=100, max_rate=100, burst=10)
+    governor.observe(_response(200, {"X-RateLimit-Remaining": "0", "X-RateLimit-Reset": str(clock.now + 30)}))
+    assert governor.acquire() == pytest.approx(30)
+
+def test_timeouts_slow_down(clock):
+    governor = RateGovernor("test", rate=8, max_rate=8)
+    governor.observe(error=ReadTimeout("Read timed out"))
+    assert governor.rate == 4
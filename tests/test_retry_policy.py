@@ -0,0 +1,139 @@
+# test_retry_policy.py
+import io
+import time
+from email.utils import formatdate
+
+import pytest
+import requests
+from requests.exceptions import ConnectTimeout, ReadTimeout
+
+import retry_policy
+from retry_policy import CircuitBreaker, CircuitOpenError, RetryPolicy, retry_after_seconds
+
+def _response(status, headers=None):
+    response = requests.Response()
+    response.status_code = status
+    response.headers.update(headers or {})
+    response.raw = io.BytesIO()
+    return response
+
+class Script:
+    """send() callable returning (or raising) the given outcomes in order"""
+
+    def __init__(self, *outcomes):
+        self.outcomes = list(outcomes)
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, BaseException):
+            raise outcome
+        return _response(*outcome) if isinstance(outcome, tuple) else _response(outcome)
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    slept = []
+    monkeypatch.setattr(retry_policy.time, "sleep", slept.append)
+    return slept
+
+def test_retries_server_errors_until_success(sleeps):
+    send = Script(503, 502, 200)
+    assert RetryPolicy("test", max_attempts=3).call(send).status_code == 200
+    assert send.calls == 3
+    assert len(sleeps) == 2
+
+def test_gives_up_after_max_attempts(sleeps):
+    send = Script(500, 500, 500)
+    assert RetryPolicy("test", max_attempts=2).call(send).status_code == 500
+    assert send.calls == 2
+
+def test_client_errors_are_not_retried(sleeps):
+    send = Script(404)
+    assert RetryPolicy("test").call(send).status_code == 404
+    assert send.calls == 1
+
+def test_non_idempotent_request_is_only_retried_when_rejected(sleeps):
+    policy = RetryPolicy("test", max_attempts=3)
+    send = Script(500)
+    assert policy.call(send, idempotent=False).status_code == 500
+    assert send.calls == 1
+    send = Script(503, 201)
+    assert policy.call(send, idempotent=False).status_code == 201
+
+def test_read_timeout_of_a_post_is_not_retried(sleeps):
+    send = Script(ReadTimeout("read timed out"))
+    with pytest.raises(ReadTimeout):
+        RetryPolicy("test").call(send, idempotent=False)
+    assert send.calls == 1
+
+    send = Script(ConnectTimeout("connect timed out"), 201)
+    assert RetryPolicy("test").call(send, idempotent=False).status_code == 201
+
+def test_retry_after_is_honoured(sleeps):
+    send = Script((503, {"Retry-After": "7"}), 200)
+    RetryPolicy("test").call(send)
+    assert sleeps == [7.0]
+
+def test_too_long_retry_after_returns_the_response(sleeps):
+    send = Script((503, {"Retry-After": "600"}))
+    assert RetryPolicy("test", max_retry_after=30).call(send).status_code == 503
+    assert sleeps == []
+
+def test_throttled_responses_do_not_use_up_attempts(sleeps):
+    send = Script(429, 429, 429, 200)
+    assert RetryPolicy("test", max_attempts=1).call(send).status_code == 200
+    assert send.calls == 4
+
+def test_retry_budget_caps_retries(sleeps):
+    policy = RetryPolicy("test", max_attempts=5, budget_ratio=0, budget_reserve=1, failure_threshold=100)
+    send = Script(500, 500, 500)
+    assert policy.call(send).status_code == 500
+    assert send.calls == 2
+
+def test_retry_after_seconds_parses_deltas_and_dates():
+    assert retry_after_seconds(_response(429, {"Retry-After": "12"})) == 12
+    future = formatdate(time.time() + 60, usegmt=True)
+    assert 55 < retry_after_seconds(_response(429, {"Retry-After": future})) <= 60
+    assert retry_after_seconds(_response(429)) is None
+    assert retry_after_seconds(None) is None
+
+def test_circuit_opens_after_consecutive_failures(sleeps):
+    policy = RetryPolicy("test", max_attempts=1, failure_threshold=2, reset_timeout=60)
+    policy.call(Script(500))
+    policy.call(Script(500))
+    send = Script(200)
+    with pytest.raises(CircuitOpenError):
+        policy.call(send)
+    assert send.calls == 0
+
+def test_half_open_probe_closes_the_circuit(sleeps):
+    policy = RetryPolicy("test", max_attempts=1, failure_threshold=1, reset_timeout=0)
+    policy.call(Script(500))
+    assert policy.breaker.is_open
+    assert policy.call(Script(200)).status_code == 200
+    assert not policy.breaker.is_open
+
+def test_failed_probe_reopens_the_circuit(sleeps):
+    policy = RetryPolicy("test", max_attempts=1, failure_threshold=1, reset_timeout=0)
+    policy.call(Script(500))
+    policy.call(Script(500))
+    policy.breaker.reset_timeout = 60
+    with pytest.raises(CircuitOpenError):
+        policy.call(Script(200))
+
+def test_probe_that_raises_does_not_block_the_circuit(sleeps):
+    policy = RetryPolicy("test", max_attempts=1, failure_threshold=1, reset_timeout=0)
+    policy.call(Script(500))
+    with pytest.raises(ValueError):
+        policy.call(Script(ValueError("bad response")))
+    assert policy.call(Script(200)).status_code == 200
+
+def test_only_one_probe_at_a_time():
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=0)
+    breaker.record_failure()
+    assert breaker.before_call() is True
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    breaker.end_probe()
+    assert breaker.before_call() is True
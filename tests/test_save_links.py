@@ -0,0 +1,82 @@
+# test_save_links.py
+import io
+import runpy
+import sys
+
+import pytest
+
+pytest.importorskip("msvcrt")  # save_links relies on the Windows file utilities
+
+@pytest.fixture
+def save_links(tmp_path, monkeypatch):
+    import queue_store
+    from queue_store import QueueStore
+    # save_links creates LINKS_DIR and save_links.log (in the working directory) on import
+    monkeypatch.setattr(queue_store, "LINKS_DIR", str(tmp_path / "pending_links"))
+    monkeypatch.chdir(tmp_path)
+    import save_links
+    store = QueueStore(str(tmp_path / "queue.db"))
+    monkeypatch.setattr(save_links, "get_store", lambda: store)
+    monkeypatch.setattr(save_links, "LOCK_FILE", str(tmp_path / ".lock"))
+    save_links.store = store
+    return save_links
+
+def test_normalize_accepts_dicts_and_tuples(save_links):
+    assert save_links._normalize_item({"link": "https://a", "filename": "A.mkv"}) == {
+        "link": "https://a", "filename": "A.mkv"}
+    assert save_links._normalize_item((" https://a ", "A.mkv", "")) == {"link": "https://a", "filename": "A.mkv"}
+    assert save_links._normalize_item(["https://a", "A.mkv", "thumbs/A.jpg"])["thumbnail_path"] == "thumbs/A.jpg"
+
+@pytest.mark.parametrize("item", [
+    ("https://a", ""),
+    ("", "A.mkv"),
+    ("https://a", "   "),
+    ("https://a",),
+    ("https://a", None),
+    {"link": "https://a"},
+    {"link": 5, "filename": "A.mkv"},
+    "https://a",
+])
+def test_normalize_rejects_incomplete_entries(save_links, item):
+    with pytest.raises(ValueError):
+        save_links._normalize_item(item)
+
+def test_bulk_save_skips_invalid_entries(save_links):
+    count = save_links.save_links_bulk([
+        ("https://a", "A.mkv"),
+        ("https://b", ""),
+        {"link": "https://c", "filename": "C.mkv"},
+    ])
+    assert count == 2
+    assert save_links.store.count() == 2
+
+def test_save_link_rejects_empty_filename(save_links):
+    assert save_links.save_link("https://a", "") is None
+    assert save_links.store.count() == 0
+
+def test_read_jsonl_accepts_json_and_tab_separated_lines(save_links):
+    lines = io.StringIO('{"link": "https://a", "filename": "A.mkv"}\n\nhttps://b\tB.mkv\n{broken\n')
+    assert list(save_links.read_jsonl(lines)) == [
+        {"link": "https://a", "filename": "A.mkv"},
+        ["https://b", "B.mkv"],
+    ]
+
+def _run_cli(save_links, monkeypatch, *argv):
+    monkeypatch.setattr(sys, "argv", ["save_links.py", *argv])
+    with pytest.raises(SystemExit) as exc:
+        runpy.run_path(save_links.__file__, run_name="__main__")
+    return exc.value.code
+
+def test_cli_reports_missing_jsonl_file(save_links, monkeypatch, capsys):
+    assert _run_cli(save_links, monkeypatch, "--jsonl", "missing.jsonl") == 2
+    assert "cannot read missing.jsonl" in capsys.readouterr().err
+
+def test_cli_rejects_invalid_entries(save_links, monkeypatch, tmp_path, capsys):
+    path = tmp_path / "links.jsonl"
+    path.write_text('{"link": "https://a", "filename": "A.mkv"}\nhttps://b\t\n')
+    assert _run_cli(save_links, monkeypatch, "--jsonl", str(path)) == 2
+    assert "entry 2" in capsys.readouterr().err
+
+def test_cli_rejects_blank_filename(save_links, monkeypatch, capsys):
+    assert _run_cli(save_links, monkeypatch, "https://a", " ") == 2
+    assert "Missing filename" in capsys.readouterr().err
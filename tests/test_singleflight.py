@@ -0,0 +1,80 @@
+# test_singleflight.py
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from metadata_cache import MetadataCache
+from singleflight import Group, singleflight
+
+class SlowCall:
+    """fn for Group.do() that blocks until released, counting executions"""
+
+    def __init__(self, result=None, error=None):
+        self.result = result
+        self.error = error
+        self.calls = 0
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def __call__(self):
+        self.calls += 1
+        self.started.set()
+        self.release.wait(5)
+        if self.error:
+            raise self.error
+        return self.result
+
+def _share(run, call, callers):
+    """Call run() from several threads while the first execution of call is still in flight"""
+    with ThreadPoolExecutor(callers) as pool:
+        futures = [pool.submit(run)]
+        assert call.started.wait(5)
+        futures += [pool.submit(run) for _ in range(callers - 1)]
+        time.sleep(0.1)  # let the other callers join the flight
+        call.release.set()
+        return futures
+
+def test_concurrent_calls_share_one_execution():
+    group, call = Group(), SlowCall(result="result")
+    futures = _share(lambda: group.do("key", call), call, 4)
+    assert [future.result() for future in futures] == ["result"] * 4
+    assert call.calls == 1
+
+def test_waiters_get_the_leaders_exception():
+    group, call = Group(), SlowCall(error=RuntimeError("upstream down"))
+    futures = _share(lambda: group.do("key", call), call, 3)
+    for future in futures:
+        with pytest.raises(RuntimeError):
+            future.result()
+    assert call.calls == 1
+
+def test_finished_calls_are_not_remembered():
+    group = Group()
+    assert group.do("key", lambda: 1) == 1
+    assert group.do("key", lambda: 2) == 2
+
+def test_decorator_keys_on_arguments():
+    calls = []
+    release = threading.Event()
+
+    @singleflight(lambda site, name: (site, name.lower()))
+    def lookup(site, name):
+        calls.append(name)
+        release.wait(5)
+        return name
+
+    with ThreadPoolExecutor(4) as pool:
+        futures = [pool.submit(lookup, "wp", name) for name in ("Movies", "MOVIES", "movies", "Anime")]
+        threading.Timer(0.2, release.set).start()
+        results = [future.result() for future in futures]
+    assert len(calls) == 2
+    assert results[3] == "Anime"
+
+def test_metadata_cache_misses_share_one_fetch(tmp_path):
+    cache = MetadataCache(str(tmp_path / "metadata.db"))
+    call = SlowCall(result={"title": "Show"})
+    futures = _share(lambda: cache.get_or_fetch("tmdb", "Show", call), call, 4)
+    assert [future.result() for future in futures] == [{"title": "Show"}] * 4
+    assert call.calls == 1
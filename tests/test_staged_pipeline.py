@@ -0,0 +1,103 @@
+# test_staged_pipeline.py
+import threading
+import time
+
+from staged_pipeline import Stage, StagedPipeline
+
+def _collect(stages, jobs, **kwargs):
+    done, failed = [], []
+    lock = threading.Lock()
+
+    def on_done(job):
+        with lock:
+            done.append(job)
+
+    def on_error(job, exc):
+        with lock:
+            failed.append((job, str(exc)))
+
+    pipeline = StagedPipeline(stages, on_done=on_done, on_error=on_error, **kwargs).start()
+    for key, job in jobs:
+        pipeline.submit(key, job)
+    pipeline.shutdown()
+    return pipeline, done, failed
+
+def test_jobs_pass_through_every_stage():
+    stages = [
+        Stage("parse", lambda job: job.setdefault("steps", []).append("parse") or True, workers=2),
+        Stage("publish", lambda job: job["steps"].append("publish") or True, workers=2),
+    ]
+    pipeline, done, failed = _collect(stages, [(n, {"n": n}) for n in range(10)])
+    assert sorted(job["n"] for job in done) == list(range(10))
+    assert all(job["steps"] == ["parse", "publish"] for job in done)
+    assert failed == []
+    assert [stat["done"] for stat in pipeline.stats()] == [10, 10]
+
+def test_falsy_result_finishes_the_job_early():
+    stages = [
+        Stage("parse", lambda job: job["n"] % 2 == 0),
+        Stage("publish", lambda job: job.setdefault("published", True)),
+    ]
+    _, done, _ = _collect(stages, [(n, {"n": n}) for n in range(4)])
+    assert sorted(job["n"] for job in done if job.get("published")) == [0, 2]
+    assert len(done) == 4
+
+def test_failure_is_reported_and_counted():
+    def parse(job):
+        if job["n"] == 1:
+            raise ValueError("bad filename")
+        return True
+
+    pipeline, done, failed = _collect([Stage("parse", parse), Stage("publish", lambda job: True)],
+                                      [(n, {"n": n}) for n in range(3)])
+    assert failed == [({"n": 1}, "bad filename")]
+    assert len(done) == 2
+    assert pipeline.stats()[0]["failed"] == 1
+
+def test_jobs_with_the_same_key_run_one_at_a_time_in_order():
+    running = set()
+    order = []
+    lock = threading.Lock()
+
+    def work(job):
+        with lock:
+            assert job["key"] not in running
+            running.add(job["key"])
+        time.sleep(0.01)
+        with lock:
+            running.discard(job["key"])
+            order.append((job["key"], job["n"]))
+        return True
+
+    stages = [Stage("a", work, workers=4), Stage("b", work, workers=4)]
+    jobs = [(key, {"key": key, "n": n}) for n in range(4) for key in ("x", "y")]
+    _, done, failed = _collect(stages, jobs)
+    assert failed == []
+    assert [n for key, n in order if key == "x"] == [0, 0, 1, 1, 2, 2, 3, 3]
+
+def test_slow_stage_applies_backpressure_to_submit():
+    release = threading.Event()
+    in_flight = []
+
+    def slow(job):
+        in_flight.append(job)
+        release.wait(5)
+        return True
+
+    pipeline = StagedPipeline([Stage("slow", slow, workers=1, queue_size=1)]).start()
+    capacity = 2  # one job in the worker, one in the queue
+    submitted = []
+
+    def producer():
+        for n in range(5):
+            pipeline.submit(n, {"n": n})
+            submitted.append(n)
+
+    thread = threading.Thread(target=producer)
+    thread.start()
+    time.sleep(0.2)
+    assert len(submitted) == capacity
+    release.set()
+    thread.join(5)
+    pipeline.shutdown()
+    assert len(in_flight) == 5
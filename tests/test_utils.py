@@ -0,0 +1,40 @@
+# test_utils.py
+import pytest
+
+from utils import canonical_slug, release_key
+
+def test_release_key_ignores_host_and_separators():
+    assert release_key("Show.Name.S01E02.1080p.WEB-DL.mkv") == "show name|s01|e02|1080p"
+    assert release_key("Show Name S01E02 1080p WEB-DL.mkv") == release_key("Show.Name.S01E02.1080p.WEB-DL.mkv")
+
+def test_release_key_separates_episodes_and_resolutions():
+    assert release_key("Show.S01E01.1080p.mkv") != release_key("Show.S01E02.1080p.mkv")
+    assert release_key("Show.S01E01.1080p.mkv") != release_key("Show.S01E01.720p.mkv")
+
+@pytest.mark.parametrize("filename", ["[].mkv", "---.mp4", "1080p.mkv", "S01E02.mkv", ""])
+def test_release_key_is_none_without_a_title(filename):
+    assert release_key(filename) is None
+
+def test_canonical_slug_is_the_same_for_every_spelling_of_a_release():
+    assert canonical_slug("Show Name S01E02 1080p") == "show-name-s01e02-1080p"
+    assert canonical_slug("Show.Name.S01E02.1080p.WEB-DL") == "show-name-s01e02-1080p"
+    assert canonical_slug("Naruto Shippuden S02 1080p") == "naruto-shippuden-s02-1080p"
+
+def test_canonical_slug_keeps_resolutions_apart():
+    assert canonical_slug("Show Name S01E02 720p") != canonical_slug("Show Name S01E02 1080p")
+
+def test_canonical_slug_fits_wordpress_limits():
+    slug = canonical_slug("A Very Long Title " * 20 + "S01E01 1080p")
+    assert len(slug) <= 190
+    assert canonical_slug("") == ""
+
+def test_canonical_slug_keeps_non_latin_titles_apart():
+    attack_on_titan = canonical_slug("進撃の巨人 S01E02 1080p")
+    demon_slayer = canonical_slug("鬼滅の刃 S01E02 1080p")
+    assert attack_on_titan != demon_slayer
+    assert attack_on_titan.startswith("s01e02-1080p-")
+    assert attack_on_titan == canonical_slug("進撃の巨人.S01E02.1080p.WEB-DL")
+    assert len(canonical_slug("巨人" * 200 + " S01E01 1080p")) <= 190
+
+def test_canonical_slug_transliterates_accents():
+    assert canonical_slug("Pokémon S01E02 1080p") == "pokemon-s01e02-1080p"
@@ -0,0 +1,57 @@
+# test_worker_pool.py
+import threading
+import time
+
+from worker_pool import KeyedWorkerPool
+
+def test_same_key_runs_in_submission_order():
+    pool = KeyedWorkerPool(4)
+    seen = []
+    lock = threading.Lock()
+
+    def task(key, n):
+        time.sleep(0.01 * (5 - n))  # later tasks would finish first if they overlapped
+        with lock:
+            seen.append((key, n))
+
+    for n in range(5):
+        for key in ("a", "b"):
+            pool.submit(key, task, key, n)
+    pool.shutdown()
+    assert [n for key, n in seen if key == "a"] == list(range(5))
+    assert [n for key, n in seen if key == "b"] == list(range(5))
+
+def test_different_keys_run_concurrently():
+    pool = KeyedWorkerPool(3)
+    barrier = threading.Barrier(3, timeout=2)
+    for key in "abc":
+        pool.submit(key, barrier.wait)
+    pool.shutdown()
+    assert not barrier.broken
+
+def test_submit_blocks_when_backlog_is_full():
+    pool = KeyedWorkerPool(1, backlog_factor=2)
+    release = threading.Event()
+    pool.submit("a", release.wait)
+    pool.submit("a", lambda: None)
+
+    submitted = threading.Event()
+    thread = threading.Thread(target=lambda: (pool.submit("b", lambda: None), submitted.set()))
+    thread.start()
+    assert not submitted.wait(0.2)
+    release.set()
+    assert submitted.wait(2)
+    thread.join()
+    pool.shutdown()
+
+def test_failed_task_does_not_stop_its_key():
+    pool = KeyedWorkerPool(2)
+    done = []
+
+    def fail():
+        raise RuntimeError("boom")
+
+    pool.submit("a", fail)
+    pool.submit("a", done.append, 1)
+    pool.shutdown()
+    assert done == [1]
@@ -0,0 +1,139 @@
+# test_wp_terms.py
+import json
+from collections import Counter
+
+import pytest
+import requests
+
+pytest.importorskip("msvcrt")  # wp_terms stores its cache through safe_json (Windows file locking)
+
+import wp_terms
+from wp_terms import TermCache, resolve_terms
+
+SITE = "http://wp.test"
+WP = {"url": SITE + "/"}
+
+def _response(status, body, headers=None):
+    response = requests.Response()
+    response.status_code = status
+    response._content = json.dumps(body).encode()
+    response.headers.update(headers or {})
+    response.url = SITE
+    return response
+
+class FakeWordPress:
+    """Terms of one taxonomy behind the list, create and batch endpoints"""
+
+    def __init__(self, terms=(), batch=True):
+        self.terms = {}
+        self.batch = batch
+        self.calls = Counter()
+        for name in terms:
+            self._create(name)
+
+    def _create(self, name):
+        for term_id, existing in self.terms.items():
+            if existing.lower() == name.lower():
+                return 400, {"code": "term_exists", "data": {"term_id": term_id}}
+        term_id = 100 + len(self.terms)
+        self.terms[term_id] = name
+        return 201, {"id": term_id, "name": name}
+
+    def get(self, upstream, url, params=None, **kwargs):
+        self.calls["GET"] += 1
+        rows = [{"id": i, "name": n, "slug": wp_terms._slugify(n)} for i, n in self.terms.items()]
+        if "slug" in params:
+            rows = [row for row in rows if row["slug"] in params["slug"].split(",")]
+        elif "search" in params:
+            rows = [row for row in rows if params["search"].lower() in row["name"].lower()]
+        per_page = params.get("per_page", 10)
+        page = params.get("page", 1)
+        pages = max(1, -(-len(rows) // per_page))
+        return _response(200, rows[(page - 1) * per_page:page * per_page], {"X-WP-TotalPages": str(pages)})
+
+    def post(self, upstream, url, json=None, **kwargs):
+        if url.endswith("/batch/v1"):
+            self.calls["batch"] += 1
+            if not self.batch:
+                return _response(404, {"code": "rest_no_route"})
+            responses = []
+            for sub in json["requests"]:
+                status, body = self._create(sub["body"]["name"])
+                responses.append({"status": status, "body": body})
+            return _response(207, {"responses": responses})
+        self.calls["create"] += 1
+        return _response(*self._create(json["name"]))
+
+@pytest.fixture
+def wordpress(tmp_path, monkeypatch):
+    def install(terms=(), batch=True):
+        fake = FakeWordPress(terms, batch)
+        monkeypatch.setattr(wp_terms.http_client, "get", fake.get)
+        monkeypatch.setattr(wp_terms.http_client, "post", fake.post)
+        return fake
+
+    monkeypatch.setattr(wp_terms, "term_cache", TermCache(str(tmp_path / "term_cache.json")))
+    monkeypatch.setattr(wp_terms, "_batch_supported", {})
+    return install
+
+def test_known_terms_resolve_from_one_listing(wordpress):
+    fake = wordpress(["Movies", "Anime", "HD"])
+    assert resolve_terms(WP, None, ["Movies", "anime", " HD "]) == [100, 101, 102]
+    assert fake.calls == {"GET": 1}
+    assert resolve_terms(WP, None, ["Anime", "Movies"]) == [101, 100]
+    assert fake.calls == {"GET": 1}
+
+def test_cache_survives_a_restart(wordpress, tmp_path):
+    wordpress(["Movies"])
+    resolve_terms(WP, None, ["Movies"])
+    cache = TermCache(str(tmp_path / "term_cache.json"))
+    assert cache.get(SITE, "categories", "MOVIES") == 100
+    assert cache.is_warm(SITE, "categories")
+
+def test_invalidating_stale_ids_forces_a_new_listing(wordpress):
+    fake = wordpress(["Movies"])
+    resolve_terms(WP, None, ["Movies"])
+    wp_terms.term_cache.invalidate(SITE, "categories", term_ids=[100])
+    assert not wp_terms.term_cache.is_warm(SITE, "categories")
+    assert resolve_terms(WP, None, ["Movies"]) == [100]
+    assert fake.calls["GET"] == 2
+
+def test_missing_terms_are_created_in_batches(wordpress):
+    fake = wordpress(["Movies"])
+    names = ["Movies"] + [f"Tag {n}" for n in range(30)]
+    ids = resolve_terms(WP, None, names)
+    assert len(set(ids)) == 31
+    assert fake.calls["batch"] == 2  # 25 sub-requests per batch call
+    assert fake.calls["create"] == 0
+    assert resolve_terms(WP, None, names) == ids
+
+def test_terms_created_concurrently_without_batch_endpoint(wordpress):
+    fake = wordpress(batch=False)
+    ids = resolve_terms(WP, None, ["One", "Two", "Three"])
+    assert sorted(ids) == [100, 101, 102]
+    assert fake.calls["batch"] == 1
+    assert fake.calls["create"] == 3
+    assert wp_terms._batch_supported[SITE] is False
+
+    resolve_terms(WP, None, ["Four"])
+    assert fake.calls["batch"] == 1
+
+def test_term_created_elsewhere_resolves_to_existing_id(wordpress):
+    fake = wordpress()
+    resolve_terms(WP, None, ["Movies"])  # warms an empty listing
+    fake._create("Drama")
+    assert resolve_terms(WP, None, ["Drama"]) == [101]
+
+def test_warm_lists_every_page(wordpress):
+    fake = wordpress([f"Term {i}" for i in range(250)])
+    assert wp_terms.term_cache.warm(WP, None, "tags") == 250
+    assert fake.calls == {"GET": 3}
+    assert wp_terms.term_cache.get(SITE, "tags", "term 249") == 349
+
+def test_created_terms_are_saved_once_per_batch(wordpress, monkeypatch):
+    wordpress(["Movies"])
+    resolve_terms(WP, None, ["Movies"], "tags")
+    saves = []
+    monkeypatch.setattr(wp_terms, "save_json", lambda path, data: saves.append(path))
+    resolve_terms(WP, None, [f"New {i}" for i in range(30)], "tags")
+    assert len(saves) == 1
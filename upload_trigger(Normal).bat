@@ -10,12 +10,16 @@ set "PYTHON_PATH=python.exe"
 set "SAVE_SCRIPT=%SCRIPT_DIR%save_links.py"
 set "UPLOAD_SCRIPT=%SCRIPT_DIR%AutoUploader.py"
 set "LINKS_DIR=%SCRIPT_DIR%pending_links"
+set "DAEMON_PID_FILE=%LINKS_DIR%\.daemon.pid"
 set "LOG_FILE=%SCRIPT_DIR%logs\upload_%date:~-4,4%%date:~-7,2%%date:~-10,2%_%time:~0,2%%time:~3,2%.log"
 
 :: Retry configuration
 set MAX_RETRIES=3
 set INITIAL_DELAY=2
 set BACKOFF_FACTOR=2
+:: Network retries happen inside AutoUploader (retry_policy) and failed links
+:: are retried by the queue with backoff, so the queue run is not repeated here
+set QUEUE_MAX_RETRIES=1
 
 :: Create required directories if they don't exist
 if not exist "%SCRIPT_DIR%config\" mkdir "%SCRIPT_DIR%config"
@@ -31,7 +35,7 @@ echo [%date% %time%] Script started > "%LOG_FILE%"
 echo [%date% %time%] Working Directory: %cd% >> "%LOG_FILE%"
 echo [%date% %time%] Python Path: %PYTHON_PATH% >> "%LOG_FILE%"
 echo [%date% %time%] Script Path: %UPLOAD_SCRIPT% >> "%LOG_FILE%"
-echo [%date% %time%] Retry Settings: Max=%MAX_RETRIES% InitialDelay=%INITIAL_DELAY%s Backoff=%BACKOFF_FACTOR%x >> "%LOG_FILE%"
+echo [%date% %time%] Retry Settings: Max=%MAX_RETRIES% (queue %QUEUE_MAX_RETRIES%) InitialDelay=%INITIAL_DELAY%s Backoff=%BACKOFF_FACTOR%x >> "%LOG_FILE%"
 
 :: Main processing
 if "%~2"=="" (
@@ -61,8 +65,14 @@ if "%~2"=="" (
     call :SAVE_WITH_RETRY "!link!" "!filename!"
 )
 
-:: Process all pending links with retries
-call :PROCESS_QUEUE_WITH_RETRY
+:: Process all pending links with retries, unless the resident daemon
+:: (AutoUploader.py --daemon) is running and will pick the link up itself
+call :DAEMON_RUNNING
+if errorlevel 1 (
+    call :PROCESS_QUEUE_WITH_RETRY
+) else (
+    echo [%date% %time%] Queue daemon is running, link handed over >> "%LOG_FILE%"
+)
 
 :: Final status
 if errorlevel 1 (
@@ -109,18 +119,33 @@ set RETRY_COUNT=0
 set CURRENT_DELAY=%INITIAL_DELAY%
 
 :QUEUE_ATTEMPT
-echo [%date% %time%] Processing queue (Attempt !RETRY_COUNT! of %MAX_RETRIES%) >> "%LOG_FILE%"
+echo [%date% %time%] Processing queue (Attempt !RETRY_COUNT! of %QUEUE_MAX_RETRIES%) >> "%LOG_FILE%"
 "%PYTHON_PATH%" "%UPLOAD_SCRIPT%" --process-queue >> "%LOG_FILE%" 2>&1
 
 if errorlevel 1 (
     set /a RETRY_COUNT+=1
-    if !RETRY_COUNT! lss %MAX_RETRIES% (
+    if !RETRY_COUNT! lss %QUEUE_MAX_RETRIES% (
         echo [%date% %time%] Queue processing failed, retrying in !CURRENT_DELAY! seconds >> "%LOG_FILE%"
         timeout /t !CURRENT_DELAY! >nul
         set /a CURRENT_DELAY*=BACKOFF_FACTOR
         goto QUEUE_ATTEMPT
     )
-    echo [%date% %time%] ERROR: Failed to process queue after %MAX_RETRIES% attempts >> "%LOG_FILE%"
+    echo [%date% %time%] ERROR: Failed to process queue after %QUEUE_MAX_RETRIES% attempts >> "%LOG_FILE%"
+    endlocal
+    exit /b 1
+)
+endlocal
+exit /b 0
+
+:DAEMON_RUNNING
+setlocal
+if not exist "%DAEMON_PID_FILE%" (
+    endlocal
+    exit /b 1
+)
+set /p DAEMON_PID=<"%DAEMON_PID_FILE%"
+tasklist /FI "PID eq %DAEMON_PID%" /NH 2>nul | find "%DAEMON_PID%" >nul
+if errorlevel 1 (
     endlocal
     exit /b 1
 )
@@ -1,15 +1,18 @@
 # utils.py
 import os
 import re
+import hashlib
 import logging
+import unicodedata
 
 logger = logging.getLogger(__name__)
 
-def clean_title(raw_title):
+def clean_title(raw_title, fallback=True):
     """
     Clean raw filename and extract searchable title with season handling.
     Combines extension removal, episode/quality cleanup, and normalization.
-    Returns cleaned title and original base name.
+    Returns cleaned title and original base name. Without fallback an
+    unparseable filename gives an empty title instead of the base name.
     """
     logger.debug(f"Starting to clean raw title: {raw_title}")
     try:
@@ -68,11 +71,11 @@ def clean_title(raw_title):
                 cleaned = parts[-1]
                 logger.debug(f"Detected numeric dot prefix, cleaned to: {cleaned}")
 
-        return cleaned if cleaned else base_name, base_name
+        return cleaned if cleaned or not fallback else base_name, base_name
 
     except Exception as e:
         logger.error(f"Title cleaning failed for '{raw_title}': {str(e)}")
-        return "unknown", str(raw_title)[:100]  # fallback
+        return "unknown" if fallback else "", str(raw_title)[:100]  # fallback
 
 def detect_season_episode(filename):
     """Detect season and episode from filename"""
@@ -88,4 +91,88 @@ def detect_season_episode(filename):
             season = int(match.group("season")) if match.group("season") else None
             episode = int(match.group("episode")) if match.group("episode") else None
             return season, episode
-    return None, None
\ No newline at end of file
+    return None, None
+
+def detect_quality(title):
+    """Strict quality detection that matches exact resolution patterns"""
+    if not title or not isinstance(title, str):
+        return None
+        
+    title_lower = title.lower()
+    quality_map = {
+        '2160p': '4K',
+        '1080p': '1080p',  # Keep exact values for strict matching
+        '720p': '720p',
+        '480p': '480p',
+        '4k': '4K',
+        'hd': 'HD',
+        'sd': 'SD'
+    }
+    
+    # Check for exact quality patterns first
+    for pattern in quality_map:
+        if re.search(r'(^|\W)' + pattern + r'($|\W)', title_lower):
+            return quality_map[pattern]
+            
+    return None
+
+def post_key(title):
+    """
+    Key used to recognize an existing post for a release:
+    (normalized base title, season, episode, quality).
+    """
+    base_title = re.sub(
+        r'\.(2160p|1080p|720p|480p|x\d{3}|hevc|web[\W_]?dl|blu[\W_]?ray|dvdrip|hdtv|xvid).*$',
+        '',
+        title,
+        flags=re.IGNORECASE
+    )
+    base_title = re.sub(r'[\s._]+', ' ', base_title).strip().lower()
+    season, episode = detect_season_episode(title)
+    return base_title, season, episode, detect_quality(title)
+
+def canonical_slug(title):
+    """
+    Deterministic post slug for a release, e.g. "show-name-s01e02-1080p".
+    Posts are created with it so existence checks can use GET posts?slug=.
+    Titles with letters that have no ASCII form get a short hash of the title.
+    """
+    base_title, season, episode, quality = post_key(title)
+    # Season/episode and resolution are appended in a fixed form below
+    base_title = re.sub(r'\b(?:2160p|1080p|720p|480p|4k)\b.*$', '', base_title)
+    base_title = re.sub(r'\b(?:s\d+(?:\s*e\d+)?|\d+x\d+)\b', ' ', base_title)
+    # Transliterate accents ("pokémon" -> "pokemon"); other non-ASCII letters are dropped below
+    decomposed = unicodedata.normalize('NFKD', base_title)
+    decomposed = "".join(c for c in decomposed if not unicodedata.combining(c))
+    parts = [decomposed.encode('ascii', 'ignore').decode('ascii')]
+    if season:
+        parts.append(f"s{season:02d}" + (f"e{episode:02d}" if episode else ""))
+    if quality:
+        parts.append(quality.lower())
+    slug = re.sub(r'[^a-z0-9]+', '-', " ".join(parts).lower()).strip('-')
+    if any(c.isalnum() and not c.isascii() for c in decomposed):
+        # Titles that differ only in dropped characters must still get different slugs
+        digest = hashlib.sha1(unicodedata.normalize('NFKC', base_title).strip().encode('utf-8')).hexdigest()[:8]
+        return f"{slug[:181]}-{digest}".strip('-')
+    return slug[:190]
+
+def release_key(filename):
+    """
+    Normalized key identifying one release (title, season, episode, resolution).
+    Links for the same file on different hosts share the same key.
+    Returns None when no title can be parsed, so unrelated unparseable
+    files are never grouped together.
+    """
+    cleaned, raw_name = clean_title(filename, fallback=False)
+    title = re.sub(r'\s+', ' ', cleaned).strip().lower()
+    if not title:
+        return None
+    season, episode = detect_season_episode(raw_name)
+    resolution = re.search(r'(?<![a-z0-9])(\d{3,4}p|4k)(?![a-z0-9])', raw_name, re.IGNORECASE)
+    parts = [
+        title,
+        f"s{season:02d}" if season else "",
+        f"e{episode:02d}" if episode else "",
+        resolution.group(1).lower() if resolution else ""
+    ]
+    return "|".join(parts)
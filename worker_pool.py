@@ -0,0 +1,66 @@
+# worker_pool.py
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+class KeyedWorkerPool:
+    """
+    Thread pool that runs tasks concurrently across keys but strictly in
+    submission order within a key (e.g. all links of one release).
+    submit() blocks once `workers * backlog_factor` tasks are outstanding so
+    the caller never claims far more queue items than can be worked on.
+    """
+
+    def __init__(self, workers, backlog_factor=2):
+        self.workers = max(1, int(workers))
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="upload")
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._chains = {}
+        self._outstanding = 0
+        self._slots = threading.BoundedSemaphore(self.workers * backlog_factor)
+
+    def submit(self, key, fn, *args, **kwargs):
+        """Queue fn(*args, **kwargs) behind any running task with the same key"""
+        self._slots.acquire()
+        task = (fn, args, kwargs)
+        with self._lock:
+            self._outstanding += 1
+            if key in self._chains:
+                self._chains[key].append(task)
+                return
+            self._chains[key] = deque()
+        self._executor.submit(self._run_chain, key, task)
+
+    def _run_chain(self, key, task):
+        while task:
+            fn, args, kwargs = task
+            try:
+                fn(*args, **kwargs)
+            except Exception as e:
+                logger.error(f"Worker task for '{key}' failed: {str(e)}", exc_info=True)
+            finally:
+                self._slots.release()
+            with self._lock:
+                self._outstanding -= 1
+                chain = self._chains[key]
+                if chain:
+                    task = chain.popleft()
+                else:
+                    del self._chains[key]
+                    task = None
+                if not self._outstanding:
+                    self._idle.notify_all()
+
+    def join(self):
+        """Wait until every submitted task has finished"""
+        with self._lock:
+            while self._outstanding:
+                self._idle.wait()
+
+    def shutdown(self):
+        self.join()
+        self._executor.shutdown(wait=True)
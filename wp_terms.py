@@ -1,50 +1,323 @@
-import requests
+import os
+import re
+import html
+import unicodedata
+import logging
+import threading
+import http_client
 from requests.auth import HTTPBasicAuth
 from requests.exceptions import RequestException
 import time
-from functools import wraps
-
-def retry_with_backoff(max_retries=3, initial_delay=1, backoff_factor=2):
-    """Decorator for retrying API calls with exponential backoff"""
-    def decorator(func):
-        @wraps(func)
-        def wrapper(*args, **kwargs):
-            retries = 0
-            delay = initial_delay
-            while retries < max_retries:
-                try:
-                    return func(*args, **kwargs)
-                except RequestException:
-                    retries += 1
-                    if retries >= max_retries:
-                        raise
-                    time.sleep(delay)
-                    delay *= backoff_factor
-        return wrapper
-    return decorator
-
-@retry_with_backoff()
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from safe_json import load_json, save_json
+from singleflight import singleflight
+
+logger = logging.getLogger(__name__)
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+TERM_CACHE_FILE = os.path.join(SCRIPT_DIR, "config", "term_cache.json")
+# Re-list all terms of a taxonomy once the cached listing is older than this
+TERM_CACHE_MAX_AGE = 24 * 60 * 60
+# WordPress accepts at most 25 sub-requests per /batch/v1 call
+BATCH_LIMIT = 25
+CREATE_WORKERS = 8
+# Listing pages fetched at once when warming the cache
+WARM_WORKERS = 4
+
+# site -> whether /batch/v1 is available (unknown until first use)
+_batch_supported = {}
+
+def _normalize_name(name):
+    return " ".join(html.unescape(str(name)).split()).lower()
+
+class TermCache:
+    """
+    Persistent term name -> ID map keyed by site and taxonomy.
+    Stored in config/term_cache.json as
+    {site: {taxonomy: {"warmed_at": ts, "terms": {normalized name: id}}}}.
+    """
+
+    def __init__(self, path=TERM_CACHE_FILE):
+        self.path = path
+        self._lock = threading.RLock()
+        self._data = None
+        self._deferred = 0
+        self._dirty = False
+
+    def _load(self):
+        if self._data is None:
+            self._data = load_json(self.path) or {}
+        return self._data
+
+    def _save(self):
+        if self._deferred:
+            self._dirty = True
+            return
+        save_json(self.path, self._data)
+        self._dirty = False
+
+    @contextmanager
+    def deferred_save(self):
+        """Write the cache file once when the block ends instead of on every change"""
+        with self._lock:
+            self._deferred += 1
+        try:
+            yield self
+        finally:
+            with self._lock:
+                self._deferred -= 1
+                if not self._deferred and self._dirty:
+                    self._save()
+
+    def _bucket(self, site, taxonomy):
+        sites = self._load()
+        return sites.setdefault(site, {}).setdefault(taxonomy, {"warmed_at": 0, "terms": {}})
+
+    def get(self, site, taxonomy, name):
+        with self._lock:
+            return self._bucket(site, taxonomy)["terms"].get(_normalize_name(name))
+
+    def set(self, site, taxonomy, name, term_id):
+        with self._lock:
+            terms = self._bucket(site, taxonomy)["terms"]
+            key = _normalize_name(name)
+            if terms.get(key) != term_id:
+                terms[key] = term_id
+                self._save()
+
+    def invalidate(self, site, taxonomy, name=None, term_ids=None):
+        """Drop one name, every entry pointing at term_ids, or (no arguments) the whole listing"""
+        with self._lock:
+            bucket = self._bucket(site, taxonomy)
+            if name is not None:
+                bucket["terms"].pop(_normalize_name(name), None)
+            else:
+                # Stale IDs mean the listing itself is out of date
+                if term_ids is not None:
+                    stale = set(term_ids)
+                    bucket["terms"] = {k: v for k, v in bucket["terms"].items() if v not in stale}
+                else:
+                    bucket["terms"] = {}
+                bucket["warmed_at"] = 0
+            self._save()
+
+    def is_warm(self, site, taxonomy):
+        with self._lock:
+            return time.time() - self._bucket(site, taxonomy)["warmed_at"] < TERM_CACHE_MAX_AGE
+
+    def warm(self, wp, auth, taxonomy):
+        """
+        Replace the cached listing with every term of the taxonomy (100 per
+        request; the pages after the first are fetched concurrently).
+        """
+        site = wp['url'].rstrip('/')
+        url = f"{site}/wp-json/wp/v2/{taxonomy}"
+
+        def fetch(page):
+            res = http_client.get(
+                "wordpress",
+                url,
+                params={"per_page": 100, "page": page, "_fields": "id,name,slug"},
+                auth=auth
+            )
+            res.raise_for_status()
+            return res
+
+        first = fetch(1)
+        pages = [first.json()]
+        total_pages = int(first.headers.get("X-WP-TotalPages", 1) or 1)
+        if total_pages > 1:
+            with ThreadPoolExecutor(max_workers=min(WARM_WORKERS, total_pages - 1)) as executor:
+                pages += [res.json() for res in executor.map(fetch, range(2, total_pages + 1))]
+        terms = {_normalize_name(term["name"]): term["id"] for page in pages for term in page}
+
+        with self._lock:
+            bucket = self._bucket(site, taxonomy)
+            bucket["terms"] = terms
+            bucket["warmed_at"] = time.time()
+            self._save()
+        logger.info(f"Cached {len(terms)} {taxonomy} from {site}")
+        return len(terms)
+
+term_cache = TermCache()
+
+@singleflight(lambda wp, auth, term_name, taxonomy="categories":
+              (wp['url'].rstrip('/'), taxonomy, _normalize_name(term_name)))
 def get_or_create_term(wp, auth, term_name, taxonomy="categories"):
     """Fetches the term ID for a category or tag, creates it if not found"""
     term_name = term_name.strip()
-    url = f"{wp['url'].rstrip('/')}/wp-json/wp/v2/{taxonomy}"
+    site = wp['url'].rstrip('/')
+    cached_id = term_cache.get(site, taxonomy, term_name)
+    if cached_id:
+        return cached_id
+
+    url = f"{site}/wp-json/wp/v2/{taxonomy}"
     params = {"search": term_name}
     
-    res = requests.get(url, params=params, auth=auth, timeout=10)
-    res.raise_for_status()
-    results = res.json()
-    
-    if results:
-        return results[0]["id"]
-    
-    # Create new term
-    res = requests.post(url, json={"name": term_name}, auth=auth, timeout=10)
-    res.raise_for_status()
-    return res.json()["id"]
+    try:
+        # A warm cache lists every term, so a miss means the term is new;
+        # a concurrent create is still caught by the term_exists response below
+        results = []
+        if not term_cache.is_warm(site, taxonomy):
+            res = http_client.get("wordpress", url, params=params, auth=auth)
+            res.raise_for_status()
+            results = res.json()
+        
+        if results:
+            # Prefer the exact name over other partial search matches
+            wanted = _normalize_name(term_name)
+            match = next((t for t in results if _normalize_name(t.get("name", "")) == wanted), results[0])
+            term_cache.set(site, taxonomy, term_name, match["id"])
+            return match["id"]
+        
+        # Create new term
+        res = http_client.post("wordpress", url, json={"name": term_name}, auth=auth, idempotent=True)
+        if res.status_code == 400 and res.json().get("code") == "term_exists":
+            term_id = res.json()["data"]["term_id"]
+        else:
+            res.raise_for_status()
+            term_id = res.json()["id"]
+        term_cache.set(site, taxonomy, term_name, term_id)
+        return term_id
+    except RequestException:
+        term_cache.invalidate(site, taxonomy, name=term_name)
+        raise
+
+def _slugify(name):
+    """Approximation of WordPress sanitize_title() used for slug lookups"""
+    slug = unicodedata.normalize("NFKD", html.unescape(name)).encode("ascii", "ignore").decode("ascii")
+    slug = re.sub(r"[^a-z0-9_\s-]", "", slug.lower())
+    return re.sub(r"[\s-]+", "-", slug).strip("-")
+
+def _lookup_terms(wp, auth, names, taxonomy):
+    """Find existing terms for many names with slug-filtered listing requests"""
+    site = wp['url'].rstrip('/')
+    wanted = {_normalize_name(n) for n in names}
+    found = {}
+    slugs = sorted({_slugify(n) for n in names if _slugify(n)})
+    for i in range(0, len(slugs), 100):
+        res = http_client.get(
+            "wordpress",
+            f"{site}/wp-json/wp/v2/{taxonomy}",
+            params={"slug": ",".join(slugs[i:i + 100]), "per_page": 100, "_fields": "id,name,slug"},
+            auth=auth
+        )
+        res.raise_for_status()
+        for term in res.json():
+            key = _normalize_name(term["name"])
+            if key in wanted:
+                found[key] = term["id"]
+                term_cache.set(site, taxonomy, term["name"], term["id"])
+    return found
+
+def _term_id_from_response(status, body):
+    if status in (200, 201) and isinstance(body, dict) and "id" in body:
+        return body["id"]
+    if isinstance(body, dict) and body.get("code") == "term_exists":
+        return body.get("data", {}).get("term_id")
+    return None
+
+def _create_terms_batch(wp, auth, names, taxonomy):
+    """
+    Create terms through the REST batch endpoint (WordPress 5.6+), 25 per request.
+    Returns {normalized name: id}, or None when the site has no batch endpoint.
+    """
+    site = wp['url'].rstrip('/')
+    if _batch_supported.get(site) is False:
+        return None
+
+    created = {}
+    for i in range(0, len(names), BATCH_LIMIT):
+        chunk = names[i:i + BATCH_LIMIT]
+        res = http_client.post(
+            "wordpress",
+            f"{site}/wp-json/batch/v1",
+            json={
+                "validation": "normal",
+                "requests": [
+                    {"method": "POST", "path": f"/wp/v2/{taxonomy}", "body": {"name": name}}
+                    for name in chunk
+                ]
+            },
+            auth=auth,
+            # Re-creating an existing term only yields term_exists
+            idempotent=True
+        )
+        if res.status_code in (404, 405) or (res.status_code == 400 and "rest_no_route" in res.text):
+            logger.info(f"{site} has no REST batch endpoint, creating terms individually")
+            _batch_supported[site] = False
+            return created or None
+        res.raise_for_status()
+        _batch_supported[site] = True
+
+        for name, response in zip(chunk, res.json().get("responses", [])):
+            term_id = _term_id_from_response(response.get("status"), response.get("body"))
+            if term_id is None:
+                raise RequestException(f"Failed to create {taxonomy} term '{name}': {response.get('body')}")
+            created[_normalize_name(name)] = term_id
+            term_cache.set(site, taxonomy, name, term_id)
+    return created
+
+def _create_terms_concurrently(wp, auth, names, taxonomy):
+    created = {}
+    with ThreadPoolExecutor(max_workers=min(CREATE_WORKERS, len(names))) as executor:
+        futures = {
+            name: executor.submit(get_or_create_term, wp, auth, name, taxonomy)
+            for name in names
+        }
+        for name, future in futures.items():
+            created[_normalize_name(name)] = future.result()
+    return created
 
 def resolve_terms(wp, auth, term_names, taxonomy="categories"):
-    """Resolves a list of term names to their WordPress term IDs"""
-    return [
-        get_or_create_term(wp, auth, name, taxonomy)
-        for name in term_names if name.strip()
-    ]
+    """
+    Resolves a list of term names to their WordPress term IDs.
+    Case and whitespace variants are collapsed first. Known terms come from the
+    local cache; the missing ones are looked up in one pass and then created
+    together (REST batch endpoint, or concurrent requests as a fallback).
+    """
+    site = wp['url'].rstrip('/')
+
+    unique = {}
+    for name in term_names:
+        name = " ".join(str(name).split())
+        if name:
+            unique.setdefault(_normalize_name(name), name)
+    if not unique:
+        return []
+
+    if not term_cache.is_warm(site, taxonomy):
+        try:
+            term_cache.warm(wp, auth, taxonomy)
+        except (RequestException, ValueError) as e:
+            logger.warning(f"Could not warm {taxonomy} cache: {str(e)}")
+
+    ids = {key: term_cache.get(site, taxonomy, name) for key, name in unique.items()}
+    missing = [unique[key] for key, term_id in ids.items() if not term_id]
+
+    if missing and not term_cache.is_warm(site, taxonomy):
+        # Without a full listing some "missing" terms may already exist
+        try:
+            with term_cache.deferred_save():
+                ids.update(_lookup_terms(wp, auth, missing, taxonomy))
+        except RequestException as e:
+            logger.warning(f"Bulk {taxonomy} lookup failed: {str(e)}")
+        missing = [unique[key] for key, term_id in ids.items() if not term_id]
+
+    if missing:
+        logger.info(f"Creating {len(missing)} new {taxonomy}: {missing}")
+        created = None
+        # Every created term is cached; write the cache file once for all of them
+        with term_cache.deferred_save():
+            try:
+                created = _create_terms_batch(wp, auth, missing, taxonomy)
+            except RequestException as e:
+                logger.warning(f"Batch {taxonomy} creation failed, retrying individually: {str(e)}")
+            if created:
+                ids.update(created)
+                missing = [name for name in missing if not ids.get(_normalize_name(name))]
+            if missing:
+                ids.update(_create_terms_concurrently(wp, auth, missing, taxonomy))
+
+    return [ids[key] for key in unique]